@@ -0,0 +1,980 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for Freevia's storage and lookup layers.
+Run: python benchmark.py <name> [options]   (python benchmark.py -h for the list)
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+
+def _timeit(func, repeat):
+    """Return average seconds per call of func over repeat runs"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_users(args):
+    """Login latency of the user store against the old linear CSV scan"""
+    from user_store import UserStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.sizes:
+            path = os.path.join(tmp, f'users_{count}.csv')
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                for i in range(count):
+                    writer.writerow([f'user{i}', f'pass{i}'])
+
+            last = f'user{count - 1}'
+
+            def linear_scan():
+                with open(path, 'r', encoding='utf-8') as f:
+                    for row in csv.reader(f):
+                        if row and len(row) >= 2 and row[0] == last and row[1] == f'pass{count - 1}':
+                            return True
+                return False
+
+            store = UserStore(path)
+            start = time.perf_counter()
+            store.load()
+            load_time = time.perf_counter() - start
+
+            scan = _timeit(linear_scan, max(1, args.repeat // 100))
+            indexed = _timeit(lambda: store.check(last, f'pass{count - 1}'), args.repeat)
+            print(f"{count:>9} users | load {load_time * 1000:8.2f} ms | "
+                  f"csv scan {scan * 1e6:10.1f} us | indexed {indexed * 1e6:6.2f} us")
+
+
+def bench_user_writes(args):
+    """Registration throughput per flush policy with concurrent writer threads"""
+    import threading
+    from user_store import UserStore, FLUSH_IMMEDIATE, FLUSH_BATCHED
+
+    threads = 8
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.sizes:
+            for policy in (FLUSH_IMMEDIATE, FLUSH_BATCHED):
+                path = os.path.join(tmp, f'users_{policy}_{count}.csv')
+                store = UserStore(path, flush_policy=policy, max_batch=256)
+                store.load()
+
+                def register(worker):
+                    for i in range(worker, count, threads):
+                        store.add(f'user{i}', f'pass{i}')
+
+                start = time.perf_counter()
+                workers = [threading.Thread(target=register, args=(w,)) for w in range(threads)]
+                for w in workers:
+                    w.start()
+                for w in workers:
+                    w.join()
+                store.close()
+                elapsed = time.perf_counter() - start
+
+                with open(path, 'r', newline='', encoding='utf-8') as f:
+                    rows = list(csv.reader(f))
+                intact = len(rows) == count and all(len(r) == 2 for r in rows)
+                print(f"{count:>9} users | {policy:<9} | {count / elapsed:10.0f} reg/s | "
+                      f"rows intact: {intact}")
+
+
+def _random_items(count, seed=42):
+    """Items scattered over a ~100 x 100 km box around Istanbul"""
+    import random
+    rng = random.Random(seed)
+    return [{'id': str(i), 'name': f'item {i}', 'description': '',
+             'lat': 41.0 + rng.uniform(-0.5, 0.5), 'lon': 29.0 + rng.uniform(-0.5, 0.5),
+             'user': f'user{i % 100}', 'photo': None}
+            for i in range(count)]
+
+
+def bench_items(args):
+    """Viewport and radius queries on the item store against a full scan"""
+    from item_store import ItemStore, haversine_km
+
+    bbox = (40.99, 28.98, 41.02, 29.03)  # roughly one phone screen at zoom 14
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.sizes:
+            items = _random_items(count)
+            store = ItemStore(os.path.join(tmp, f'items_{count}.jsonl'))
+            start = time.perf_counter()
+            store.add_many(items)
+            write_time = time.perf_counter() - start
+
+            reload_store = ItemStore(store.path)
+            start = time.perf_counter()
+            reload_store.load()
+            load_time = time.perf_counter() - start
+
+            def scan_bbox():
+                return [it for it in items
+                        if bbox[0] <= it['lat'] <= bbox[2] and bbox[1] <= it['lon'] <= bbox[3]]
+
+            def scan_near():
+                return [it for it in items if haversine_km(41.0, 29.0, it['lat'], it['lon']) <= 2]
+
+            repeat = max(1, args.repeat // 10)
+            scan = _timeit(scan_bbox, max(1, repeat // 10))
+            indexed = _timeit(lambda: store.query_bbox(*bbox), repeat)
+            scan_r = _timeit(scan_near, 1)
+            near = _timeit(lambda: store.query_near(41.0, 29.0, 2), repeat)
+            print(f"{count:>9} items | write {write_time:6.2f} s | load {load_time:6.2f} s | "
+                  f"bbox scan {scan * 1000:8.2f} ms indexed {indexed * 1000:6.3f} ms | "
+                  f"2 km scan {scan_r * 1000:8.2f} ms indexed {near * 1000:6.3f} ms")
+
+
+def bench_clusters(args):
+    """Cluster index build, per-zoom viewport queries and incremental adds"""
+    from clustering import ClusterIndex
+
+    bbox = (40.9, 28.9, 41.1, 29.1)
+    for count in args.sizes:
+        items = _random_items(count)
+        index = ClusterIndex(max_zoom=15)
+        start = time.perf_counter()
+        index.add_many(items)
+        build = time.perf_counter() - start
+
+        extra = _random_items(100, seed=7)
+        for i, item in enumerate(extra):
+            item['id'] = f'extra{i}'
+        add = _timeit(lambda: index.add(extra.pop()), 100)
+
+        zooms = ' | '.join(
+            f"z{zoom} {len(index.get_clusters(bbox, zoom)):5} markers "
+            f"{_timeit(lambda: index.get_clusters(bbox, zoom), 10) * 1000:6.2f} ms"
+            for zoom in (8, 11, 13, 15))
+        print(f"{count:>9} items | build {build:6.2f} s | add {add * 1e6:6.1f} us | {zooms}")
+
+
+def bench_search(args):
+    """Inverted index queries against the old per-tap substring scan"""
+    import random
+    from search_index import SearchIndex, IncrementalSearch
+
+    words = ['kitap', 'sandalye', 'masa', 'telefon', 'oyuncak', 'çocuk', 'İnce', 'ıslak',
+             'temiz', 'eski', 'yeni', 'ahşap', 'koltuk', 'lamba', 'bisiklet', 'dolap']
+    # Pad with synthetic words so each real word matches a realistic share of items
+    syllables = ['ka', 'le', 'mi', 'so', 'tu', 'ra', 'ne', 'di', 'po', 'gü', 'şe', 'ba', 'fı', 'ze', 'co',
+                 'ya', 'hi', 'vu', 'de', 'nö']
+    words += [a + b + c for a in syllables for b in syllables for c in syllables[:5]]
+    rng = random.Random(1)
+    for count in args.sizes:
+        items = _random_items(count)
+        for item in items:
+            item['name'] = ' '.join(rng.sample(words, 2)) + f' {rng.randrange(1000)}'
+            item['description'] = ' '.join(rng.sample(words, 5))
+        index = SearchIndex()
+        start = time.perf_counter()
+        index.add_many(items)
+        build = time.perf_counter() - start
+
+        def substring_scan(query='bisiklet'):
+            return [it for it in items
+                    if query in it['name'].lower() or query in it['description'].lower()]
+
+        scan = _timeit(substring_scan, 3)
+        results = ' | '.join(
+            f"'{query}' {_timeit(lambda: index.search(query, limit=50), 10) * 1000:6.2f} ms"
+            for query in ('bisiklet', 'bis', 'ahşap lamba', 'KİTAP'))
+
+        def type_query(text='ahşap lamba'):
+            # One query per keystroke, as search-as-you-type issues them
+            incremental = IncrementalSearch(index)
+            for end in range(1, len(text) + 1):
+                incremental.search(text[:end], limit=50)
+
+        typing = _timeit(type_query, 3)
+        print(f"{count:>9} items | build {build:6.2f} s | scan {scan * 1000:7.2f} ms | {results}"
+              f" | typing {typing * 1000:6.2f} ms")
+
+
+def bench_geolocation(args):
+    """Sequential vs racing IP geolocation against local stub providers"""
+    from geolocation import IPLocator, MODE_RACE, MODE_SEQUENTIAL
+    from test_support import stub_location_servers
+
+    # A slow first provider, a failing one, and two fast ones
+    delays = [0.8, None, 0.05, 0.2]
+    servers = stub_location_servers(delays)
+    providers = [(f'stub{i}', f'http://127.0.0.1:{server.server_port}/json',
+                  lambda d: (d.get('lat'), d.get('lon')))
+                 for i, server in enumerate(servers)]
+    try:
+        for mode, width in ((MODE_SEQUENTIAL, None), (MODE_RACE, None), (MODE_RACE, 2)):
+            locator = IPLocator(providers, mode=mode, timeout=2, race_width=width)
+            first = _timeit(locator.locate, 1)
+            # Later lookups use the provider order learned from the first ones
+            learned = _timeit(locator.locate, 5)
+            order = ', '.join(name for name, _, _ in locator.ordered_providers())
+            label = mode if width is None else f'{mode} x{width}'
+            print(f"{label:>10} | first {first * 1000:7.1f} ms | learned {learned * 1000:7.1f} ms"
+                  f" | order {order}")
+            # Let abandoned requests finish so they do not hold the per-host pool
+            time.sleep(max(d for d in delays if d is not None))
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+def bench_http(args):
+    """Repeat GET latency: bare requests.get against the pooled HTTP client"""
+    import requests
+    from http_client import HttpClient
+    from test_support import stub_location_servers
+
+    server, = stub_location_servers([0])
+    url = f'http://127.0.0.1:{server.server_port}/json'
+    client = HttpClient()
+    try:
+        for count in args.sizes:
+            count = min(count, 2000)
+            bare = _timeit(lambda: requests.get(url, timeout=5).json(), count)
+            pooled = _timeit(lambda: client.get_json(url), count)
+            print(f"{count:>9} calls | bare {bare * 1000:6.2f} ms | pooled {pooled * 1000:6.2f} ms"
+                  f" | {bare / pooled:4.1f}x")
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def _disk_usage(paths):
+    """(apparent bytes, allocated bytes) of files"""
+    apparent = allocated = 0
+    for path in paths:
+        st = os.stat(path)
+        apparent += st.st_size
+        allocated += getattr(st, 'st_blocks', st.st_size // 512) * 512
+    return apparent, allocated
+
+
+def bench_tiles(args):
+    """Cold-start tile loading and disk footprint: loose PNG files vs MBTiles archive"""
+    import contextlib
+    from tile_archive import TileArchive, TILE_FILE_RE
+    from tile_cache import TileCache
+
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+    samples = []
+    for name in sorted(os.listdir(source)):
+        if TILE_FILE_RE.match(name):
+            with open(os.path.join(source, name), 'rb') as f:
+                samples.append(f.read())
+    if not samples:
+        print(f"No tiles in {source}")
+        return
+
+    for count in args.sizes:
+        count = min(count, 5000)  # the default tile cache budget
+        with tempfile.TemporaryDirectory() as tmp:
+            loose = os.path.join(tmp, 'cache')
+            os.makedirs(loose)
+            tiles = [(16, 38000 + i // 100, 25000 + i % 100) for i in range(count)]
+            for i, (z, x, y) in enumerate(tiles):
+                with open(os.path.join(loose, f'26a7511794_{z}_{x}_{y}.png'), 'wb') as f:
+                    f.write(samples[i % len(samples)])
+            archive_path = os.path.join(tmp, 'tiles.mbtiles')
+            archive = TileArchive(archive_path)
+            archive.import_directory(loose)
+            archive.close()
+            files = [os.path.join(loose, name) for name in os.listdir(loose)]
+            _, loose_allocated = _disk_usage(files)
+            _, archive_allocated = _disk_usage(
+                [p for p in (archive_path, archive_path + '-wal') if os.path.exists(p)])
+
+            def load_loose():
+                cache = TileCache(loose, max_bytes=1 << 40, max_tiles=1 << 30)
+                for z, x, y in tiles:
+                    name = f'26a7511794_{z}_{x}_{y}.png'
+                    cache.touch(name)
+                    with open(cache.path(name), 'rb') as f:
+                        f.read()
+                cache.close()
+
+            def load_archive():
+                archive = TileArchive(archive_path)
+                for tile in tiles:
+                    archive.get(*tile)
+                archive.close()
+
+            # First loose run scans the directory; later runs read the saved index
+            with contextlib.redirect_stdout(None):
+                scan = _timeit(load_loose, 1)
+                indexed = _timeit(load_loose, 3)
+                packed = _timeit(load_archive, 3)
+            print(f"{count:>9} tiles | loose scan {scan * 1000:7.1f} ms | loose index "
+                  f"{indexed * 1000:7.1f} ms | archive {packed * 1000:7.1f} ms | disk loose "
+                  f"{loose_allocated / 1e6:6.1f} MB ({len(files)} files) | archive "
+                  f"{archive_allocated / 1e6:6.1f} MB (1 file)")
+
+
+def bench_photos(args):
+    """Photo pipeline throughput and per-stage time on 12 MP camera photos per worker count"""
+    from PIL import Image, ImageDraw
+    from photo_pipeline import PhotoPipeline, STAGES
+
+    tmp = tempfile.mkdtemp()
+    count = max(1, min(args.repeat, 24))
+    sources = []
+    for i in range(min(count, 4)):
+        # Busy content so encoders cannot cheat, tagged as taken in portrait
+        img = Image.effect_noise((1000, 750), 40 + i * 10).convert('RGB').resize((4000, 3000))
+        draw = ImageDraw.Draw(img)
+        for x in range(0, 4000, 160):
+            draw.line([(x, 0), (4000 - x, 3000)], fill=(x % 255, 90, 200), width=12)
+        exif = img.getexif()
+        exif[0x0112] = 6
+        path = os.path.join(tmp, f'camera_{i}.jpg')
+        img.save(path, quality=92, exif=exif)
+        sources.append(path)
+    source_bytes = sum(os.path.getsize(path) for path in sources) / len(sources)
+
+    for workers in (1, 2, 4):
+        pipeline = PhotoPipeline(os.path.join(tmp, f'photos_{workers}'), workers=workers)
+        start = time.perf_counter()
+        futures = [pipeline.submit(sources[i % len(sources)]) for i in range(count)]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+        pipeline.close()
+        stats = pipeline.stats()
+        stages = ' '.join(f"{stage} {stats['stages'][stage] * 1000:5.1f}" for stage in STAGES)
+        photo_bytes = sum(r['bytes'] for r in results) / len(results)
+        thumbnail_bytes = sum(r['thumbnail_bytes'] for r in results) / len(results)
+        print(f"{workers} workers | {count / elapsed:5.1f} photos/s | ms: {stages} | "
+              f"{source_bytes / 1024:.0f} KB -> {photo_bytes / 1024:.0f} KB + "
+              f"{thumbnail_bytes / 1024:.1f} KB thumbnail")
+
+
+def bench_photo_store(args):
+    """Storage and lookup of N shared photos: one file per upload vs the content-addressed store"""
+    import random
+    import shutil
+    import uuid
+    from blob_store import BlobStore, item_blob_keys
+
+    for count in args.sizes:
+        tmp = tempfile.mkdtemp()
+        rng = random.Random(42)
+        # 30% of shares repeat an earlier picture (shared twice or re-uploaded after an edit)
+        photos = []
+        for i in range(count):
+            if photos and rng.random() < 0.3:
+                photos.append(photos[rng.randrange(len(photos))])
+            else:
+                photos.append((rng.randbytes(4096), rng.randbytes(512)))
+
+        flat_dir = os.path.join(tmp, 'flat')
+        os.makedirs(flat_dir)
+        flat_paths = []
+        start = time.perf_counter()
+        for photo, thumbnail in photos:
+            for data, suffix in ((photo, '.webp'), (thumbnail, '_thumb.webp')):
+                path = os.path.join(flat_dir, uuid.uuid4().hex + suffix)
+                with open(path, 'wb') as f:
+                    f.write(data)
+                flat_paths.append(path)
+        flat_write = time.perf_counter() - start
+
+        blobs = BlobStore(os.path.join(tmp, 'blobs'))
+        items = []
+        start = time.perf_counter()
+        for photo, thumbnail in photos:
+            item = {'photo': blobs.path(blobs.put(photo, '.webp')),
+                    'thumbnail': blobs.path(blobs.put(thumbnail, '.webp'))}
+            blobs.on_store_event('add', item)
+            items.append(item)
+        blob_write = time.perf_counter() - start
+        blob_paths = [os.path.join(root, name) for root, _, names in os.walk(blobs.root)
+                      for name in names if name.endswith('.webp')]
+
+        samples = rng.sample(range(count), min(count, 2000))
+        flat_lookup = _timeit(lambda: [os.path.exists(flat_paths[2 * i]) for i in samples], 3)
+        blob_lookup = _timeit(lambda: [items[i]['photo'] in blobs and
+                                       os.path.exists(items[i]['photo']) for i in samples], 3)
+        flat_bytes = _disk_usage(flat_paths)[1]
+        blob_bytes = _disk_usage(blob_paths)[1]
+
+        # Delete a tenth of the items, then collect what nothing references any more
+        for item in items[:count // 10]:
+            blobs.on_store_event('remove', item)
+        start = time.perf_counter()
+        live = item_blob_keys(items[count // 10:])
+        collected, collected_bytes = blobs.gc(grace=0, referenced=live)
+        gc_time = time.perf_counter() - start
+        blobs.close()
+        print(f"{count:>9} photos | per-upload {flat_bytes / 1e6:7.1f} MB, "
+              f"{len(flat_paths)} files, write {flat_write:6.2f} s, lookup "
+              f"{flat_lookup / len(samples) * 1e6:5.1f} us | blobs {blob_bytes / 1e6:7.1f} MB "
+              f"({1 - blob_bytes / flat_bytes:.0%} saved), {len(blob_paths)} files, write "
+              f"{blob_write:6.2f} s, lookup {blob_lookup / len(samples) * 1e6:5.1f} us | gc "
+              f"{collected} blobs in {gc_time * 1000:.0f} ms")
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _frame_stats(frame_times):
+    frame_times = sorted(frame_times)
+    if not frame_times:
+        return 'no frames'
+    mean = sum(frame_times) / len(frame_times)
+    p95 = frame_times[int(len(frame_times) * 0.95) - 1]
+    return (f"mean {mean * 1000:6.2f} ms | p95 {p95 * 1000:6.2f} ms | "
+            f"max {frame_times[-1] * 1000:6.2f} ms")
+
+
+def _run_per_size(args):
+    """Kivy apps cannot be restarted in-process, so run each size in a subprocess"""
+    import subprocess
+    for count in args.sizes:
+        subprocess.call([sys.executable, os.path.abspath(__file__), args.name,
+                         '--sizes', str(count), '--repeat', str(args.repeat)])
+
+
+def bench_map_frames(args):
+    """Frame time while panning MapScreen over N stored items (needs a display)"""
+    if len(args.sizes) > 1:
+        return _run_per_size(args)
+    count = args.sizes[0]
+
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    import freevia_kivy
+    from kivy.app import App
+    from kivy.clock import Clock
+
+    tmp = tempfile.mkdtemp()
+    freevia_kivy.ITEMS_FILE = os.path.join(tmp, 'items.jsonl')
+    freevia_kivy.get_item_store().add_many(_random_items(count))
+    # Keep the map where the items are instead of jumping to the real location
+    freevia_kivy.get_user_location = lambda callback=None: None
+
+    frame_times = []
+    marker_counts = []
+
+    class MapFramesApp(App):
+        def build(self):
+            self.screen = freevia_kivy.MapScreen(name='map')
+            return self.screen
+
+        def on_start(self):
+            self.step = 0
+            Clock.schedule_interval(self.pan, 0)
+
+        def pan(self, dt):
+            if self.step > 10:  # skip window setup frames
+                frame_times.append(dt)
+            # Pan for 30 frames, then hold for 15 so debounced refreshes land
+            phase = self.step % 45
+            if phase < 30:
+                mapview = self.screen.mapview
+                mapview.center_on(mapview.lat + 0.0005, mapview.lon + 0.0008)
+            marker_counts.append(len(self.screen._item_markers))
+            self.step += 1
+            if self.step >= args.repeat:
+                self.stop()
+                return False
+
+    MapFramesApp().run()
+    print(f"{count:>9} items | {_frame_stats(frame_times)} | "
+          f"max markers {max(marker_counts) if marker_counts else 0}")
+
+
+def bench_markers(args):
+    """Frame time while panning over N pins, MapMarker widgets vs the atlas layer (needs a display)"""
+    mode = os.environ.get('FREEVIA_MARKER_MODE')
+    if mode is None:
+        # Kivy apps cannot be restarted in-process: one subprocess per size and mode
+        import subprocess
+        for count in args.sizes:
+            for mode in ('widgets', 'atlas'):
+                subprocess.call([sys.executable, os.path.abspath(__file__), args.name,
+                                 '--sizes', str(count), '--repeat', str(args.repeat)],
+                                env=dict(os.environ, FREEVIA_MARKER_MODE=mode))
+        return
+    count = args.sizes[0]
+
+    import random
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    from kivy.app import App
+    from kivy.clock import Clock
+    from kivy_garden.mapview import MapMarker, MapView
+    from map_markers import ItemMarkerLayer, pin_icon, set_marker_texture
+    from marker_icons import IconAtlas, MarkerIcons
+
+    tmp = tempfile.mkdtemp()
+    icons = MarkerIcons(os.path.join(tmp, 'marker_icons'))
+    rng = random.Random(42)
+    frame_times = []
+
+    class MarkersApp(App):
+        def build(self):
+            self.mapview = MapView(zoom=13, lat=41.0082, lon=28.9784,
+                                   cache_dir=os.path.join(tmp, 'cache'))
+            return self.mapview
+
+        def on_start(self):
+            Clock.schedule_once(self.add_markers, 0.5)  # once the window has its size
+
+        def add_markers(self, dt):
+            min_lat, min_lon, max_lat, max_lon = self.mapview.get_bbox()
+            points = [(rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon))
+                      for _ in range(count)]
+            if mode == 'atlas':
+                layer = ItemMarkerLayer(IconAtlas(icons))
+                layer.set_markers({i: (lat, lon, pin_icon(1 + i % 50)) for i, (lat, lon)
+                                   in enumerate(points)})
+                self.mapview.add_layer(layer, mode='window')
+            else:
+                # Per-widget markers, already sharing one texture per icon
+                for i, (lat, lon) in enumerate(points):
+                    marker = MapMarker(lat=lat, lon=lon)
+                    set_marker_texture(marker, icons.texture(**pin_icon(1 + i % 50)))
+                    self.mapview.add_marker(marker)
+            self.step = 0
+            Clock.schedule_interval(self.pan, 0)
+
+        def pan(self, dt):
+            if self.step > 10:  # skip the frames that build the markers
+                frame_times.append(dt)
+            # Small steps back and forth so every pin stays on screen
+            direction = 1 if (self.step // 60) % 2 == 0 else -1
+            self.mapview.center_on(self.mapview.lat + direction * 0.0002,
+                                   self.mapview.lon + direction * 0.0003)
+            self.step += 1
+            if self.step >= args.repeat:
+                self.stop()
+                return False
+
+    MarkersApp().run()
+    print(f"{count:>9} pins | {mode:>7} | {_frame_stats(frame_times)}")
+
+
+def bench_my_items(args):
+    """Frame time while flinging through N items with photos in "Eşyalarım" (needs a display)"""
+    if len(args.sizes) > 1:
+        return _run_per_size(args)
+    count = args.sizes[0]
+
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    import freevia_kivy
+    from kivy.app import App
+    from kivy.clock import Clock
+    from PIL import Image
+
+    tmp = tempfile.mkdtemp()
+    freevia_kivy.ITEMS_FILE = os.path.join(tmp, 'items.jsonl')
+    freevia_kivy.THUMBNAIL_CACHE_DIR = os.path.join(tmp, 'thumbnail_cache')
+    # 200 distinct camera-sized photos, so thumbnails keep being decoded while flinging
+    photos = []
+    for i in range(200):
+        path = os.path.join(tmp, f'photo_{i}.jpg')
+        Image.new('RGB', (1600, 1200), (i, 255 - i, 120)).save(path)
+        photos.append(path)
+    items = _random_items(count)
+    for i, item in enumerate(items):
+        item['user'] = 'bench'
+        item['description'] = 'ahşap masa, az kullanılmış'
+        item['photo'] = photos[i % len(photos)]
+    freevia_kivy.get_item_store().add_many(items)
+
+    frame_times = []
+    row_counts = []
+
+    class MyItemsApp(App):
+        def build(self):
+            self.screen = freevia_kivy.MyItemsScreen(name='my_items')
+            self.screen.set_user('bench')
+            return self.screen
+
+        def on_start(self):
+            self.screen.reload()
+            self.step = 0
+            Clock.schedule_interval(self.fling, 0)
+
+        def fling(self, dt):
+            if self.step > 10:  # skip window setup frames
+                frame_times.append(dt)
+            # Scroll about four screens per second, bouncing between the ends
+            item_list = self.screen.item_list
+            scrollable = max(1, item_list.children[0].height - item_list.height)
+            direction = -1 if (self.step // 600) % 2 == 0 else 1
+            step = 4 * item_list.height * dt / scrollable
+            item_list.scroll_y = min(1, max(0, item_list.scroll_y + direction * step))
+            row_counts.append(len(item_list.children[0].children))
+            self.step += 1
+            if self.step >= args.repeat:
+                self.stop()
+                return False
+
+    MyItemsApp().run()
+    thumbnails = freevia_kivy.get_thumbnail_loader().stats()
+    print(f"{count:>9} items | {_frame_stats(frame_times)} | "
+          f"max rows built {max(row_counts) if row_counts else 0} | thumbnails "
+          f"{thumbnails['decoded']} decoded, {thumbnails['skipped']} skipped, "
+          f"hit ratio {thumbnails['hit_ratio']:.0%}")
+
+
+def bench_startup(args):
+    """Time to the first sign-in frame with eager and lazy screens (needs a display)"""
+    mode = os.environ.get('FREEVIA_STARTUP_MODE')
+    if mode is None:
+        # Each start needs a fresh process; --repeat sets the runs per mode (at most 5)
+        import subprocess
+        runs = max(1, min(args.repeat, 5))
+        for mode in ('eager', 'lazy'):
+            results = []
+            for _ in range(runs):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), args.name],
+                    env=dict(os.environ, FREEVIA_STARTUP_MODE=mode),
+                    capture_output=True, text=True).stdout
+                lines = [line for line in output.splitlines() if line.startswith('startup ')]
+                if lines:
+                    results.append([float(value) for value in lines[-1].split()[1:]])
+            if not results:
+                print(f"{mode:>6} | no frame (is a display available?)")
+                continue
+            imported, built, first_frame = (min(column) for column in zip(*results))
+            print(f"{mode:>6} | import {imported * 1000:7.1f} ms | build "
+                  f"{built * 1000:7.1f} ms | first frame {first_frame * 1000:7.1f} ms "
+                  f"(best of {len(results)})")
+        return
+
+    start = time.perf_counter()
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    import freevia_kivy
+    from kivy.core.window import Window
+    imported = time.perf_counter()
+
+    tmp = tempfile.mkdtemp()
+    freevia_kivy.LAZY_SCREENS = mode == 'lazy'
+    freevia_kivy.USERS_FILE = os.path.join(tmp, 'users.csv')
+    freevia_kivy.ITEMS_FILE = os.path.join(tmp, 'items.jsonl')
+    freevia_kivy.LOCATION_CACHE_FILE = os.path.join(tmp, 'location_cache.json')
+    freevia_kivy.TILE_CACHE_DIR = os.path.join(tmp, 'cache')
+    freevia_kivy.get_user_location = lambda callback=None, max_age=None: None
+    times = {}
+
+    class StartupApp(freevia_kivy.FreeviaApp):
+        def build(self):
+            root = super().build()
+            times['built'] = time.perf_counter()
+            return root
+
+        def on_start(self):
+            Window.bind(on_flip=self.first_frame)
+
+        def first_frame(self, *args):
+            Window.unbind(on_flip=self.first_frame)
+            times['frame'] = time.perf_counter()
+            self.stop()
+
+    StartupApp().run()
+    if 'frame' in times:
+        print(f"startup {imported - start:.4f} {times['built'] - imported:.4f} "
+              f"{times['frame'] - start:.4f}")
+
+
+def bench_popups(args):
+    """Time and allocations per message popup: built per call vs the shared popup (needs a display)"""
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    import tracemalloc
+    import freevia_kivy
+    from freevia_kivy import IOSButton, IOSLabel, IOS_COLORS
+    from kivy.app import App
+    from kivy.metrics import dp
+    from kivy.uix.boxlayout import BoxLayout
+    from kivy.uix.popup import Popup
+    from kivy.uix.widget import Widget
+
+    def build_per_call(title, message):
+        # What every screen's show_ios_popup used to do
+        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
+        content.add_widget(IOSLabel(text=message, font_size=dp(16),
+                                    color=IOS_COLORS['text_primary'],
+                                    text_size=(dp(250), None), halign='center'))
+        ok_button = IOSButton(text='Tamam', size_hint_y=None, height=dp(44))
+        content.add_widget(ok_button)
+        popup = Popup(title=title, content=content, size_hint=(0.8, 0.4),
+                      background_color=IOS_COLORS['card_background'])
+        ok_button.bind(on_press=popup.dismiss)
+        popup.open(animation=False)
+        popup.dismiss(animation=False)
+
+    service = freevia_kivy.get_popup_service()
+
+    def shared(title, message):
+        freevia_kivy.show_ios_popup(title, message)
+        service.clear()
+
+    count = max(1, min(args.repeat, 200))
+
+    class PopupsApp(App):
+        def build(self):
+            return Widget()
+
+        def on_start(self):
+            for name, show in (('per call', build_per_call), ('shared', shared)):
+                show('Hata', 'warm up')
+                start = time.perf_counter()
+                for i in range(count):
+                    show('Hata', f'Mesaj {i}')
+                elapsed = (time.perf_counter() - start) / count
+                # Peak memory growth while one popup opens, i.e. what it allocates
+                growth = []
+                tracemalloc.start()
+                for i in range(count):
+                    before = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                    show('Hata', f'Mesaj {i}')
+                    growth.append(tracemalloc.get_traced_memory()[1] - before)
+                tracemalloc.stop()
+                print(f"{name:>9} | {elapsed * 1000:6.2f} ms per open | "
+                      f"{sum(growth) / len(growth) / 1024:7.1f} KB allocated per open")
+            self.stop()
+
+    PopupsApp().run()
+
+
+def _canvas_instructions(root):
+    """Graphics instructions drawn by root and its children (widget canvases not counted)"""
+    from kivy.graphics import Canvas, InstructionGroup
+
+    def count(group):
+        total = 0
+        for instruction in group.children:
+            if isinstance(instruction, Canvas):
+                continue  # a child widget's canvas, counted with that widget
+            total += count(instruction) if isinstance(instruction, InstructionGroup) else 1
+        return total
+
+    return sum(count(group) for widget in root.walk()
+               for group in (widget.canvas.before, widget.canvas, widget.canvas.after))
+
+
+def bench_dashboard(args):
+    """Canvas instructions, build and layout time of the dashboard: old vs shared cards (needs a display)"""
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    from freevia_kivy import DashboardScreen, IOSLabel, IOS_COLORS
+    from kivy.app import App
+    from kivy.graphics import Color, RoundedRectangle
+    from kivy.metrics import dp
+    from kivy.uix.behaviors import ButtonBehavior
+    from kivy.uix.boxlayout import BoxLayout
+    from kivy.uix.layout import Layout
+    from kivy.uix.widget import Widget
+
+    def legacy_feature_card(self, icon, title, description, callback):
+        # The old card: drawn on a BoxLayout, then moved into a per-call
+        # ButtonBehavior class that draws the same rectangles again
+        def draw(card):
+            with card.canvas.before:
+                Color(0, 0, 0, 0.1)
+                card.shadow_rect = RoundedRectangle(size=(card.width, card.height - dp(2)),
+                                                    pos=(card.x, card.y - dp(2)), radius=[dp(16)])
+                Color(*IOS_COLORS['card_background'])
+                card.bg_rect = RoundedRectangle(size=card.size, pos=card.pos, radius=[dp(16)])
+
+        def update_card_graphics(instance, *args):
+            instance.shadow_rect.size = (instance.width, instance.height - dp(2))
+            instance.shadow_rect.pos = (instance.x, instance.y - dp(2))
+            instance.bg_rect.size = instance.size
+            instance.bg_rect.pos = instance.pos
+
+        card = BoxLayout(orientation='horizontal', spacing=dp(15), size_hint_y=None,
+                         height=dp(80), padding=[dp(20), dp(15)])
+        draw(card)
+        card.bind(size=update_card_graphics, pos=update_card_graphics)
+
+        def label(parent, text, **kwargs):
+            widget = IOSLabel(text=text, halign='center', valign='middle', **kwargs)
+            widget.bind(size=widget.setter('text_size'))
+            parent.add_widget(widget)
+
+        label(card, icon, font_size=dp(28), size_hint_x=None, width=dp(50))
+        text_layout = BoxLayout(orientation='vertical', spacing=dp(2))
+        label(text_layout, title, font_size=dp(18), bold=True, size_hint_y=None, height=dp(25))
+        label(text_layout, description, font_size=dp(14), size_hint_y=None, height=dp(35))
+        card.add_widget(text_layout)
+        label(card, '›', font_size=dp(24), size_hint_x=None, width=dp(30))
+
+        class ClickableCard(ButtonBehavior, BoxLayout):
+            pass
+
+        clickable_card = ClickableCard(orientation='horizontal', spacing=dp(15), size_hint_y=None,
+                                       height=dp(80), padding=[dp(20), dp(15)])
+        for child in card.children[:]:
+            card.remove_widget(child)
+            clickable_card.add_widget(child)
+        draw(clickable_card)
+        clickable_card.bind(size=update_card_graphics, pos=update_card_graphics)
+        clickable_card.bind(on_press=callback)
+        return clickable_card
+
+    count = max(1, min(args.repeat, 100))
+    shared_feature_card = DashboardScreen.create_feature_card
+
+    def layout_pass(screen, size):
+        screen.size = size
+        for widget in list(screen.walk()):
+            if isinstance(widget, Layout):
+                widget.do_layout()
+
+    class DashboardApp(App):
+        def build(self):
+            return Widget()
+
+        def on_start(self):
+            for name, factory in (('old cards', legacy_feature_card),
+                                  ('shared', shared_feature_card)):
+                DashboardScreen.create_feature_card = factory
+                start = time.perf_counter()
+                screens = [DashboardScreen(name='dashboard') for _ in range(count)]
+                built = (time.perf_counter() - start) / count
+                screen = screens[-1]
+                start = time.perf_counter()
+                for i in range(count):
+                    layout_pass(screen, (360 + i % 2 * 40, 640))
+                laid_out = (time.perf_counter() - start) / count
+                print(f"{name:>9} | {_canvas_instructions(screen):4d} canvas instructions | "
+                      f"{sum(1 for _ in screen.walk()):4d} widgets | build "
+                      f"{built * 1000:6.2f} ms | layout pass {laid_out * 1000:6.2f} ms")
+            DashboardScreen.create_feature_card = shared_feature_card
+            self.stop()
+
+    DashboardApp().run()
+
+
+# Per-module import times (ms) saved by `import-time --save-budget`; the modules
+# in DEFERRED_MODULES must not be imported by our own modules during
+# `import freevia_kivy` (Kivy itself may load PIL for its image providers)
+IMPORT_BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'import_budget.json')
+DEFERRED_MODULES = ('requests', 'PIL', 'plyer', 'kivy_garden.mapview', 'map_tiles',
+                    'tile_prefetch', 'tile_archive', 'sqlite3')
+
+
+def _import_times(module, runs):
+    """Cumulative import time (s) per module for `import module`, best of runs fresh
+    processes, and the module that first imported each one"""
+    import subprocess
+    best = {}
+    importers = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            env=dict(os.environ, KIVY_NO_ARGS='1', KIVY_NO_CONSOLELOG='1'),
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True)
+        if result.returncode:
+            lines = result.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f'import {module} failed')
+        waiting = {}  # indent -> modules whose importer has not been listed yet
+        for line in result.stderr.splitlines():
+            # "import time: <self us> | <cumulative us> | <indented module name>";
+            # a module is listed after the ones it imports, indented two more
+            if not line.startswith('import time:'):
+                continue
+            fields = line[len('import time:'):].split('|')
+            if len(fields) != 3 or not fields[1].strip().isdigit():
+                continue
+            name = fields[2].strip()
+            indent = len(fields[2]) - len(fields[2].lstrip())
+            for child in waiting.pop(indent + 2, ()):
+                importers[child] = name
+            waiting.setdefault(indent, []).append(name)
+            cumulative = int(fields[1]) / 1e6
+            best[name] = min(best.get(name, cumulative), cumulative)
+    return best, importers
+
+
+def bench_import_time(args):
+    """Import time of freevia_kivy per module against import_budget.json; fails on regressions"""
+    import json
+    runs = max(1, min(args.repeat, 5))
+    try:
+        times, importers = _import_times('freevia_kivy', runs)
+    except RuntimeError as e:
+        print(f"freevia_kivy could not be imported: {e}")
+        return 1
+    local = {os.path.splitext(name)[0] for name in os.listdir(os.path.dirname(
+        os.path.abspath(__file__))) if name.endswith('.py')}
+    watched = {name: seconds for name, seconds in times.items()
+               if name in local or name in ('kivy', 'kivy_garden', 'json', 'csv')}
+
+    if args.save_budget:
+        with open(IMPORT_BUDGET_FILE, 'w', encoding='utf-8') as f:
+            json.dump({name: round(seconds * 1000, 1) for name, seconds in sorted(watched.items())},
+                      f, indent=2)
+        print(f"Saved the budget of {len(watched)} modules to {IMPORT_BUDGET_FILE}")
+
+    budget = {}
+    if os.path.exists(IMPORT_BUDGET_FILE):
+        with open(IMPORT_BUDGET_FILE, 'r', encoding='utf-8') as f:
+            budget = json.load(f)
+    failures = []
+    for name in sorted(set(watched) | set(budget), key=lambda n: -watched.get(n, 0)):
+        ms = watched.get(name, 0.0) * 1000
+        limit = budget.get(name)
+        if limit is None:
+            status = 'no budget'
+        elif ms > limit * (1 + args.threshold) and ms - limit > 1:
+            status = f'OVER by {ms - limit:.1f} ms'
+            failures.append(name)
+        else:
+            status = 'ok'
+        print(f"{name:>22} | {ms:8.1f} ms | budget "
+              f"{'-' if limit is None else f'{limit:.1f}':>8} ms | {status}")
+    for name in DEFERRED_MODULES:
+        importer = importers.get(name)
+        if name in times and (importer in local or importer is None):
+            print(f"{name:>22} | {times[name] * 1000:8.1f} ms | imported by {importer}, "
+                  f"should be imported on first use")
+            failures.append(name)
+    if failures:
+        print(f"Import time regressions (threshold {args.threshold:.0%}): {', '.join(failures)}")
+        return 1
+    return 0
+
+
+BENCHMARKS = {
+    'users': bench_users,
+    'user-writes': bench_user_writes,
+    'items': bench_items,
+    'clusters': bench_clusters,
+    'search': bench_search,
+    'geolocation': bench_geolocation,
+    'http': bench_http,
+    'tiles': bench_tiles,
+    'photos': bench_photos,
+    'photo-store': bench_photo_store,
+    'map-frames': bench_map_frames,
+    'markers': bench_markers,
+    'my-items': bench_my_items,
+    'startup': bench_startup,
+    'popups': bench_popups,
+    'dashboard': bench_dashboard,
+    'import-time': bench_import_time,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('name', choices=sorted(BENCHMARKS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='import-time: allowed growth over the budget (0.25 = 25%%)')
+    parser.add_argument('--save-budget', action='store_true',
+                        help='import-time: store the measured times as the new budget')
+    args = parser.parse_args(argv)
+    return BENCHMARKS[args.name](args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+INDEX_FILE = 'blobs.jsonl'
+# Blobs nobody references are kept this long (s) before gc() deletes them, so
+# a photo taken for an item that is not shared yet survives
+GC_GRACE = 24 * 3600
+# Item fields holding blob paths
+ITEM_BLOB_FIELDS = ('photo', 'thumbnail')
+
+
+def blob_key(name):
+    """Content hash of a blob name or path"""
+    return os.path.basename(name).split('.', 1)[0]
+
+
+def item_blob_keys(items):
+    """Content hashes of every blob the items point at"""
+    return {blob_key(item[field]) for item in items
+            for field in ITEM_BLOB_FIELDS if item.get(field)}
+
+
+class BlobStore:
+    """
+    Content-addressed files, so identical photos are stored once.
+    - put() names a blob by the SHA-256 of its bytes plus an extension and
+      writes it to root/<first two hex digits>/<name>; bytes that are already
+      stored are not written again.
+    - An append-only index next to the blobs (one JSON object per line, like
+      the item store) keeps size, reference count and last change per blob.
+      Items take a reference with ref() and drop it with release();
+      on_store_event() does both for an ItemStore.
+    - gc() deletes blobs without references that were untouched for the
+      grace period and rewrites the index without them. New blobs start
+      without references. Given the hashes the items point at, it also
+      keeps those, so a reference count that drifted (a crash between the
+      item write and ref()) cannot delete a photo in use.
+    """
+
+    def __init__(self, root, grace=GC_GRACE):
+        self.root = root
+        self.grace = grace
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self._blobs = {}  # hash -> [ext, size, refs, touched]
+        self._loaded = False
+        self.puts = 0
+        self.deduplicated = 0  # puts of bytes that were already stored
+        self._lock = threading.RLock()
+
+    def load(self):
+        """Read the index log once"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._blobs = {}
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            self._apply(json.loads(line))
+                        except (ValueError, KeyError, TypeError):
+                            print(f"Skipping corrupt blob record: {line[:80]}")
+            self._loaded = True
+
+    def _apply(self, record):
+        key = record['hash']
+        if record.get('deleted'):
+            self._blobs.pop(key, None)
+        elif 'ext' in record:
+            blob = self._blobs.setdefault(key, [record['ext'], record['size'], 0, 0.0])
+            blob[0], blob[1], blob[3] = record['ext'], record['size'], record['touched']
+        elif key in self._blobs:
+            blob = self._blobs[key]
+            blob[2] = max(0, blob[2] + record.get('refs', 0))
+            blob[3] = record['touched']
+
+    def _append(self, records):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def path(self, name):
+        """File of a blob name"""
+        return os.path.join(self.root, name[:2], name)
+
+    def name(self, key):
+        """Stored name (hash plus extension) of a content hash, or None"""
+        self.load()
+        blob = self._blobs.get(key)
+        return None if blob is None else key + blob[0]
+
+    def __contains__(self, name):
+        return self.name(blob_key(name)) is not None
+
+    def __len__(self):
+        self.load()
+        return len(self._blobs)
+
+    def put(self, data, ext=''):
+        """Store bytes unless already stored; returns the blob name"""
+        key = hashlib.sha256(data).hexdigest()
+        # Everything under the lock, so gc() cannot delete the file between
+        # the existence check and the index update
+        with self._lock:
+            self.load()
+            self.puts += 1
+            blob = self._blobs.get(key)
+            now = time.time()
+            if blob is not None and os.path.exists(self.path(key + blob[0])):
+                self.deduplicated += 1
+                # Touch it so gc() does not delete it under a new owner
+                self._append([{'hash': key, 'touched': now}])
+                blob[3] = now
+                return key + blob[0]
+            name = key + ext
+            path = self.path(name)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            record = {'hash': key, 'ext': ext, 'size': len(data), 'touched': now}
+            self._append([record])
+            self._apply(record)
+        return name
+
+    def ref(self, *names):
+        """Add a reference to each stored blob among names (names or paths)"""
+        self._change_refs(names, 1)
+
+    def release(self, *names):
+        """Drop a reference to each stored blob among names (names or paths)"""
+        self._change_refs(names, -1)
+
+    def _change_refs(self, names, delta):
+        with self._lock:
+            self.load()
+            now = time.time()
+            records = [{'hash': key, 'refs': delta, 'touched': now}
+                       for key in (blob_key(name) for name in names if name)
+                       if key in self._blobs]
+            if not records:
+                return
+            self._append(records)
+            for record in records:
+                self._apply(record)
+
+    def refs(self, name):
+        """Reference count of a blob, None if it is not stored"""
+        self.load()
+        blob = self._blobs.get(blob_key(name))
+        return None if blob is None else blob[2]
+
+    def on_store_event(self, event, item):
+        """Keep references in step with an ItemStore (pass to its subscribe())"""
+        names = [item.get(field) for field in ITEM_BLOB_FIELDS]
+        if event == 'add':
+            self.ref(*names)
+        elif event == 'remove':
+            self.release(*names)
+
+    def gc(self, grace=None, referenced=()):
+        """Delete unreferenced blobs older than the grace period, except the hashes in
+        referenced (see item_blob_keys()); returns (blobs, bytes)"""
+        cutoff = time.time() - (self.grace if grace is None else grace)
+        # Under the lock, so a put() of the same bytes cannot slip in between
+        with self._lock:
+            self.load()
+            victims = [(key, blob[0], blob[1]) for key, blob in self._blobs.items()
+                       if blob[2] <= 0 and blob[3] <= cutoff and key not in referenced]
+            if not victims:
+                return 0, 0
+            for key, ext, _ in victims:
+                try:
+                    os.remove(self.path(key + ext))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Could not delete blob {key + ext}: {e}")
+                del self._blobs[key]
+            self._compact()
+        return len(victims), sum(size for _, _, size in victims)
+
+    def _compact(self):
+        """Rewrite the index as one put and one reference record per live blob"""
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, (ext, size, refs, touched) in self._blobs.items():
+                f.write(json.dumps({'hash': key, 'ext': ext, 'size': size,
+                                    'touched': touched}) + '\n')
+                if refs:
+                    f.write(json.dumps({'hash': key, 'refs': refs, 'touched': touched}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def stats(self):
+        """Stored blobs and bytes, and the bytes all references would take without dedup"""
+        self.load()
+        with self._lock:
+            blobs = list(self._blobs.values())
+        return {
+            'blobs': len(blobs),
+            'bytes': sum(size for _, size, _, _ in blobs),
+            'referenced_bytes': sum(size * refs for _, size, refs, _ in blobs),
+            'unreferenced': sum(1 for _, _, refs, _ in blobs if refs <= 0),
+            'puts': self.puts,
+            'deduplicated': self.deduplicated,
+        }
+
+    def close(self):
+        """Nothing is buffered; kept so callers can close every store alike"""
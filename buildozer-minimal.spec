@@ -28,7 +28,7 @@ source.exclude_patterns = */test/*,*/tests/*,*/Lib/test/*,*/badsyntax_pep3120.py
 version = 0.1
 
 # (list) Application requirements - minimal set
-requirements = python3,kivy==2.1.0,requests,Pillow,plyer
+requirements = python3,kivy==2.1.0,requests,Pillow,plyer,sqlite3
 
 # (str) Supported orientation (landscape, portrait or all)
 orientation = portrait
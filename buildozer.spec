@@ -25,14 +25,14 @@ source.exclude_exts = spec
 source.exclude_dirs = tests, bin, venv, .tox, .git, __pycache__, .pytest_cache, .coverage, htmlcov, .mypy_cache, .vscode, cache, test, Lib/test
 
 # (list) List of exclusions using pattern matching
-source.exclude_patterns = */test/*,*/tests/*,*/Lib/test/*,*/badsyntax_pep3120.py,test_*,*_test.py,*/.git/*,*/.__pycache__/*,*.pyc,*.pyo,*.egg-info/*,*/.tox/*,*/build/*,*/dist/*
+source.exclude_patterns = */test/*,*/tests/*,*/Lib/test/*,*/badsyntax_pep3120.py,test_*,*_test.py,*/.git/*,*/.__pycache__/*,*.pyc,*.pyo,*.egg-info/*,*/.tox/*,*/build/*,*/dist/*,benchmark.py
 
 # (str) Application versioning (method 1)
 version = 0.1
 
 # (list) Application requirements
 # Note: pyjnius for Android, pyobjus for iOS (platform-specific)
-requirements = python3,kivy==2.3.1,requests,Pillow,plyer
+requirements = python3,kivy==2.3.1,requests,Pillow,plyer,sqlite3
 
 # (list) Garden requirements
 garden_requirements = mapview
@@ -0,0 +1,188 @@
+import math
+import threading
+
+TILE_SIZE = 256
+MAX_LATITUDE = 85.0511287798  # Web Mercator limit
+
+
+def world_pixel(lat, lon, zoom):
+    """Web Mercator pixel coordinates of (lat, lon) at the given zoom level"""
+    scale = TILE_SIZE * (1 << zoom)
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0 * scale
+    sin_lat = math.sin(math.radians(lat))
+    y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return x, y
+
+
+class Cluster:
+    """A group of items on one zoom level; item is set when count == 1"""
+    __slots__ = ('key', 'zoom', 'lat', 'lon', 'count', 'item')
+
+    def __init__(self, key, zoom, lat, lon, count, item=None):
+        self.key = key
+        self.zoom = zoom
+        self.lat = lat
+        self.lon = lon
+        self.count = count
+        self.item = item
+
+
+class ClusterIndex:
+    """
+    Hierarchical grid clustering of map items.
+    - Every zoom level from min_zoom to max_zoom has a grid of cell_size-pixel
+      cells. cell_size is a power of two, so each cell is exactly four cells of
+      the next zoom level and the levels nest like a quadtree.
+    - Cells keep only a count and coordinate sums (for the centroid); item ids
+      live on the finest level. Adding or removing an item touches one cell per
+      level instead of reclustering everything.
+    - Above max_zoom items are returned individually.
+    """
+
+    def __init__(self, min_zoom=0, max_zoom=16, cell_size=64):
+        if cell_size & (cell_size - 1):
+            raise ValueError("cell_size must be a power of two")
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.cell_size = cell_size
+        # zoom -> {(cx, cy): [count, lat_sum, lon_sum]}
+        self._levels = {z: {} for z in range(min_zoom, max_zoom + 1)}
+        self._leaves = {}  # finest level (cx, cy) -> {item id: item}
+        self._cells = {}  # item id -> finest cell key
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._cells)
+
+    def _leaf_key(self, lat, lon):
+        x, y = world_pixel(lat, lon, self.max_zoom)
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def add(self, item):
+        """Add or move an item (dict with id, lat, lon)"""
+        with self._lock:
+            if item['id'] in self._cells:
+                self.remove(item['id'])
+            leaf = self._leaf_key(item['lat'], item['lon'])
+            self._cells[item['id']] = leaf
+            self._leaves.setdefault(leaf, {})[item['id']] = item
+            cx, cy = leaf
+            for zoom in range(self.max_zoom, self.min_zoom - 1, -1):
+                cell = self._levels[zoom].get((cx, cy))
+                if cell is None:
+                    self._levels[zoom][(cx, cy)] = [1, item['lat'], item['lon']]
+                else:
+                    cell[0] += 1
+                    cell[1] += item['lat']
+                    cell[2] += item['lon']
+                cx >>= 1
+                cy >>= 1
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def remove(self, item_id):
+        """Remove an item by id; returns the removed item or None"""
+        with self._lock:
+            leaf = self._cells.pop(item_id, None)
+            if leaf is None:
+                return None
+            items = self._leaves[leaf]
+            item = items.pop(item_id)
+            if not items:
+                del self._leaves[leaf]
+            cx, cy = leaf
+            for zoom in range(self.max_zoom, self.min_zoom - 1, -1):
+                level = self._levels[zoom]
+                cell = level[(cx, cy)]
+                cell[0] -= 1
+                if cell[0] <= 0:
+                    del level[(cx, cy)]
+                else:
+                    cell[1] -= item['lat']
+                    cell[2] -= item['lon']
+                cx >>= 1
+                cy >>= 1
+            return item
+
+    def on_store_event(self, event, item):
+        """ItemStore listener keeping the index in sync"""
+        if event == 'add':
+            self.add(item)
+        elif event == 'remove':
+            self.remove(item['id'])
+
+    def cluster_key(self, item_id, zoom):
+        """Key of the cluster holding item_id at zoom, as used by get_clusters"""
+        zoom = max(self.min_zoom, int(zoom))
+        with self._lock:
+            leaf = self._cells.get(item_id)
+            if leaf is None or zoom > self.max_zoom:
+                return item_id
+            shift = self.max_zoom - zoom
+            key = (leaf[0] >> shift, leaf[1] >> shift)
+            if self._levels[zoom][key][0] == 1:
+                return item_id
+            return ('cluster', zoom) + key
+
+    def _single_item(self, zoom, key):
+        """Find the only item below a cell with count == 1"""
+        cx, cy = key
+        for _ in range(self.max_zoom - zoom):
+            level = self._levels[zoom + 1]
+            for child in ((2 * cx, 2 * cy), (2 * cx + 1, 2 * cy),
+                          (2 * cx, 2 * cy + 1), (2 * cx + 1, 2 * cy + 1)):
+                if child in level:
+                    cx, cy = child
+                    break
+            zoom += 1
+        return next(iter(self._leaves[(cx, cy)].values()))
+
+    def _cell_range(self, bbox, zoom, cell_size):
+        min_lat, min_lon, max_lat, max_lon = bbox
+        x0, y0 = world_pixel(max_lat, min_lon, zoom)  # top-left
+        x1, y1 = world_pixel(min_lat, max_lon, zoom)  # bottom-right
+        return (int(x0 // cell_size), int(y0 // cell_size),
+                int(x1 // cell_size), int(y1 // cell_size))
+
+    @staticmethod
+    def _cells_in(level, cx0, cy0, cx1, cy1):
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(level):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = level.get((cx, cy))
+                    if cell is not None:
+                        yield (cx, cy), cell
+        else:
+            for key, cell in level.items():
+                if cx0 <= key[0] <= cx1 and cy0 <= key[1] <= cy1:
+                    yield key, cell
+
+    def get_clusters(self, bbox, zoom):
+        """
+        Clusters and single items inside bbox (min_lat, min_lon, max_lat, max_lon)
+        at an integer map zoom.
+        """
+        zoom = max(self.min_zoom, int(zoom))
+        clusters = []
+        with self._lock:
+            if zoom > self.max_zoom:
+                cx0, cy0, cx1, cy1 = self._cell_range(bbox, self.max_zoom, self.cell_size)
+                for key, items in self._cells_in(self._leaves, cx0, cy0, cx1, cy1):
+                    for item in items.values():
+                        clusters.append(Cluster(item['id'], zoom, item['lat'], item['lon'],
+                                                1, item))
+                return clusters
+
+            level = self._levels[zoom]
+            cx0, cy0, cx1, cy1 = self._cell_range(bbox, zoom, self.cell_size)
+            for key, (count, lat_sum, lon_sum) in self._cells_in(level, cx0, cy0, cx1, cy1):
+                if count == 1:
+                    item = self._single_item(zoom, key)
+                    clusters.append(Cluster(item['id'], zoom, item['lat'], item['lon'], 1, item))
+                else:
+                    clusters.append(Cluster(('cluster', zoom) + key, zoom,
+                                            lat_sum / count, lon_sum / count, count))
+        return clusters
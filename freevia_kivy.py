@@ -1,90 +1,55 @@
 import sys
 import threading
+import time
 import urllib.parse
 import os
-try:
-    from plyer import gps
-except ImportError:
-    gps = None
-try:
-    from PIL import Image, ImageDraw
-except ImportError:
-    print("PIL kütüphanesi bulunamadı. 'pip install Pillow' ile yükleyin.")
-    Image = None
-    ImageDraw = None
-import requests
+from collections import OrderedDict, deque
 
 # Cross-platform geolocation function
-def get_user_location(callback=None):
+def get_user_location(callback=None, max_age=None):
     """
     Attempts to get the user's location:
+    - A cached fix younger than max_age (default: the TTL of its source) is
+      used right away.
     - On Android/iOS: uses Plyer GPS (calls callback with (lat, lon)).
     - On desktop: uses IP-based geolocation (returns (lat, lon)).
     If callback is provided, calls it with the result (async for mobile).
     """
-    platform = sys.platform
-    if platform in ("android", "ios") and gps is not None:
-        # Mobile: use Plyer GPS
-        def on_location(**kwargs):
-            lat = kwargs.get('lat')
-            lon = kwargs.get('lon')
-            if lat is not None and lon is not None:
-                print(f"GPS Location found: {lat}, {lon}")
-                if callback:
-                    callback((lat, lon))
-            else:
-                print("GPS Location data incomplete")
-                if callback:
-                    callback(None)
-
-        def on_status(status_type, status):
-            print(f"GPS Status: {status_type} - {status}")
-            if status_type == 'provider-disabled':
-                print("GPS is disabled. Please enable GPS in settings.")
+    mobile = gps_available()
+    cached = get_location_cache().best((SOURCE_GPS,) if mobile else (SOURCE_GPS, SOURCE_IP),
+                                       max_age)
+    if cached:
+        result = (cached['lat'], cached['lon'])
+        print(f"Cached {cached['source']} location: {result[0]}, {result[1]}")
+        if callback:
+            callback(result)
+        return result
+    
+    if mobile:
+        # Mobile: one shared GPS session; the receiver stops after a good fix
+        def on_fix(fix):
+            if fix is None:
+                print("GPS location not available")
                 if callback:
                     callback(None)
-
-        try:
-            # Request location permissions
-            print("Requesting GPS location...")
-            gps.configure(on_location=on_location, on_status=on_status)
-            gps.start(minTime=1000, minDistance=1)
-        except NotImplementedError:
-            print("GPS not available on this platform")
-            if callback:
-                callback(None)
-        except Exception as e:
-            print(f"GPS Error: {e}")
+                return
+            lat, lon, accuracy = fix
+            print(f"GPS Location found: {lat}, {lon} (±{accuracy} m)")
+            get_location_cache().put(SOURCE_GPS, lat, lon, accuracy)
             if callback:
-                callback(None)
+                callback((lat, lon))
+        
+        get_gps_session().request_fix(on_fix)
     else:
         # Desktop: use multiple IP-based geolocation services for better accuracy
         def fetch_ip_location():
             print("Fetching location from IP...")
-            services = [
-                ('https://ipapi.co/json/', lambda d: (d.get('latitude'), d.get('longitude'))),
-                ('http://ip-api.com/json/', lambda d: (d.get('lat'), d.get('lon'))),
-                ('https://ipinfo.io/json', lambda d: tuple(map(float, d.get('loc', '').split(','))) if d.get('loc') else (None, None)),
-                ('https://geolocation-db.com/json/', lambda d: (d.get('latitude'), d.get('longitude')))
-            ]
-            
-            for service_url, parser in services:
-                try:
-                    print(f"Trying service: {service_url}")
-                    headers = {'User-Agent': 'FreeviaApp/1.0'}
-                    resp = requests.get(service_url, timeout=10, headers=headers)
-                    data = resp.json()
-                    lat, lon = parser(data)
-                    
-                    if lat is not None and lon is not None:
-                        result = (float(lat), float(lon))
-                        print(f"IP Location found via {service_url}: {lat}, {lon}")
-                        break
-                    else:
-                        print(f"No valid location data from {service_url}")
-                except Exception as e:
-                    print(f"Error with {service_url}: {e}")
-                    continue
+            found = get_ip_locator().locate()
+            if found:
+                lat, lon, provider = found
+                result = (lat, lon)
+                print(f"IP Location found via {provider}: {lat}, {lon}")
+                get_location_cache().put(SOURCE_IP, *result)
             else:
                 result = None
                 print("All IP location services failed")
@@ -99,65 +64,6 @@ def get_user_location(callback=None):
         else:
             return fetch_ip_location()
 
-def create_blue_pin():
-    """Create a blue pin marker for user location"""
-    if Image is None or ImageDraw is None:
-        print("PIL not available, cannot create blue pin")
-        return None
-    
-    # Create a blue pin marker (64x64 pixels)
-    size = 64
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
-    # Pin colors (iOS blue)
-    pin_color = (0, 122, 255, 255)  # iOS blue
-    border_color = (255, 255, 255, 255)  # White border
-    
-    # Draw pin shape
-    center_x, center_y = size // 2, size // 2 - 8
-    pin_radius = 18
-    
-    # Pin circle with white border
-    draw.ellipse([center_x - pin_radius - 2, center_y - pin_radius - 2, 
-                  center_x + pin_radius + 2, center_y + pin_radius + 2], 
-                 fill=border_color)
-    draw.ellipse([center_x - pin_radius, center_y - pin_radius, 
-                  center_x + pin_radius, center_y + pin_radius], 
-                 fill=pin_color)
-    
-    # Pin point
-    point_width = 8
-    point_height = 16
-    draw.polygon([
-        (center_x, center_y + pin_radius),
-        (center_x - point_width, center_y + pin_radius + point_height),
-        (center_x + point_width, center_y + pin_radius + point_height)
-    ], fill=pin_color)
-    
-    # Inner dot
-    dot_radius = 6
-    draw.ellipse([center_x - dot_radius, center_y - dot_radius, 
-                  center_x + dot_radius, center_y + dot_radius], 
-                 fill=(255, 255, 255, 255))
-    
-    return img
-
-def ensure_blue_pin_exists():
-    """Ensure blue pin image exists, create if not"""
-    blue_pin_path = get_data_file_path('blue_pin.png')
-    if not os.path.exists(blue_pin_path):
-        try:
-            pin = create_blue_pin()
-            if pin:
-                pin.save(blue_pin_path)
-                print(f"Blue pin marker created: {blue_pin_path}")
-                return blue_pin_path
-        except Exception as e:
-            print(f"Could not create blue pin: {e}")
-            return None
-    return blue_pin_path
-
 import kivy
 from kivy.app import App
 from kivy.uix.screenmanager import ScreenManager, Screen, FadeTransition
@@ -170,10 +76,14 @@ from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
 from kivy.uix.popup import Popup
+from kivy.uix.image import Image
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.clock import Clock
 from kivy.graphics import Color, RoundedRectangle, Rectangle
 from kivy.uix.widget import Widget
-from kivy.metrics import dp
+from kivy.metrics import dp, Metrics
 from kivy.utils import get_color_from_hex
 from kivy.animation import Animation
 
@@ -194,9 +104,20 @@ IOS_COLORS = {
     'tint': get_color_from_hex('#007AFF')
 }
 
-import csv
-import os
-from kivy_garden.mapview import MapView, MapMarker
+from user_store import UserStore, FLUSH_IMMEDIATE
+from item_store import ItemStore
+from clustering import ClusterIndex, Cluster
+from search_index import SearchIndex, IncrementalSearch, tokenize
+from location_cache import LocationCache, SOURCE_GPS, SOURCE_IP
+from geolocation import IPLocator, MODE_RACE
+from http_client import close_client as close_http_client
+from gps_session import GPSSession
+from marker_icons import IconAtlas, MarkerIcons, PIN_BLUE
+from photo_pipeline import PhotoPipeline
+from thumbnail_loader import ThumbnailLoader
+# plyer, PIL, requests, mapview (with the tile modules) and the photo and tile
+# stores are imported where they are first used, so starting the app on the
+# sign-in screen skips them
 
 # Cross-platform file path handling
 def get_app_data_dir():
@@ -205,7 +126,6 @@ def get_app_data_dir():
         # iOS: Use Documents directory
         from kivy.utils import platform
         if platform == "ios":
-            import os
             return os.path.expanduser('~/Documents')
     elif sys.platform == "android":
         # Android: Use external storage
@@ -223,6 +143,104 @@ def get_data_file_path(filename):
     return os.path.join(data_dir, filename)
 
 USERS_FILE = get_data_file_path('users.csv')
+# FLUSH_IMMEDIATE fsyncs every registration; FLUSH_BATCHED group-commits them
+USERS_FLUSH_POLICY = FLUSH_IMMEDIATE
+ITEMS_FILE = get_data_file_path('items.jsonl')
+LOCATION_CACHE_FILE = get_data_file_path('location_cache.json')
+# How long (s) a cached location fix is reused before asking GPS / IP services again
+LOCATION_TTL = {SOURCE_GPS: 120, SOURCE_IP: 6 * 3600}
+# MODE_RACE asks the geolocation.RACE_WIDTH best-ranked IP geolocation services at once
+# (the next ones if all of them fail), MODE_SEQUENTIAL one by one
+IP_LOCATION_MODE = MODE_RACE
+IP_LOCATION_TIMEOUT = 10
+# Map tiles are cached here; least recently used tiles are deleted beyond these limits
+TILE_CACHE_DIR = get_data_file_path('cache')
+TILE_CACHE_MAX_MB = 50
+TILE_CACHE_MAX_TILES = 5000
+# 'files' keeps one PNG per tile in TILE_CACHE_DIR; 'archive' packs them into one
+# MBTiles file (existing loose tiles are imported into it on first use). The
+# archive needs sqlite3 (in the buildozer requirements); without it 'files' is used
+TILE_STORAGE = 'files'
+# Typical size of an OSM tile, to turn the cache size limit into a tile count
+TILE_BYTES_ESTIMATE = 20 * 1024
+TILE_ARCHIVE_FILE = os.path.join(TILE_CACHE_DIR, 'tiles.mbtiles')
+# "Çevrimdışı" downloads tiles this far (km) around the user over these zoom levels
+PREFETCH_RADIUS_KM = 3
+PREFETCH_MIN_ZOOM = 10
+PREFETCH_MAX_ZOOM = 16
+# While the map moves, tiles ahead of the motion are prefetched at most this often (s)
+PREDICT_INTERVAL = 0.1
+# Shared item photos are downscaled to PHOTO_MAX_SIZE px, with a THUMBNAIL_SIZE px
+# thumbnail for lists and callouts, and stored here by PHOTO_WORKERS threads
+PHOTO_DIR = get_data_file_path('photos')
+PHOTO_MAX_SIZE = 1600
+THUMBNAIL_SIZE = 256
+PHOTO_QUALITY = 80
+PHOTO_WORKERS = 2
+# Photos no item uses are deleted PHOTO_GC_DELAY (s) after startup, once they
+# have been unused for PHOTO_GC_GRACE (s)
+PHOTO_GC_DELAY = 30
+PHOTO_GC_GRACE = 24 * 3600
+# Decoded thumbnails are kept in memory up to THUMBNAIL_MEMORY_MB, and those of
+# large photos on disk in THUMBNAIL_CACHE_DIR up to THUMBNAIL_DISK_MB
+THUMBNAIL_CACHE_DIR = get_data_file_path('thumbnail_cache')
+THUMBNAIL_MEMORY_MB = 32
+THUMBNAIL_DISK_MB = 20
+# Viewport marker loading: items inside the visible map plus this margin (px)
+# get markers, refreshed this long (s) after the map stops moving
+MARKER_MARGIN = 200
+# Rendered marker pins are kept here between runs
+MARKER_ICON_DIR = get_data_file_path('marker_icons')
+MARKER_REFRESH_DELAY = 0.15
+MAX_VISIBLE_MARKERS = 2000
+# Items are grouped into count markers up to this zoom level
+CLUSTER_MAX_ZOOM = 15
+# Search-as-you-type runs this long (s) after the last keystroke; at most
+# SEARCH_HIGHLIGHT_LIMIT best matches are highlighted and the rest are dimmed
+SEARCH_DEBOUNCE = 0.3
+SEARCH_HIGHLIGHT_LIMIT = 500
+SEARCH_DIM_COLOR = [1, 1, 1, 0.35]
+# Screens are built on first navigation; PREWARM_DELAY (s) after startup the
+# likely next screens are built ahead, one per frame
+LAZY_SCREENS = True
+PREWARM_SCREENS = ['dashboard', 'signup']
+PREWARM_DELAY = 1.0
+# "Eşyalarım" list: rows of this height (dp) are filled from pages of
+# MY_ITEMS_PAGE_SIZE items, and the last MY_ITEMS_CACHED_PAGES pages are kept
+MY_ITEMS_ROW_HEIGHT = 76
+MY_ITEMS_PAGE_SIZE = 50
+MY_ITEMS_CACHED_PAGES = 8
+
+# Shown on the map until the first real item is shared
+SAMPLE_ITEMS = [
+    {
+        'id': 'sample-1',
+        'name': 'Eski Kitaplar',
+        'description': 'Roman ve hikaye kitapları, temiz durumda',
+        'lat': 41.0082 + 0.01,
+        'lon': 28.9784 + 0.01,
+        'user': 'Ahmet',
+        'photo': None
+    },
+    {
+        'id': 'sample-2',
+        'name': 'Çalışma Sandalyesi',
+        'description': 'Ofis sandalyesi, biraz kullanım izi var',
+        'lat': 41.0082 - 0.005,
+        'lon': 28.9784 + 0.008,
+        'user': 'Ayşe',
+        'photo': None
+    },
+    {
+        'id': 'sample-3',
+        'name': 'Çocuk Oyuncakları',
+        'description': 'Temiz oyuncaklar, çocuk büyüdü',
+        'lat': 41.0082 + 0.008,
+        'lon': 28.9784 - 0.003,
+        'user': 'Mehmet',
+        'photo': None
+    }
+]
 
 # Custom iOS-style components
 class IOSButton(Button):
@@ -341,31 +359,401 @@ class IOSCard(Widget):
         self.bg_rect.size = self.size
         self.bg_rect.pos = self.pos
 
+class CardBehavior:
+    """
+    Rounded white card with a soft shadow, drawn under a layout's children.
+    The two rectangles are created once per card and follow it through a
+    single pos/size binding.
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        with self.canvas.before:
+            Color(0, 0, 0, 0.1)
+            self.shadow_rect = RoundedRectangle(radius=[dp(16)])
+            Color(*IOS_COLORS['card_background'])
+            self.bg_rect = RoundedRectangle(radius=[dp(16)])
+        self.bind(size=self.update_card, pos=self.update_card)
+        self.update_card()
+    
+    def update_card(self, *args):
+        self.shadow_rect.size = (self.width, self.height - dp(2))
+        self.shadow_rect.pos = (self.x, self.y - dp(2))
+        self.bg_rect.size = self.size
+        self.bg_rect.pos = self.pos
+
+class CardLayout(CardBehavior, FloatLayout):
+    """FloatLayout drawn as an iOS card"""
+
+class FeatureCard(ButtonBehavior, CardBehavior, BoxLayout):
+    """Tappable dashboard card: icon, title with a description, and an arrow"""
+    
+    def __init__(self, icon, title, description, **kwargs):
+        kwargs.setdefault('orientation', 'horizontal')
+        kwargs.setdefault('spacing', dp(15))
+        kwargs.setdefault('size_hint_y', None)
+        kwargs.setdefault('height', dp(80))
+        kwargs.setdefault('padding', [dp(20), dp(15)])
+        super().__init__(**kwargs)
+        
+        # Icon
+        icon_label = IOSLabel(text=icon, font_size=dp(28),
+                             size_hint_x=None, width=dp(50),
+                             halign='center', valign='middle')
+        icon_label.bind(size=icon_label.setter('text_size'))
+        self.add_widget(icon_label)
+        
+        # Text content
+        text_layout = BoxLayout(orientation='vertical', spacing=dp(2))
+        
+        title_label = IOSLabel(text=title, font_size=dp(18), bold=True,
+                              size_hint_y=None, height=dp(25),
+                              halign='left', valign='middle')
+        title_label.bind(size=title_label.setter('text_size'))
+        
+        desc_label = IOSLabel(text=description, font_size=dp(14),
+                             color=IOS_COLORS['text_secondary'],
+                             size_hint_y=None, height=dp(35),
+                             halign='left', valign='top')
+        desc_label.bind(size=desc_label.setter('text_size'))
+        
+        text_layout.add_widget(title_label)
+        text_layout.add_widget(desc_label)
+        self.add_widget(text_layout)
+        
+        # Arrow
+        arrow_label = IOSLabel(text='›', font_size=dp(24),
+                              color=IOS_COLORS['text_secondary'],
+                              size_hint_x=None, width=dp(30),
+                              halign='center', valign='middle')
+        arrow_label.bind(size=arrow_label.setter('text_size'))
+        self.add_widget(arrow_label)
+
+# Messages waiting behind the open popup; older ones are dropped past this
+POPUP_QUEUE_LIMIT = 5
+
+class PopupService:
+    """
+    One iOS-style message popup shared by every screen.
+    - The Popup, its label and its button are built on first use and reused;
+      showing a message only changes the title and text.
+    - Messages that arrive while the popup is open wait in a queue. Tamam (or
+      tapping outside) shows the next one in place, so popups never stack.
+    - Logging out calls clear(), so the next user never sees messages meant
+      for the previous one. Screen changes keep the queue: some messages are
+      shown just before navigating.
+    """
+    
+    def __init__(self, queue_limit=POPUP_QUEUE_LIMIT):
+        self._popup = None
+        self._label = None
+        self._queue = deque(maxlen=queue_limit)
+        self._open = False
+        self._current = None  # (title, message) on screen
+    
+    def _build(self):
+        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
+        self._label = IOSLabel(font_size=dp(16), color=IOS_COLORS['text_primary'],
+                               text_size=(dp(250), None), halign='center')
+        content.add_widget(self._label)
+        ok_button = IOSButton(text='Tamam', size_hint_y=None, height=dp(44))
+        content.add_widget(ok_button)
+        self._popup = Popup(content=content, size_hint=(0.8, 0.4),
+                            background_color=IOS_COLORS['card_background'])
+        ok_button.bind(on_press=self._popup.dismiss)
+        self._popup.bind(on_dismiss=self._on_dismiss)
+    
+    def show(self, title, message):
+        if self._open:
+            # Repeated taps must not queue the same message again
+            if (title, message) != self._current and (title, message) not in self._queue:
+                self._queue.append((title, message))
+            return
+        if self._popup is None:
+            self._build()
+        self._set_message(title, message)
+        self._open = True
+        self._popup.open()
+    
+    def _set_message(self, title, message):
+        self._current = (title, message)
+        self._popup.title = title
+        self._label.text = message
+    
+    def _on_dismiss(self, popup):
+        if self._queue:
+            self._set_message(*self._queue.popleft())
+            return True  # keep the popup open for the next message
+        self._open = False
+        self._current = None
+    
+    def clear(self):
+        """Drop queued messages and close the popup"""
+        self._queue.clear()
+        if self._open:
+            self._popup.dismiss(animation=False)
+
+_popup_service = None
+
+def get_popup_service():
+    """Get the shared message popup, creating it on first use"""
+    global _popup_service
+    if _popup_service is None:
+        _popup_service = PopupService()
+    return _popup_service
+
+def show_ios_popup(title, message):
+    """Show an iOS-style message popup, after any message already on screen"""
+    get_popup_service().show(title, message)
+
+_user_store = None
+
+def get_user_store():
+    """Get the shared user store, creating it on first use"""
+    global _user_store
+    if _user_store is None or _user_store.path != USERS_FILE:
+        _user_store = UserStore(USERS_FILE, flush_policy=USERS_FLUSH_POLICY)
+    return _user_store
+
+_item_store = None
+
+def get_item_store():
+    """Get the shared item store, creating it on first use"""
+    global _item_store
+    if _item_store is None or _item_store.path != ITEMS_FILE:
+        _item_store = ItemStore(ITEMS_FILE)
+    return _item_store
+
+_location_cache = None
+
+def get_location_cache():
+    """Get the shared location cache, creating it on first use"""
+    global _location_cache
+    if _location_cache is None or _location_cache.path != LOCATION_CACHE_FILE:
+        _location_cache = LocationCache(LOCATION_CACHE_FILE, ttl=LOCATION_TTL)
+    return _location_cache
+
+_gps = False  # plyer's gps facade; False until imported, None without plyer
+
+def get_gps():
+    """Import plyer's gps facade on first use"""
+    global _gps
+    if _gps is False:
+        try:
+            from plyer import gps as _gps
+        except ImportError:
+            _gps = None
+    return _gps
+
+_gps_session = None
+
+def get_gps_session():
+    """Get the GPS session shared by every location request (mobile only)"""
+    global _gps_session
+    if _gps_session is None:
+        _gps_session = GPSSession(get_gps())
+    return _gps_session
+
+def gps_available():
+    return sys.platform in ("android", "ios") and get_gps() is not None
+
+_tile_cache = None
+
+def get_tile_cache():
+    """Get the shared map tile cache, creating it on first use"""
+    global _tile_cache
+    from tile_cache import TileCache
+    if _tile_cache is None or _tile_cache.cache_dir != TILE_CACHE_DIR:
+        _tile_cache = TileCache(TILE_CACHE_DIR, max_bytes=TILE_CACHE_MAX_MB * 1024 * 1024,
+                                max_tiles=TILE_CACHE_MAX_TILES)
+    return _tile_cache
+
+_tile_archive = None
+
+def get_tile_archive():
+    """Get the shared MBTiles tile archive, importing the loose tile cache when it is new"""
+    global _tile_archive
+    from tile_archive import TileArchive
+    if _tile_archive is None or _tile_archive.path != TILE_ARCHIVE_FILE:
+        is_new = not os.path.exists(TILE_ARCHIVE_FILE)
+        _tile_archive = TileArchive(TILE_ARCHIVE_FILE, max_bytes=TILE_CACHE_MAX_MB * 1024 * 1024)
+        if is_new and os.path.isdir(TILE_CACHE_DIR):
+            count = _tile_archive.import_directory(TILE_CACHE_DIR)
+            print(f"Imported {count} cached tiles into {TILE_ARCHIVE_FILE}")
+    return _tile_archive
+
+def get_tile_store():
+    """The tile cache or archive MapView tiles are kept in, depending on TILE_STORAGE"""
+    if TILE_STORAGE == 'archive':
+        try:
+            return get_tile_archive()
+        except ImportError as e:
+            print(f"Tile archive unavailable ({e}); keeping tiles as files")
+    return get_tile_cache()
+
+def tile_store_capacity(store):
+    """Roughly how many tiles a tile cache or archive keeps before evicting, None if unbounded"""
+    limits = []
+    if store.max_bytes is not None:
+        limits.append(store.max_bytes // TILE_BYTES_ESTIMATE)
+    if getattr(store, 'max_tiles', None) is not None:
+        limits.append(store.max_tiles)
+    return min(limits) if limits else None
+
+_ip_locator = None
+
+def get_ip_locator():
+    """Get the shared IP geolocation client; it keeps per-provider statistics"""
+    global _ip_locator
+    if _ip_locator is None:
+        _ip_locator = IPLocator(mode=IP_LOCATION_MODE, timeout=IP_LOCATION_TIMEOUT)
+    return _ip_locator
+
+_marker_icons = None
+
+def get_marker_icons():
+    """Get the shared marker icon renderer, creating it on first use"""
+    global _marker_icons
+    if _marker_icons is None or _marker_icons.cache_dir != MARKER_ICON_DIR:
+        _marker_icons = MarkerIcons(MARKER_ICON_DIR)
+    return _marker_icons
+
+def marker_texture(**spec):
+    """Shared texture of a marker pin at the screen density, or None without PIL"""
+    try:
+        return get_marker_icons().texture(scale=Metrics.density, **spec)
+    except ImportError:
+        print("PIL kütüphanesi bulunamadı. 'pip install Pillow' ile yükleyin.")
+        return None
+
+_marker_atlas = None
+
+def get_marker_atlas():
+    """Get the atlas texture item markers are drawn from, creating it on first use"""
+    global _marker_atlas
+    icons = get_marker_icons()
+    if _marker_atlas is None or _marker_atlas.icons is not icons:
+        _marker_atlas = IconAtlas(icons)
+    return _marker_atlas
+
+_photo_store = None
+# The GC thread may ask for the store while the main thread creates it; a
+# second store subscribed to the items would count every reference twice
+_photo_store_lock = threading.Lock()
+
+def get_photo_store():
+    """Get the content-addressed photo store, its references kept in sync with the items"""
+    global _photo_store
+    from blob_store import BlobStore
+    store = get_item_store()
+    with _photo_store_lock:
+        if (_photo_store is None or _photo_store[0] is not store
+                or _photo_store[1].root != PHOTO_DIR):
+            blobs = BlobStore(PHOTO_DIR, grace=PHOTO_GC_GRACE)
+            store.subscribe(blobs.on_store_event)
+            _photo_store = (store, blobs)
+        return _photo_store[1]
+
+_photo_pipeline = None
+
+def get_photo_pipeline():
+    """Get the shared photo pipeline, creating it on first use"""
+    global _photo_pipeline
+    blobs = get_photo_store()
+    if _photo_pipeline is None or _photo_pipeline.blobs is not blobs:
+        _photo_pipeline = PhotoPipeline(PHOTO_DIR, max_size=PHOTO_MAX_SIZE,
+                                        thumbnail_size=THUMBNAIL_SIZE, quality=PHOTO_QUALITY,
+                                        workers=PHOTO_WORKERS, blobs=blobs)
+    return _photo_pipeline
+
+_thumbnail_loader = None
+
+def get_thumbnail_loader():
+    """Get the shared thumbnail loader, creating it on first use"""
+    global _thumbnail_loader
+    if _thumbnail_loader is None:
+        _thumbnail_loader = ThumbnailLoader(THUMBNAIL_CACHE_DIR, size=THUMBNAIL_SIZE,
+                                            max_bytes=THUMBNAIL_MEMORY_MB * 1024 * 1024,
+                                            disk_max_bytes=THUMBNAIL_DISK_MB * 1024 * 1024)
+    return _thumbnail_loader
+
+def collect_photo_garbage():
+    """Delete stored photos no item uses any more (blocking; run off the UI thread)"""
+    from blob_store import INDEX_FILE, item_blob_keys
+    if not os.path.exists(os.path.join(PHOTO_DIR, INDEX_FILE)):
+        return  # no photo was ever stored
+    # Photos the items point at are kept whatever their reference count says
+    count, size = get_photo_store().gc(referenced=item_blob_keys(get_item_store()))
+    if count:
+        print(f"Photo store: deleted {count} unused photos, {size / 1024 / 1024:.1f} MB")
+
+_item_clusters = None
+_search_index = None
+# The indexes are built by the loader thread; a second build subscribed to the
+# items would keep a duplicate index in sync
+_item_indexes_lock = threading.RLock()
+
+def get_item_clusters():
+    """Get the cluster index over the item store, built once and kept in sync"""
+    global _item_clusters
+    store = get_item_store()
+    with _item_indexes_lock:
+        if _item_clusters is None or _item_clusters[0] is not store:
+            clusters = ClusterIndex(max_zoom=CLUSTER_MAX_ZOOM)
+            clusters.add_many(store)
+            store.subscribe(clusters.on_store_event)
+            _item_clusters = (store, clusters)
+        return _item_clusters[1]
+
+def get_search_index():
+    """Get the text index over the item store, built once and kept in sync"""
+    global _search_index
+    store = get_item_store()
+    with _item_indexes_lock:
+        if _search_index is None or _search_index[0] is not store:
+            index = SearchIndex()
+            if len(store):
+                index.add_many(store)
+            else:
+                index.add_many(SAMPLE_ITEMS)
+            
+            def on_store_event(event, item):
+                # Sample items are only searchable until the first real item exists
+                for sample in SAMPLE_ITEMS:
+                    index.remove(sample['id'])
+                index.on_store_event(event, item)
+            
+            store.subscribe(on_store_event)
+            _search_index = (store, index)
+        return _search_index[1]
+
+def load_item_indexes(callback):
+    """Load the items and build their cluster and search indexes on a background
+    thread, then call callback(clusters, index) on the main thread"""
+    def load():
+        start = time.perf_counter()
+        get_item_store().load()
+        clusters = get_item_clusters()
+        index = get_search_index()
+        print(f"Item indexes built in {(time.perf_counter() - start) * 1000:.0f} ms")
+        Clock.schedule_once(lambda dt: callback(clusters, index))
+    
+    threading.Thread(target=load, daemon=True).start()
+
 def save_user(username, password):
-    with open(USERS_FILE, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([username, password])
+    """Register a user; False when the name is taken, here or by another process"""
+    # Written before returning, so a name lost to another process is never reported as saved
+    return get_user_store().add(username, password, wait=True)
 
 def user_exists(username):
-    if not os.path.exists(USERS_FILE):
-        return False
-    with open(USERS_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row and row[0] == username:
-                return True
-    return False
+    return get_user_store().exists(username)
 
 def check_user(username, password):
-    if not os.path.exists(USERS_FILE):
-        return False
-    
-    with open(USERS_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row and len(row) >= 2 and row[0] == username and row[1] == password:
-                return True
-    return False
+    return get_user_store().check(username, password)
+
+def get_current_user():
+    """Username signed in to the running app, or None"""
+    return getattr(App.get_running_app(), 'current_user', None)
 
 class SignInScreen(Screen):
     def __init__(self, **kwargs):
@@ -451,42 +839,19 @@ class SignInScreen(Screen):
         pwd = self.password.text.strip()
         
         if not uname or not pwd:
-            self.show_ios_popup('Hata', 'Kullanıcı adı ve şifre gerekli!')
+            show_ios_popup('Hata', 'Kullanıcı adı ve şifre gerekli!')
             return
             
         if check_user(uname, pwd):
-            # Set user in dashboard and navigate there
-            dashboard_screen = self.manager.get_screen('dashboard')
-            dashboard_screen.set_user(uname)
-            profile_screen = self.manager.get_screen('profile')
-            profile_screen.set_user(uname)
+            # Screens read the user when they are entered, so none is built here
+            App.get_running_app().current_user = uname
             self.manager.current = 'dashboard'
         else:
-            self.show_ios_popup('Hata', 'Kullanıcı adı veya şifre yanlış!')
+            show_ios_popup('Hata', 'Kullanıcı adı veya şifre yanlış!')
 
     def goto_signup(self, instance):
         self.manager.current = 'signup'
     
-    def show_ios_popup(self, title, message):
-        """Show iOS-style popup"""
-        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
-        
-        # Message label
-        msg_label = IOSLabel(text=message, font_size=dp(16), 
-                            color=IOS_COLORS['text_primary'], 
-                            text_size=(dp(250), None), halign='center')
-        content.add_widget(msg_label)
-        
-        # OK button
-        ok_button = IOSButton(text='Tamam', size_hint_y=None, height=dp(44))
-        content.add_widget(ok_button)
-        
-        popup = Popup(title=title, content=content, size_hint=(0.8, 0.4),
-                     background_color=IOS_COLORS['card_background'])
-        
-        ok_button.bind(on_press=popup.dismiss)
-        popup.open()
-
 class SignUpScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -570,38 +935,20 @@ class SignUpScreen(Screen):
         uname = self.username.text.strip()
         pwd = self.password.text.strip()
         if not uname or not pwd:
-            self.show_ios_popup('Hata', 'Boş alan bırakmayınız!')
+            show_ios_popup('Hata', 'Boş alan bırakmayınız!')
             return
         if user_exists(uname):
-            self.show_ios_popup('Hata', 'Bu kullanıcı adı zaten var!')
+            show_ios_popup('Hata', 'Bu kullanıcı adı zaten var!')
             return
-        save_user(uname, pwd)
-        self.show_ios_popup('Başarılı', 'Kayıt başarılı!')
+        if not save_user(uname, pwd):
+            show_ios_popup('Hata', 'Bu kullanıcı adı zaten var!')
+            return
+        show_ios_popup('Başarılı', 'Kayıt başarılı!')
         Clock.schedule_once(lambda dt: setattr(self.manager, 'current', 'signin'), 1.5)
 
     def goto_signin(self, instance):
         self.manager.current = 'signin'
     
-    def show_ios_popup(self, title, message):
-        """Show iOS-style popup"""
-        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
-        
-        # Message label
-        msg_label = IOSLabel(text=message, font_size=dp(16), 
-                            color=IOS_COLORS['text_primary'], 
-                            text_size=(dp(250), None), halign='center')
-        content.add_widget(msg_label)
-        
-        # OK button
-        ok_button = IOSButton(text='Tamam', size_hint_y=None, height=dp(44))
-        content.add_widget(ok_button)
-        
-        popup = Popup(title=title, content=content, size_hint=(0.8, 0.4),
-                     background_color=IOS_COLORS['card_background'])
-        
-        ok_button.bind(on_press=popup.dismiss)
-        popup.open()
-
 
 class DashboardScreen(Screen):
     def __init__(self, **kwargs):
@@ -703,93 +1050,7 @@ class DashboardScreen(Screen):
     
     def create_feature_card(self, icon, title, description, callback):
         """Create an iOS-style feature card"""
-        # Card container
-        card = BoxLayout(orientation='horizontal', spacing=dp(15),
-                        size_hint_y=None, height=dp(80),
-                        padding=[dp(20), dp(15)])
-        
-        # Add card background with shadow
-        with card.canvas.before:
-            # Shadow
-            Color(0, 0, 0, 0.1)
-            card.shadow_rect = RoundedRectangle(size=(card.width, card.height-dp(2)), 
-                                              pos=(card.x, card.y-dp(2)), 
-                                              radius=[dp(16)])
-            # Card background
-            Color(*IOS_COLORS['card_background'])
-            card.bg_rect = RoundedRectangle(size=card.size, pos=card.pos, radius=[dp(16)])
-        
-        def update_card_graphics(instance, *args):
-            instance.shadow_rect.size = (instance.width, instance.height-dp(2))
-            instance.shadow_rect.pos = (instance.x, instance.y-dp(2))
-            instance.bg_rect.size = instance.size
-            instance.bg_rect.pos = instance.pos
-        
-        card.bind(size=update_card_graphics, pos=update_card_graphics)
-        
-        # Icon
-        icon_label = IOSLabel(text=icon, font_size=dp(28),
-                             size_hint_x=None, width=dp(50),
-                             halign='center', valign='middle')
-        icon_label.bind(size=icon_label.setter('text_size'))
-        card.add_widget(icon_label)
-        
-        # Text content
-        text_layout = BoxLayout(orientation='vertical', spacing=dp(2))
-        
-        title_label = IOSLabel(text=title, font_size=dp(18), bold=True,
-                              size_hint_y=None, height=dp(25),
-                              halign='left', valign='middle')
-        title_label.bind(size=title_label.setter('text_size'))
-        
-        desc_label = IOSLabel(text=description, font_size=dp(14),
-                             color=IOS_COLORS['text_secondary'],
-                             size_hint_y=None, height=dp(35),
-                             halign='left', valign='top',
-                             text_size=(None, None))
-        desc_label.bind(size=desc_label.setter('text_size'))
-        
-        text_layout.add_widget(title_label)
-        text_layout.add_widget(desc_label)
-        card.add_widget(text_layout)
-        
-        # Arrow
-        arrow_label = IOSLabel(text='›', font_size=dp(24),
-                              color=IOS_COLORS['text_secondary'],
-                              size_hint_x=None, width=dp(30),
-                              halign='center', valign='middle')
-        arrow_label.bind(size=arrow_label.setter('text_size'))
-        card.add_widget(arrow_label)
-        
-        # Make card clickable
-        class ClickableCard(ButtonBehavior, BoxLayout):
-            def __init__(self, **kwargs):
-                super().__init__(**kwargs)
-        
-        clickable_card = ClickableCard(orientation='horizontal', spacing=dp(15),
-                                     size_hint_y=None, height=dp(80),
-                                     padding=[dp(20), dp(15)])
-        
-        # Copy all children and properties to clickable card
-        for child in card.children[:]:
-            card.remove_widget(child)
-            clickable_card.add_widget(child)
-        
-        # Add graphics to clickable card
-        with clickable_card.canvas.before:
-            # Shadow
-            Color(0, 0, 0, 0.1)
-            clickable_card.shadow_rect = RoundedRectangle(size=(clickable_card.width, clickable_card.height-dp(2)), 
-                                                        pos=(clickable_card.x, clickable_card.y-dp(2)), 
-                                                        radius=[dp(16)])
-            # Card background
-            Color(*IOS_COLORS['card_background'])
-            clickable_card.bg_rect = RoundedRectangle(size=clickable_card.size, pos=clickable_card.pos, radius=[dp(16)])
-        
-        clickable_card.bind(size=update_card_graphics, pos=update_card_graphics)
-        clickable_card.bind(on_press=callback)
-        
-        return clickable_card
+        return FeatureCard(icon, title, description, on_press=callback)
     
     def update_background(self, *args):
         self.bg_rect.size = self.size
@@ -800,6 +1061,9 @@ class DashboardScreen(Screen):
         self.current_user = username
         self.greeting_label.text = f'Hoş geldiniz, {username}!'
     
+    def on_pre_enter(self, *args):
+        self.set_user(get_current_user())
+    
     def add_item(self, instance):
         """Navigate to add item screen"""
         self.manager.current = 'add_item'
@@ -810,7 +1074,7 @@ class DashboardScreen(Screen):
     
     def view_my_items(self, instance):
         """View user's shared items"""
-        self.show_ios_popup('Paylaştığım Eşyalar', 'Bu özellik yakında eklenecek!\nBurada daha önce paylaştığınız tüm eşyaları görebileceksiniz.')
+        self.manager.current = 'my_items'
     
     def open_profile(self, instance):
         """Navigate to profile screen"""
@@ -818,31 +1082,11 @@ class DashboardScreen(Screen):
     
     def logout(self, instance):
         """Logout and return to sign in"""
+        get_popup_service().clear()
         self.current_user = None
+        App.get_running_app().current_user = None
         self.manager.current = 'signin'
     
-    def show_ios_popup(self, title, message):
-        """Show iOS-style popup"""
-        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
-        
-        # Message label
-        msg_label = IOSLabel(text=message, font_size=dp(16), 
-                            color=IOS_COLORS['text_primary'], 
-                            text_size=(dp(250), None), halign='center')
-        content.add_widget(msg_label)
-        
-        # OK button
-        ok_button = IOSButton(text='Tamam', size_hint_y=None, height=dp(44))
-        content.add_widget(ok_button)
-        
-        popup = Popup(title=title, content=content, size_hint=(0.8, 0.4),
-                     background_color=IOS_COLORS['card_background'],
-                     title_color=IOS_COLORS['text_primary'],
-                     separator_color=IOS_COLORS['separator'])
-        
-        ok_button.bind(on_press=popup.dismiss)
-        popup.open()
-
 
 class ProfileScreen(Screen):
     def __init__(self, **kwargs):
@@ -877,24 +1121,7 @@ class ProfileScreen(Screen):
         main_layout.add_widget(header_layout)
         
         # Profile info card
-        profile_card = FloatLayout(size_hint_y=None, height=dp(200))
-        
-        # Add card background
-        with profile_card.canvas.before:
-            Color(0, 0, 0, 0.1)
-            profile_card.shadow_rect = RoundedRectangle(size=(profile_card.width, profile_card.height-dp(2)), 
-                                                       pos=(profile_card.x, profile_card.y-dp(2)), 
-                                                       radius=[dp(16)])
-            Color(*IOS_COLORS['card_background'])
-            profile_card.bg_rect = RoundedRectangle(size=profile_card.size, pos=profile_card.pos, radius=[dp(16)])
-        
-        def update_profile_card(instance, *args):
-            instance.shadow_rect.size = (instance.width, instance.height-dp(2))
-            instance.shadow_rect.pos = (instance.x, instance.y-dp(2))
-            instance.bg_rect.size = instance.size
-            instance.bg_rect.pos = instance.pos
-        
-        profile_card.bind(size=update_profile_card, pos=update_profile_card)
+        profile_card = CardLayout(size_hint_y=None, height=dp(200))
         
         # Profile content
         profile_content = BoxLayout(orientation='vertical', spacing=dp(15),
@@ -950,35 +1177,217 @@ class ProfileScreen(Screen):
         self.username_label.text = username
         # You could add more user info here from a database
     
+    def on_pre_enter(self, *args):
+        self.set_user(get_current_user())
+    
     def go_back(self, instance):
         """Go back to dashboard"""
         self.manager.current = 'dashboard'
     
     def edit_profile(self, instance):
         """Edit profile functionality"""
-        self.show_ios_popup('Profil Düzenle', 'Profil düzenleme özelliği yakında eklenecek!')
+        show_ios_popup('Profil Düzenle', 'Profil düzenleme özelliği yakında eklenecek!')
     
     def change_password(self, instance):
         """Change password functionality"""
-        self.show_ios_popup('Şifre Değiştir', 'Şifre değiştirme özelliği yakında eklenecek!')
+        show_ios_popup('Şifre Değiştir', 'Şifre değiştirme özelliği yakında eklenecek!')
     
-    def show_ios_popup(self, title, message):
-        """Show iOS-style popup"""
-        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
+
+class ItemRow(RecycleDataViewBehavior, BoxLayout):
+    """One row of the "Eşyalarım" list; the RecycleView reuses rows while scrolling"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(orientation='horizontal', spacing=dp(12),
+                         padding=[dp(12), dp(8)], **kwargs)
+        with self.canvas.before:
+            Color(*IOS_COLORS['card_background'])
+            self.bg_rect = Rectangle(size=self.size, pos=self.pos)
+            Color(*IOS_COLORS['separator'])
+            self.separator = Rectangle(size=(self.width, 1), pos=self.pos)
+        self.bind(size=self.update_graphics, pos=self.update_graphics)
         
-        msg_label = IOSLabel(text=message, font_size=dp(16), 
-                            color=IOS_COLORS['text_primary'], 
-                            text_size=(dp(250), None), halign='center')
-        content.add_widget(msg_label)
+        # Thumbnails are decoded off the UI thread, with a plain placeholder meanwhile
+        # allow_stretch/keep_ratio rather than fit_mode, which needs Kivy 2.2 (the
+        # minimal build pins 2.1)
+        self.thumbnail = Image(size_hint_x=None, width=dp(56), allow_stretch=True,
+                               keep_ratio=True)
+        self.add_widget(self.thumbnail)
+        self._thumbnail_path = ''
+        self._thumbnail_request = None
+        self._thumbnail_shown = False
+        
+        text_layout = BoxLayout(orientation='vertical')
+        self.name_label = IOSLabel(font_size=dp(17), bold=True, halign='left',
+                                   valign='middle', shorten=True)
+        self.name_label.bind(size=self.name_label.setter('text_size'))
+        self.detail_label = IOSLabel(font_size=dp(14), color=IOS_COLORS['text_secondary'],
+                                     halign='left', valign='middle', shorten=True)
+        self.detail_label.bind(size=self.detail_label.setter('text_size'))
+        text_layout.add_widget(self.name_label)
+        text_layout.add_widget(self.detail_label)
+        self.add_widget(text_layout)
+    
+    def update_graphics(self, *args):
+        self.bg_rect.size = self.size
+        self.bg_rect.pos = self.pos
+        self.separator.size = (self.width, 1)
+        self.separator.pos = self.pos
+    
+    def refresh_view_attrs(self, rv, index, data):
+        row = rv.row_data(index)
+        self.name_label.text = row['name']
+        self.detail_label.text = row['detail']
+        self.load_thumbnail(row['photo'])
+    
+    def load_thumbnail(self, path):
+        """Show path's thumbnail once it is decoded, the placeholder until then"""
+        if self._thumbnail_request is not None:
+            self._thumbnail_request.cancel()
+            self._thumbnail_request = None
+        self._thumbnail_path = path
+        self._thumbnail_shown = False
+        self.thumbnail.opacity = 1 if path else 0
+        if path:
+            loader = get_thumbnail_loader()
+            self.thumbnail.texture = loader.placeholder
+            self.thumbnail.keep_ratio = False  # the 1 px placeholder fills the square
+            request = loader.load(path, self.show_thumbnail)
+            if not self._thumbnail_shown:
+                self._thumbnail_request = request
+    
+    def show_thumbnail(self, texture):
+        self._thumbnail_request = None
+        self._thumbnail_shown = True
+        if texture is not None:
+            self.thumbnail.texture = texture
+            self.thumbnail.keep_ratio = True
+    
+    def on_parent(self, instance, parent):
+        if parent is None:
+            # Scrolled out of view: nobody needs the thumbnail any more
+            if self._thumbnail_request is not None:
+                self._thumbnail_request.cancel()
+                self._thumbnail_request = None
+        elif self._thumbnail_path and not self._thumbnail_shown and self._thumbnail_request is None:
+            # Back in view without a refresh, after its request was cancelled
+            self.load_thumbnail(self._thumbnail_path)
+
+
+class MyItemsScreen(Screen):
+    """
+    The items the user has shared, newest first.
+    - A RecycleView holds one empty entry per item and only builds rows for
+      the visible part of the list, reusing them while scrolling.
+    - Rows read their item from pages of MY_ITEMS_PAGE_SIZE items, fetched
+      from the item store when a row of the page is first shown.
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.current_user = None
+        self._pages = OrderedDict()  # page number -> row dicts, least recently used first
         
-        ok_button = IOSButton(text='Tamam', size_hint_y=None, height=dp(44))
-        content.add_widget(ok_button)
+        # Set background color
+        with self.canvas.before:
+            Color(*IOS_COLORS['background'])
+            self.bg_rect = Rectangle(size=self.size, pos=self.pos)
+        self.bind(size=self.update_background, pos=self.update_background)
+        
+        # Main layout
+        main_layout = BoxLayout(orientation='vertical', spacing=dp(10),
+                               padding=[dp(20), dp(40), dp(20), dp(20)])
+        
+        # Header with back button
+        header_layout = BoxLayout(orientation='horizontal',
+                                 size_hint_y=None, height=dp(50))
         
-        popup = Popup(title=title, content=content, size_hint=(0.8, 0.4),
-                     background_color=IOS_COLORS['card_background'])
+        back_btn = IOSSecondaryButton(text='‹ Geri', size_hint_x=None, width=dp(80))
+        back_btn.bind(on_press=self.go_back)
+        header_layout.add_widget(back_btn)
         
-        ok_button.bind(on_press=popup.dismiss)
-        popup.open()
+        title_label = IOSLabel(text='Eşyalarım', font_size=dp(28), bold=True,
+                              halign='center', valign='middle')
+        title_label.bind(size=title_label.setter('text_size'))
+        header_layout.add_widget(title_label)
+        
+        header_layout.add_widget(Widget(size_hint_x=None, width=dp(80)))  # Spacer
+        
+        main_layout.add_widget(header_layout)
+        
+        self.count_label = IOSLabel(text='', font_size=dp(14),
+                                   color=IOS_COLORS['text_secondary'],
+                                   size_hint_y=None, height=dp(20),
+                                   halign='left', valign='middle')
+        self.count_label.bind(size=self.count_label.setter('text_size'))
+        main_layout.add_widget(self.count_label)
+        
+        # Virtualized list: fixed-height rows, so nothing is measured while scrolling
+        self.item_list = RecycleView(do_scroll_x=False)
+        self.item_list.row_data = self.row_data
+        rows = RecycleBoxLayout(orientation='vertical', size_hint_y=None,
+                                default_size=(None, dp(MY_ITEMS_ROW_HEIGHT)),
+                                default_size_hint=(1, None))
+        rows.bind(minimum_height=rows.setter('height'))
+        self.item_list.add_widget(rows)
+        # viewclass lives on the layout manager; set before add_widget it is dropped
+        self.item_list.viewclass = ItemRow
+        main_layout.add_widget(self.item_list)
+        
+        self.add_widget(main_layout)
+    
+    def update_background(self, *args):
+        self.bg_rect.size = self.size
+        self.bg_rect.pos = self.pos
+    
+    def set_user(self, username):
+        self.current_user = username
+    
+    def on_pre_enter(self, *args):
+        self.set_user(get_current_user())
+    
+    def on_enter(self, *args):
+        self.reload()
+    
+    def reload(self):
+        """Size the list to the user's items; rows load their page when shown"""
+        self._pages.clear()
+        count = get_item_store().count_user(self.current_user)
+        self.count_label.text = (f'{count} eşya paylaştınız' if count
+                                 else 'Henüz eşya paylaşmadınız.')
+        self.item_list.data = [{} for _ in range(count)]
+        self.item_list.scroll_y = 1
+    
+    def row_data(self, index):
+        """Display fields of the index-th item, loading its page if needed"""
+        number, offset = divmod(index, MY_ITEMS_PAGE_SIZE)
+        page = self._pages.get(number)
+        if page is None:
+            items = get_item_store().query_user(self.current_user,
+                                                number * MY_ITEMS_PAGE_SIZE, MY_ITEMS_PAGE_SIZE)
+            page = self._pages[number] = [self.item_row(item) for item in items]
+            while len(self._pages) > MY_ITEMS_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        if offset < len(page):
+            return page[offset]
+        return {'name': '', 'detail': '', 'photo': ''}  # removed since the list was sized
+    
+    @staticmethod
+    def item_row(item):
+        created = item.get('created')
+        date = time.strftime('%d.%m.%Y', time.localtime(created)) if created else ''
+        description = item.get('description', '')
+        photo = item.get('thumbnail') or item.get('photo') or ''
+        return {
+            'name': item.get('name', ''),
+            'detail': f'{date} · {description}' if date else description,
+            'photo': photo if photo and os.path.exists(photo) else '',
+        }
+    
+    def go_back(self, instance):
+        """Go back to dashboard"""
+        self.manager.current = 'dashboard'
 
 
 class AddItemScreen(Screen):
@@ -987,6 +1396,8 @@ class AddItemScreen(Screen):
         self.current_user = None
         self.selected_location = None
         self.photo_path = None
+        self.thumbnail_path = None
+        self._photo_generation = 0  # only the newest photo's result is used
         
         # Set background color
         with self.canvas.before:
@@ -1028,23 +1439,7 @@ class AddItemScreen(Screen):
         main_layout.add_widget(instruction_label)
         
         # Photo section
-        photo_card = FloatLayout(size_hint_y=None, height=dp(200))
-        
-        with photo_card.canvas.before:
-            Color(0, 0, 0, 0.1)
-            photo_card.shadow_rect = RoundedRectangle(size=(photo_card.width, photo_card.height-dp(2)), 
-                                                     pos=(photo_card.x, photo_card.y-dp(2)), 
-                                                     radius=[dp(16)])
-            Color(*IOS_COLORS['card_background'])
-            photo_card.bg_rect = RoundedRectangle(size=photo_card.size, pos=photo_card.pos, radius=[dp(16)])
-        
-        def update_photo_card(instance, *args):
-            instance.shadow_rect.size = (instance.width, instance.height-dp(2))
-            instance.shadow_rect.pos = (instance.x, instance.y-dp(2))
-            instance.bg_rect.size = instance.size
-            instance.bg_rect.pos = instance.pos
-        
-        photo_card.bind(size=update_photo_card, pos=update_photo_card)
+        photo_card = CardLayout(size_hint_y=None, height=dp(200))
         
         # Photo content
         photo_content = BoxLayout(orientation='vertical', spacing=dp(15),
@@ -1065,23 +1460,7 @@ class AddItemScreen(Screen):
         main_layout.add_widget(photo_card)
         
         # Item details card
-        details_card = FloatLayout(size_hint_y=None, height=dp(250))
-        
-        with details_card.canvas.before:
-            Color(0, 0, 0, 0.1)
-            details_card.shadow_rect = RoundedRectangle(size=(details_card.width, details_card.height-dp(2)), 
-                                                       pos=(details_card.x, details_card.y-dp(2)), 
-                                                       radius=[dp(16)])
-            Color(*IOS_COLORS['card_background'])
-            details_card.bg_rect = RoundedRectangle(size=details_card.size, pos=details_card.pos, radius=[dp(16)])
-        
-        def update_details_card(instance, *args):
-            instance.shadow_rect.size = (instance.width, instance.height-dp(2))
-            instance.shadow_rect.pos = (instance.x, instance.y-dp(2))
-            instance.bg_rect.size = instance.size
-            instance.bg_rect.pos = instance.pos
-        
-        details_card.bind(size=update_details_card, pos=update_details_card)
+        details_card = CardLayout(size_hint_y=None, height=dp(250))
         
         # Details content
         details_content = BoxLayout(orientation='vertical', spacing=dp(15),
@@ -1128,23 +1507,7 @@ class AddItemScreen(Screen):
         main_layout.add_widget(details_card)
         
         # Location section
-        location_card = FloatLayout(size_hint_y=None, height=dp(120))
-        
-        with location_card.canvas.before:
-            Color(0, 0, 0, 0.1)
-            location_card.shadow_rect = RoundedRectangle(size=(location_card.width, location_card.height-dp(2)), 
-                                                        pos=(location_card.x, location_card.y-dp(2)), 
-                                                        radius=[dp(16)])
-            Color(*IOS_COLORS['card_background'])
-            location_card.bg_rect = RoundedRectangle(size=location_card.size, pos=location_card.pos, radius=[dp(16)])
-        
-        def update_location_card(instance, *args):
-            instance.shadow_rect.size = (instance.width, instance.height-dp(2))
-            instance.shadow_rect.pos = (instance.x, instance.y-dp(2))
-            instance.bg_rect.size = instance.size
-            instance.bg_rect.pos = instance.pos
-        
-        location_card.bind(size=update_location_card, pos=update_location_card)
+        location_card = CardLayout(size_hint_y=None, height=dp(120))
         
         # Location content
         location_content = BoxLayout(orientation='vertical', spacing=dp(10),
@@ -1191,13 +1554,69 @@ class AddItemScreen(Screen):
         """Go back to dashboard"""
         self.manager.current = 'dashboard'
     
+    def set_user(self, username):
+        """Set the user that shared items are attributed to"""
+        self.current_user = username
+    
+    def on_pre_enter(self, *args):
+        self.set_user(get_current_user())
+    
     def take_photo(self, instance):
-        """Take or select photo"""
-        # For now, simulate photo taken
+        """Take a photo with the camera, or pick a picture where there is none"""
+        try:
+            from plyer import camera
+            camera.take_picture(filename=get_data_file_path('camera.jpg'),
+                                on_complete=self.add_photo)
+            return
+        except (ImportError, NotImplementedError):
+            pass
+        try:
+            from plyer import filechooser
+            filechooser.open_file(on_selection=lambda paths: paths and self.add_photo(paths[0]),
+                                  filters=[['Fotoğraflar', '*.jpg', '*.jpeg', '*.png', '*.webp']])
+            return
+        except (ImportError, NotImplementedError):
+            pass
+        # No camera or file picker on this platform: simulate a photo
         self.photo_path = "photo_placeholder.jpg"
         self.photo_label.text = '✅ Fotoğraf seçildi'
         self.photo_label.color = IOS_COLORS['success']
-        self.show_ios_popup('Fotoğraf', 'Fotoğraf özelliği yakında eklenecek!\nŞimdilik fotoğraf seçildi olarak işaretlendi.')
+        show_ios_popup('Fotoğraf', 'Fotoğraf özelliği yakında eklenecek!\nŞimdilik fotoğraf seçildi olarak işaretlendi.')
+    
+    def add_photo(self, path):
+        """Downscale and store a taken photo on the photo workers (any thread)"""
+        if not path or not os.path.exists(path):
+            return
+        
+        def start(dt):
+            self._photo_generation += 1
+            generation = self._photo_generation
+            self.photo_path = None
+            self.photo_label.text = '⏳ Fotoğraf hazırlanıyor...'
+            self.photo_label.color = IOS_COLORS['text_secondary']
+            get_photo_pipeline().submit(
+                path, lambda result: Clock.schedule_once(
+                    lambda dt: self.photo_ready(generation, result)))
+        
+        Clock.schedule_once(start)
+    
+    def photo_ready(self, generation, result):
+        """Show the processed photo; results of replaced photos are ignored"""
+        if generation != self._photo_generation:
+            return
+        if result is None:
+            self.photo_label.text = '📷'
+            self.photo_label.color = IOS_COLORS['text_primary']
+            show_ios_popup('Hata', 'Fotoğraf işlenemedi. Lütfen tekrar deneyin.')
+            return
+        self.photo_path = result['photo']
+        self.thumbnail_path = result['thumbnail']
+        self.photo_label.text = '✅ Fotoğraf seçildi'
+        self.photo_label.color = IOS_COLORS['success']
+        timings = ', '.join(f"{stage} {seconds * 1000:.0f} ms"
+                            for stage, seconds in result['timings'].items())
+        print(f"Photo {result['size'][0]}x{result['size'][1]}, "
+              f"{result['bytes'] / 1024:.0f} KB: {timings}")
     
     def use_current_location(self, instance):
         """Use current location"""
@@ -1208,64 +1627,67 @@ class AddItemScreen(Screen):
                 self.location_label.text = f'📍 Mevcut konum ({lat:.4f}, {lon:.4f})'
                 self.location_label.color = IOS_COLORS['success']
             else:
-                self.show_ios_popup('Konum Hatası', 'Mevcut konum alınamadı. Lütfen haritadan seçin.')
+                show_ios_popup('Konum Hatası', 'Mevcut konum alınamadı. Lütfen haritadan seçin.')
         
         get_user_location(callback=on_location_found)
     
     def select_from_map(self, instance):
         """Select location from map"""
-        self.show_ios_popup('Harita Seçimi', 'Haritadan konum seçme özelliği yakında eklenecek!')
+        show_ios_popup('Harita Seçimi', 'Haritadan konum seçme özelliği yakında eklenecek!')
     
     def share_item(self, instance):
         """Share the item"""
         # Validate inputs
         if not self.item_name.text.strip():
-            self.show_ios_popup('Hata', 'Lütfen eşya adını girin.')
+            show_ios_popup('Hata', 'Lütfen eşya adını girin.')
             return
         
         if not self.item_description.text.strip():
-            self.show_ios_popup('Hata', 'Lütfen eşya açıklamasını girin.')
+            show_ios_popup('Hata', 'Lütfen eşya açıklamasını girin.')
             return
         
         if not self.photo_path:
-            self.show_ios_popup('Hata', 'Lütfen fotoğraf çekin.')
+            show_ios_popup('Hata', 'Lütfen fotoğraf çekin.')
             return
         
         if not self.selected_location:
-            self.show_ios_popup('Hata', 'Lütfen konum seçin.')
+            show_ios_popup('Hata', 'Lütfen konum seçin.')
+            return
+        
+        lat, lon = self.selected_location
+        try:
+            item = get_item_store().add({
+                'name': self.item_name.text.strip(),
+                'description': self.item_description.text.strip(),
+                'lat': lat,
+                'lon': lon,
+                'user': self.current_user,
+                'photo': self.photo_path,
+                'thumbnail': self.thumbnail_path
+            })
+        except Exception as e:
+            print(f"Could not save item: {e}")
+            show_ios_popup('Hata', 'Eşya kaydedilemedi. Lütfen tekrar deneyin.')
             return
         
-        # For now, just show success message
-        self.show_ios_popup('Başarılı!', 'Eşyanız başarıyla paylaşıldı!\nDiğer kullanıcılar artık haritada görebilir.')
+        # Show the new item on the map right away
+        if self.manager and self.manager.has_screen('map'):
+            self.manager.get_screen('map').add_item_marker(item)
+        
+        show_ios_popup('Başarılı!', 'Eşyanız başarıyla paylaşıldı!\nDiğer kullanıcılar artık haritada görebilir.')
         
         # Clear form
         self.item_name.text = ''
         self.item_description.text = ''
         self.photo_path = None
+        self.thumbnail_path = None
+        self._photo_generation += 1
         self.selected_location = None
         self.photo_label.text = '📷'
         self.photo_label.color = IOS_COLORS['text_primary']
         self.location_label.text = '📍 Konum seçilmedi'
         self.location_label.color = IOS_COLORS['text_secondary']
     
-    def show_ios_popup(self, title, message):
-        """Show iOS-style popup"""
-        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
-        
-        msg_label = IOSLabel(text=message, font_size=dp(16), 
-                            color=IOS_COLORS['text_primary'], 
-                            text_size=(dp(250), None), halign='center')
-        content.add_widget(msg_label)
-        
-        ok_button = IOSButton(text='Tamam', size_hint_y=None, height=dp(44))
-        content.add_widget(ok_button)
-        
-        popup = Popup(title=title, content=content, size_hint=(0.8, 0.4),
-                     background_color=IOS_COLORS['card_background'])
-        
-        ok_button.bind(on_press=popup.dismiss)
-        popup.open()
-
 
 class MapScreen(Screen):
 
@@ -1301,19 +1723,7 @@ class MapScreen(Screen):
         layout.add_widget(nav_layout)
         
         # Search card with iOS styling
-        search_card = FloatLayout(size_hint_y=None, height=dp(130))
-        
-        # Add card background with subtle shadow effect
-        with search_card.canvas.before:
-            # Shadow
-            Color(0, 0, 0, 0.1)
-            search_card.shadow_rect = RoundedRectangle(size=(search_card.width, search_card.height-dp(2)), 
-                                                     pos=(search_card.x, search_card.y-dp(2)), 
-                                                     radius=[dp(16)])
-            # Card background
-            Color(*IOS_COLORS['card_background'])
-            search_card.bg_rect = RoundedRectangle(size=search_card.size, pos=search_card.pos, radius=[dp(16)])
-        search_card.bind(size=self.update_search_card, pos=self.update_search_card)
+        search_card = CardLayout(size_hint_y=None, height=dp(130))
         
         # Search content
         search_content = BoxLayout(orientation='vertical', spacing=dp(10), 
@@ -1332,42 +1742,42 @@ class MapScreen(Screen):
             foreground_color=[0, 0, 0, 1],
             cursor_color=[0, 0.48, 1, 1]
         )
+        self.search_input.bind(text=self.schedule_incremental_search)
         search_content.add_widget(self.search_input)
         
         # Button layout
         button_layout = BoxLayout(orientation='horizontal', spacing=dp(10), 
                                 size_hint_y=None, height=dp(45))
         
-        search_button = IOSButton(text='Ara', size_hint_x=0.3)
+        search_button = IOSButton(text='Ara', size_hint_x=0.25)
         search_button.bind(on_press=self.search_items)
         
-        my_location_button = IOSSecondaryButton(text='Konumuma Git', size_hint_x=0.7)
+        my_location_button = IOSSecondaryButton(text='Konumuma Git', size_hint_x=0.4)
         my_location_button.bind(on_press=self.go_to_my_location)
         
+        # Downloads the area for offline use; shows progress and cancels while running
+        self.offline_button = IOSSecondaryButton(text='Çevrimdışı', size_hint_x=0.35)
+        self.offline_button.bind(on_press=self.toggle_offline_download)
+        
         button_layout.add_widget(search_button)
         button_layout.add_widget(my_location_button)
+        button_layout.add_widget(self.offline_button)
         search_content.add_widget(button_layout)
         
         search_card.add_widget(search_content)
         layout.add_widget(search_card)
         
         # Map view container with iOS styling
-        map_container = FloatLayout()
-        
-        # Add map background card with subtle shadow
-        with map_container.canvas.before:
-            # Shadow
-            Color(0, 0, 0, 0.1)
-            map_container.shadow_rect = RoundedRectangle(size=(map_container.width, map_container.height-dp(2)), 
-                                                       pos=(map_container.x, map_container.y-dp(2)), 
-                                                       radius=[dp(16)])
-            # Card background
-            Color(*IOS_COLORS['card_background'])
-            map_container.bg_rect = RoundedRectangle(size=map_container.size, pos=map_container.pos, radius=[dp(16)])
-        map_container.bind(size=self.update_map_card, pos=self.update_map_card)
-        
-        # Map view with padding
-        self.mapview = MapView(zoom=13, lat=41.0082, lon=28.9784,
+        map_container = CardLayout()
+        
+        # Map view with padding; tiles load through the size-bounded tile cache
+        from kivy_garden.mapview import MapView
+        from map_tiles import TileDownloader
+        from tile_prefetch import PanPredictor, RegionPrefetch
+        tile_store = get_tile_store()
+        archive = None if tile_store is get_tile_cache() else tile_store
+        self._tile_downloader = TileDownloader.install(get_tile_cache(), archive)
+        self.mapview = MapView(zoom=13, lat=41.0082, lon=28.9784, cache_dir=TILE_CACHE_DIR,
                               pos_hint={'center_x': 0.5, 'center_y': 0.5},
                               size_hint=(0.98, 0.98))
         map_container.add_widget(self.mapview)
@@ -1375,33 +1785,46 @@ class MapScreen(Screen):
         layout.add_widget(map_container)
         self.add_widget(layout)
         
-        # Initialize markers
+        # Initialize markers; item pins are all drawn by one layer from one texture
+        from map_markers import ItemMarkerLayer
         self._location_marker = None  # User's location marker
-        self._item_markers = []  # List of item markers
-        
-        # Ensure blue pin exists
-        ensure_blue_pin_exists()
-        
-        # Load sample items and user location
-        self.load_sample_items()
+        self._item_markers = {}  # marker key -> Cluster, only items in the viewport
+        self._marker_layer = ItemMarkerLayer(get_marker_atlas(), on_marker=self.on_marker_tap,
+                                             dim_color=SEARCH_DIM_COLOR)
+        self.mapview.add_layer(self._marker_layer, mode='window')
+        self._refresh_markers_event = Clock.create_trigger(self.refresh_visible_items,
+                                                           MARKER_REFRESH_DELAY)
+        self.mapview.bind(on_map_relocated=self.schedule_marker_refresh,
+                          size=self.schedule_marker_refresh)
+        
+        # Predictive tile prefetching along the pan/zoom direction
+        self._pan_predictor = PanPredictor()
+        self._tile_prefetch_queue = self._tile_downloader.prefetch_queue(self.mapview.map_source)
+        self._predict_tiles_event = Clock.create_trigger(self.predict_tiles, PREDICT_INTERVAL)
+        self.mapview.bind(on_map_relocated=self.observe_map_motion)
+        
+        # Search-as-you-type state; the search and cluster indexes arrive from
+        # the loader thread, until then the map shows no shared items
+        self._item_clusters = None
+        self._incremental_search = None
+        self._search_event = Clock.create_trigger(self.run_incremental_search, SEARCH_DEBOUNCE)
+        self._search_generation = 0  # only the newest query's result is shown
+        self._highlighted_ids = None  # item ids matching the search, None when not searching
+        
+        # Load shared items and user location
+        self.load_items()
         self.get_and_show_location()
+        
+        # Resume an offline download interrupted by the last app exit
+        self._prefetch_job = None
+        job = RegionPrefetch.load_job(TILE_CACHE_DIR)
+        if job:
+            self.start_prefetch(*job)
     
     def update_background(self, *args):
         self.bg_rect.size = self.size
         self.bg_rect.pos = self.pos
     
-    def update_search_card(self, instance, *args):
-        instance.shadow_rect.size = (instance.width, instance.height-dp(2))
-        instance.shadow_rect.pos = (instance.x, instance.y-dp(2))
-        instance.bg_rect.size = instance.size
-        instance.bg_rect.pos = instance.pos
-    
-    def update_map_card(self, instance, *args):
-        instance.shadow_rect.size = (instance.width, instance.height-dp(2))
-        instance.shadow_rect.pos = (instance.x, instance.y-dp(2))
-        instance.bg_rect.size = instance.size
-        instance.bg_rect.pos = instance.pos
-
     def get_and_show_location(self):
         def show_location(result):
             # Schedule UI updates on the main thread
@@ -1409,83 +1832,240 @@ class MapScreen(Screen):
             
         get_user_location(callback=show_location)
     
-    def load_sample_items(self):
-        """Load sample shared items on the map"""
-        # Sample items data (in real app, this would come from a database)
-        sample_items = [
-            {
-                'name': 'Eski Kitaplar',
-                'description': 'Roman ve hikaye kitapları, temiz durumda',
-                'lat': 41.0082 + 0.01,
-                'lon': 28.9784 + 0.01,
-                'user': 'Ahmet',
-                'photo': None
-            },
-            {
-                'name': 'Çalışma Sandalyesi',
-                'description': 'Ofis sandalyesi, biraz kullanım izi var',
-                'lat': 41.0082 - 0.005,
-                'lon': 28.9784 + 0.008,
-                'user': 'Ayşe',
-                'photo': None
-            },
-            {
-                'name': 'Çocuk Oyuncakları',
-                'description': 'Temiz oyuncaklar, çocuk büyüdü',
-                'lat': 41.0082 + 0.008,
-                'lon': 28.9784 - 0.003,
-                'user': 'Mehmet',
-                'photo': None
-            }
-        ]
-        
-        # Add item markers to map
-        for item in sample_items:
-            marker = MapMarker(lat=item['lat'], lon=item['lon'])
-            marker.item_data = item  # Store item data in marker
-            self._item_markers.append(marker)
-            self.mapview.add_marker(marker)
+    def load_items(self):
+        """Load the items and their indexes off the UI thread, then show them"""
+        load_item_indexes(self.on_item_indexes_loaded)
+    
+    def on_item_indexes_loaded(self, clusters, index):
+        """Show the markers in view and run a search typed while the items were loading"""
+        self._item_clusters = clusters
+        self._incremental_search = IncrementalSearch(index)
+        self.refresh_visible_items()
+        if tokenize(self.search_input.text.strip()):
+            self.run_incremental_search()
+    
+    def add_item_marker(self, item):
+        """Show a newly shared item if it falls inside the viewport"""
+        self.schedule_marker_refresh()
+    
+    def schedule_marker_refresh(self, *args):
+        """Debounce marker refreshes while the map is being panned or zoomed"""
+        self._refresh_markers_event.cancel()
+        self._refresh_markers_event()
+    
+    def query_visible_items(self):
+        """Clusters and single items inside the visible map bounds plus MARKER_MARGIN"""
+        bbox = self.mapview.get_bbox(margin=dp(MARKER_MARGIN))
+        min_lat, min_lon, max_lat, max_lon = bbox
+        if self._item_clusters is None:
+            return []  # items still loading
+        if len(get_item_store()):
+            clusters = self._item_clusters.get_clusters(tuple(bbox), self.mapview.zoom)
+            return clusters[:MAX_VISIBLE_MARKERS]
+        return [Cluster(item['id'], self.mapview.zoom, item['lat'], item['lon'], 1, item)
+                for item in SAMPLE_ITEMS
+                if min_lat <= item['lat'] <= max_lat and min_lon <= item['lon'] <= max_lon]
+    
+    def refresh_visible_items(self, *args):
+        """Show the clusters and items in the viewport on the marker layer"""
+        from map_markers import pin_icon
+        self._item_markers = {cluster.key: cluster for cluster in self.query_visible_items()}
+        self._marker_layer.set_markers({
+            key: (cluster.lat, cluster.lon,
+                  pin_icon(1 if cluster.item else cluster.count, Metrics.density))
+            for key, cluster in self._item_markers.items()})
+        self.update_marker_highlights()
+    
+    def observe_map_motion(self, *args):
+        """Track pan/zoom velocity; prediction runs at most every PREDICT_INTERVAL"""
+        self._pan_predictor.observe(self.mapview.lat, self.mapview.lon, self.mapview.zoom)
+        self._predict_tiles_event()
+    
+    def predict_tiles(self, *args):
+        """Queue the tiles the map is moving towards, dropping those of an old direction"""
+        predictor = self._pan_predictor
+        tiles = predictor.predict(self.mapview.get_bbox(), self.mapview.zoom,
+                                  self.mapview.map_source.max_zoom)
+        self._tile_prefetch_queue.submit(tiles, predictor.generation)
+    
+    def tile_metrics(self):
+        """One-line summary of how long tiles stayed blank and what prefetching did"""
+        queue = self._tile_prefetch_queue
+        blank = self._tile_downloader.blank_stats()
+        if blank is None:
+            return f"Map tiles: none loaded, {queue.fetched} prefetched"
+        return (f"Map tiles: {blank['tiles']} shown, blank mean {blank['mean'] * 1000:.0f} ms, "
+                f"p95 {blank['p95'] * 1000:.0f} ms, max {blank['max'] * 1000:.0f} ms; "
+                f"{queue.fetched} prefetched, {queue.dropped} stale dropped")
+    
+    def stop_tile_prefetch(self):
+        """Stop predictive prefetching and log the tile metrics (on app exit)"""
+        print(self.tile_metrics())
+        self._tile_prefetch_queue.close()
+    
+    def on_marker_tap(self, key):
+        """A pin on the marker layer was tapped"""
+        cluster = self._item_markers.get(key)
+        if cluster is not None and not cluster.item:
+            self.expand_cluster(cluster)
+    
+    def expand_cluster(self, cluster):
+        """Zoom in on a cluster so it splits into smaller groups"""
+        max_zoom = self.mapview.map_source.max_zoom
+        self.mapview.center_on(cluster.lat, cluster.lon)
+        self.mapview.zoom = min(self.mapview.zoom + 2, max_zoom)
     
     def update_location_ui(self, result):
         """Update the UI on the main thread"""
         if result:
             lat, lon = result
             self.mapview.center_on(lat, lon)
-            if self._location_marker:
-                self.mapview.remove_marker(self._location_marker)
-            # Use blue pin for user location
-            blue_pin_path = ensure_blue_pin_exists()
-            if blue_pin_path:
-                self._location_marker = MapMarker(lat=lat, lon=lon, source=blue_pin_path)
-                self.mapview.add_marker(self._location_marker)
+            self.move_location_marker(lat, lon)
         else:
             print("Location not available")
+    
+    def move_location_marker(self, lat, lon):
+        """Show the user's location marker at (lat, lon) without moving the map"""
+        from kivy_garden.mapview import MapMarker
+        from map_markers import set_marker_texture
+        if self._location_marker:
+            self._location_marker.lat = lat
+            self._location_marker.lon = lon
+            self.mapview.trigger_update(True)
+            return
+        # Use blue pin for user location
+        texture = marker_texture(color=PIN_BLUE)
+        if texture:
+            self._location_marker = MapMarker(lat=lat, lon=lon)
+            set_marker_texture(self._location_marker, texture)
+            self.mapview.add_marker(self._location_marker)
+    
+    def on_enter(self, *args):
+        """Follow the user's location with coarse GPS updates while the map is open"""
+        if gps_available():
+            get_gps_session().subscribe(self.on_location_batch, low_power=True)
+    
+    def on_leave(self, *args):
+        if gps_available():
+            get_gps_session().unsubscribe(self.on_location_batch)
+    
+    def on_location_batch(self, fixes):
+        """Batched GPS fixes arrive off the main thread; only the newest one is shown"""
+        lat, lon = fixes[-1][:2]
+        Clock.schedule_once(lambda dt: self.move_location_marker(lat, lon))
 
     def search_items(self, instance):
         """Search for items on the map"""
-        query = self.search_input.text.strip().lower()
+        query = self.search_input.text.strip()
         if not query:
-            self.show_ios_popup('Arama', 'Lütfen aramak istediğiniz eşya türünü girin.')
+            show_ios_popup('Arama', 'Lütfen aramak istediğiniz eşya türünü girin.')
+            return
+        
+        if self._incremental_search is None:
+            show_ios_popup('Arama', 'Eşyalar yükleniyor, lütfen biraz sonra tekrar deneyin.')
             return
         
-        # Filter items based on search query
-        found_items = []
-        for marker in self._item_markers:
-            item = marker.item_data
-            if (query in item['name'].lower() or 
-                query in item['description'].lower()):
-                found_items.append(marker)
+        # Ranked lookup in the inverted index
+        found_items = self._incremental_search.index.search(query)
+        self._search_generation += 1
+        self.show_search_matches(self._search_generation, found_items[:SEARCH_HIGHLIGHT_LIMIT])
         
         if found_items:
-            # Focus on first found item
+            # Focus on best match
             first_item = found_items[0]
-            self.mapview.center_on(first_item.lat, first_item.lon)
-            self.show_ios_popup('Arama Sonucu', 
+            self.mapview.center_on(first_item['lat'], first_item['lon'])
+            show_ios_popup('Arama Sonucu', 
                                f'{len(found_items)} eşya bulundu!\nHaritada işaretleri görebilirsiniz.')
         else:
-            self.show_ios_popup('Arama Sonucu', 
+            show_ios_popup('Arama Sonucu', 
                                f'"{query}" için eşya bulunamadı.\nFarklı anahtar kelimeler deneyin.')
 
+    def schedule_incremental_search(self, instance, text):
+        """Debounce search-as-you-type while the user is typing"""
+        self._search_event.cancel()
+        self._search_event()
+    
+    def run_incremental_search(self, *args):
+        """Query the index off the UI thread and highlight the result when it arrives"""
+        query = self.search_input.text.strip()
+        self._search_generation += 1
+        generation = self._search_generation
+        if not tokenize(query):
+            self.show_search_matches(generation, None)
+            return
+        if self._incremental_search is None:
+            return  # searched once the items are loaded
+        
+        def run_query():
+            items = self._incremental_search.search(query, limit=SEARCH_HIGHLIGHT_LIMIT)
+            Clock.schedule_once(lambda dt: self.show_search_matches(generation, items))
+        
+        threading.Thread(target=run_query, daemon=True).start()
+    
+    def show_search_matches(self, generation, items):
+        """Highlight markers of matching items, or clear highlights when items is None"""
+        if generation != self._search_generation:
+            return  # result of an older query that finished late
+        self._highlighted_ids = None if items is None else [item['id'] for item in items]
+        self.update_marker_highlights()
+    
+    def update_marker_highlights(self):
+        """Dim markers that neither are nor contain a search match"""
+        if self._highlighted_ids is None:
+            keys = None
+        elif self._item_clusters is not None and len(get_item_store()):
+            clusters = self._item_clusters
+            keys = {clusters.cluster_key(item_id, self.mapview.zoom)
+                    for item_id in self._highlighted_ids}
+        else:
+            keys = set(self._highlighted_ids)
+        self._marker_layer.set_dimmed(
+            None if keys is None else [key for key in self._item_markers if key not in keys])
+    
+    def toggle_offline_download(self, instance):
+        """Download map tiles around the user for offline use, or cancel a running download"""
+        if self._prefetch_job is not None and not self._prefetch_job.wait(0):
+            self._prefetch_job.cancel()
+            self._prefetch_job = None
+            self.offline_button.text = 'Çevrimdışı'
+            return
+        
+        if self._location_marker:
+            lat, lon = self._location_marker.lat, self._location_marker.lon
+        else:
+            lat, lon = self.mapview.lat, self.mapview.lon
+        from tile_prefetch import bbox_around, count_region_tiles
+        bbox = bbox_around(lat, lon, PREFETCH_RADIUS_KM)
+        max_zoom = min(PREFETCH_MAX_ZOOM, self.mapview.map_source.max_zoom)
+        # A region bigger than the cache would evict its own tiles
+        capacity = tile_store_capacity(get_tile_store())
+        if capacity is not None and count_region_tiles(bbox, PREFETCH_MIN_ZOOM,
+                                                       max_zoom) > capacity // 2:
+            show_ios_popup('Çevrimdışı Harita',
+                                'Bu bölge önbellek için çok büyük.\nDaha az yakınlaştırma seçin.')
+            return
+        self.start_prefetch(bbox, PREFETCH_MIN_ZOOM, max_zoom)
+    
+    def start_prefetch(self, bbox, min_zoom, max_zoom):
+        self.offline_button.text = 'İndiriliyor...'
+        self._prefetch_job = self._tile_downloader.prefetch_region(
+            self.mapview.map_source, bbox, min_zoom, max_zoom,
+            progress=lambda done, total, failed: Clock.schedule_once(
+                lambda dt: self.show_prefetch_progress(done, total, failed)))
+    
+    def show_prefetch_progress(self, done, total, failed):
+        """Show download progress on the offline button (main thread)"""
+        if self._prefetch_job is None or self._prefetch_job.cancelled:
+            return
+        if done < total:
+            self.offline_button.text = f'İndiriliyor %{done * 100 // total}'
+        elif failed:
+            self.offline_button.text = 'Çevrimdışı'
+            show_ios_popup('Çevrimdışı Harita',
+                                f'{failed} harita parçası indirilemedi.\nTekrar deneyebilirsiniz.')
+        else:
+            self.offline_button.text = 'Çevrimdışı ✓'
+    
     def go_to_my_location(self, instance):
         """Go to user's current location"""
         if self._location_marker:
@@ -1493,23 +2073,6 @@ class MapScreen(Screen):
         else:
             self.get_and_show_location()
     
-    def show_ios_popup(self, title, message):
-        """Show iOS-style popup"""
-        content = BoxLayout(orientation='vertical', spacing=dp(20), padding=dp(20))
-        
-        msg_label = IOSLabel(text=message, font_size=dp(16), 
-                            color=IOS_COLORS['text_primary'], 
-                            text_size=(dp(250), None), halign='center')
-        content.add_widget(msg_label)
-        
-        ok_button = IOSButton(text='Tamam', size_hint_y=None, height=dp(44))
-        content.add_widget(ok_button)
-        
-        popup = Popup(title=title, content=content, size_hint=(0.8, 0.4),
-                     background_color=IOS_COLORS['card_background'])
-        
-        ok_button.bind(on_press=popup.dismiss)
-        popup.open()
     
     def go_back(self, instance):
         """Go back to dashboard"""
@@ -1520,25 +2083,108 @@ class MapScreen(Screen):
     def on_status(self, stype, status):
         pass
 
+class LazyScreenManager(ScreenManager):
+    """
+    ScreenManager that builds registered screens the first time they are used.
+    - register(name, factory) records how to build a screen; get_screen() and
+      setting current build it on demand.
+    - has_screen() stays true only for built screens, so callers that just
+      update an existing screen do not build it.
+    - prewarm(names) builds screens ahead of navigation, one per frame.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._factories = {}
+
+    def register(self, name, factory):
+        self._factories[name] = factory
+
+    def is_registered(self, name):
+        return name in self._factories or self.has_screen(name)
+
+    def get_screen(self, name):
+        if name in self._factories and not self.has_screen(name):
+            self.build_screen(name)
+        return super().get_screen(name)
+
+    def build_screen(self, name):
+        factory = self._factories.pop(name)
+        start = time.perf_counter()
+        screen = factory(name=name)
+        self.add_widget(screen)
+        print(f"Built screen {name} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return screen
+
+    def prewarm(self, names):
+        """Build the given screens that are still pending, one per frame"""
+        pending = [name for name in names if name in self._factories]
+        if not pending:
+            return
+        self.build_screen(pending[0])
+        if len(pending) > 1:
+            Clock.schedule_once(lambda dt: self.prewarm(pending[1:]), 0)
+
 class FreeviaApp(App):
+    current_user = None  # username after sign-in; screens read it on entering
+    screens = [
+        ('signin', SignInScreen),
+        ('signup', SignUpScreen),
+        ('dashboard', DashboardScreen),
+        ('profile', ProfileScreen),
+        ('my_items', MyItemsScreen),
+        ('add_item', AddItemScreen),
+        ('map', MapScreen),
+    ]
+
     def build(self):
         # Set window background color
         from kivy.core.window import Window
         Window.clearcolor = IOS_COLORS['background']
         
-        # Ensure blue pin marker exists
-        ensure_blue_pin_exists()
-        
         # Use smooth slide transition like iOS
         from kivy.uix.screenmanager import SlideTransition
-        sm = ScreenManager(transition=SlideTransition(direction='left', duration=0.25))
-        sm.add_widget(SignInScreen(name='signin'))
-        sm.add_widget(SignUpScreen(name='signup'))
-        sm.add_widget(DashboardScreen(name='dashboard'))
-        sm.add_widget(ProfileScreen(name='profile'))
-        sm.add_widget(AddItemScreen(name='add_item'))
-        sm.add_widget(MapScreen(name='map'))
+        sm = LazyScreenManager(transition=SlideTransition(direction='left', duration=0.25))
+        for name, screen_class in self.screens:
+            sm.register(name, screen_class)
+        # The first screen added becomes current
+        sm.get_screen('signin')
+        if LAZY_SCREENS:
+            Clock.schedule_once(lambda dt: sm.prewarm(PREWARM_SCREENS), PREWARM_DELAY)
+        else:
+            for name, _ in self.screens:
+                sm.get_screen(name)
+        Clock.schedule_once(lambda dt: threading.Thread(target=collect_photo_garbage,
+                                                        daemon=True).start(), PHOTO_GC_DELAY)
         return sm
 
+    def on_stop(self):
+        # Write out any batched registrations before exiting
+        get_user_store().close()
+        close_http_client()
+        if gps_available():
+            get_gps_session().stop()
+        if _photo_pipeline is not None:
+            stats = _photo_pipeline.stats()
+            _photo_pipeline.close()
+            if stats['photos']:
+                stages = ', '.join(f"{stage} {seconds * 1000:.0f} ms"
+                                   for stage, seconds in stats['stages'].items())
+                print(f"Photos: {stats['photos']} processed, {stats['failed']} failed; "
+                      f"mean {stages}")
+        if _photo_store is not None:
+            _photo_store[1].close()
+        if _thumbnail_loader is not None:
+            _thumbnail_loader.close()
+        # Tiles are only used once the map screen was built
+        if not self.root.has_screen('map'):
+            return
+        self.root.get_screen('map').stop_tile_prefetch()
+        tile_store = get_tile_store()
+        stats = tile_store.stats()
+        tile_store.close()
+        print(f"Tile cache: {stats['tiles']} tiles, {stats['bytes'] / 1024 / 1024:.1f} MB, "
+              f"hit ratio {stats['hit_ratio']:.0%}, {stats['evictions']} evicted")
+
 if __name__ == '__main__':
     FreeviaApp().run()
@@ -0,0 +1,147 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from http_client import get_client
+
+# Lookup modes
+MODE_RACE = 'race'              # query providers concurrently, first valid answer wins
+MODE_SEQUENTIAL = 'sequential'  # try providers one by one, best first
+
+# Smoothing factor of the per-provider latency average
+LATENCY_ALPHA = 0.3
+# Providers raced at once by default. Racing all of them would make the learned
+# order meaningless; with two, the runner-up is measured too and can move ahead
+RACE_WIDTH = 2
+
+
+def _parse_ipinfo(data):
+    loc = data.get('loc')
+    return tuple(map(float, loc.split(','))) if loc else (None, None)
+
+
+# (name, url, parser) with parser(json) -> (lat, lon)
+IP_PROVIDERS = [
+    ('ipapi.co', 'https://ipapi.co/json/', lambda d: (d.get('latitude'), d.get('longitude'))),
+    ('ip-api.com', 'http://ip-api.com/json/', lambda d: (d.get('lat'), d.get('lon'))),
+    ('ipinfo.io', 'https://ipinfo.io/json', _parse_ipinfo),
+    ('geolocation-db.com', 'https://geolocation-db.com/json/',
+     lambda d: (d.get('latitude'), d.get('longitude'))),
+]
+
+
+def fetch_json(url, timeout):
+    return get_client().get_json(url, timeout=timeout)
+
+
+class ProviderStats:
+    """Success counts and a moving latency average for one provider"""
+    __slots__ = ('successes', 'failures', 'latency')
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.latency = None  # seconds, None until the first answer
+
+    def record(self, ok, latency):
+        if ok:
+            self.successes += 1
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += LATENCY_ALPHA * (latency - self.latency)
+        else:
+            self.failures += 1
+
+    def score(self, default_latency):
+        """Expected cost of asking this provider; lower is better"""
+        latency = default_latency if self.latency is None else self.latency
+        # Laplace-smoothed success rate so new providers are neither trusted nor ignored
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        return latency / success_rate
+
+
+class IPLocator:
+    """
+    IP geolocation over several providers.
+    - MODE_RACE asks the race_width best providers at once and returns the
+      first valid answer; the remaining requests are abandoned (their results
+      still update the statistics). If all of them fail, the next providers
+      are raced.
+    - MODE_SEQUENTIAL tries one provider at a time. Only the provider that
+      answered is measured, so it changes its order after failures, not
+      after a slower answer.
+    - Every answer or failure is recorded per provider, and providers are
+      ordered by expected latency divided by success rate.
+    """
+
+    def __init__(self, providers=None, mode=MODE_RACE, timeout=10, race_width=RACE_WIDTH,
+                 fetch=fetch_json):
+        self.providers = list(IP_PROVIDERS if providers is None else providers)
+        self.mode = mode
+        self.timeout = timeout
+        # None races every provider at once
+        self.race_width = race_width or len(self.providers)
+        self.fetch = fetch
+        self.stats = {name: ProviderStats() for name, _, _ in self.providers}
+        self._lock = threading.Lock()
+
+    def ordered_providers(self):
+        """Providers best first; unmeasured ones keep their configured order"""
+        with self._lock:
+            return sorted(self.providers,
+                          key=lambda provider: self.stats[provider[0]].score(self.timeout / 2))
+
+    def _query(self, provider):
+        """(lat, lon) from one provider, or None; records the outcome"""
+        name, url, parser = provider
+        start = time.perf_counter()
+        result = None
+        try:
+            lat, lon = parser(self.fetch(url, self.timeout))
+            if lat is not None and lon is not None:
+                result = (float(lat), float(lon))
+            else:
+                print(f"No valid location data from {url}")
+        except Exception as e:
+            print(f"Error with {url}: {e}")
+        with self._lock:
+            self.stats[name].record(result is not None, time.perf_counter() - start)
+        return result
+
+    def locate(self):
+        """(lat, lon, provider name) or None when every provider failed"""
+        providers = self.ordered_providers()
+        if self.mode == MODE_SEQUENTIAL:
+            for provider in providers:
+                result = self._query(provider)
+                if result:
+                    return result + (provider[0],)
+            return None
+        for start in range(0, len(providers), self.race_width):
+            result = self._race(providers[start:start + self.race_width])
+            if result:
+                return result
+        return None
+
+    def _race(self, providers):
+        executor = ThreadPoolExecutor(max_workers=len(providers),
+                                      thread_name_prefix='ip-locate')
+        try:
+            pending = {executor.submit(self._query, provider): provider[0]
+                       for provider in providers}
+            deadline = time.monotonic() + self.timeout
+            while pending:
+                done, _ = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    return None
+                for future in done:
+                    name = pending.pop(future)
+                    result = future.result()
+                    if result:
+                        return result + (name,)
+            return None
+        finally:
+            # Losers finish in the background; only not-yet-started ones are cancelled
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,185 @@
+import threading
+import time
+
+# (minTime ms, minDistance m) passed to gps.start
+FINE_PARAMS = (1000, 1)
+LOW_POWER_PARAMS = (10000, 50)
+# A fix at least this accurate (m) completes one-shot requests
+GOOD_ACCURACY = 50.0
+# Seconds a one-shot request may keep the receiver on without a good fix
+IDLE_TIMEOUT = 30.0
+# Seconds between fix batches delivered to subscribers
+BATCH_INTERVAL = 5.0
+
+
+class GPSSession:
+    """
+    One shared subscription to a plyer-style gps provider.
+    - request_fix() callers wait for a single fix. The receiver runs in fine
+      mode until a fix within `accuracy` metres arrives, or for at most
+      idle_timeout seconds; then the waiters get the best fix seen (or None).
+    - subscribe() callers get every fix, delivered in batches every
+      batch_interval seconds. Low-power subscribers only need coarse updates,
+      so while nobody needs fine fixes the provider runs with LOW_POWER_PARAMS.
+    - The provider is configured once, restarted only when the mode changes,
+      and stopped as soon as nobody is waiting or subscribed.
+    """
+
+    def __init__(self, provider, accuracy=GOOD_ACCURACY, idle_timeout=IDLE_TIMEOUT,
+                 batch_interval=BATCH_INTERVAL):
+        self.provider = provider
+        self.accuracy = accuracy
+        self.idle_timeout = idle_timeout
+        self.batch_interval = batch_interval
+        self.last_fix = None  # (lat, lon, accuracy, time)
+        self._waiters = []  # one-shot callbacks
+        self._best = None  # best fix since the waiters started waiting
+        self._subscribers = {}  # callback -> low_power flag
+        self._batch = []
+        self._params = None  # params the provider runs with, None when stopped
+        self._configured = False
+        self._idle_timer = None
+        self._batch_timer = None
+        self._lock = threading.RLock()
+
+    @property
+    def running(self):
+        return self._params is not None
+
+    def request_fix(self, callback):
+        """Call callback((lat, lon, accuracy)) once with a good fix, or None"""
+        with self._lock:
+            self._waiters.append(callback)
+            if self._idle_timer is None:
+                self._idle_timer = threading.Timer(self.idle_timeout, self._on_idle_timeout)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+            started = self._update_provider()
+        if not started:
+            self._finish_waiters(None)
+
+    def subscribe(self, callback, low_power=True):
+        """Call callback(list of fixes) every batch_interval while fixes arrive"""
+        with self._lock:
+            self._subscribers[callback] = low_power
+            return self._update_provider()
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers.pop(callback, None)
+            self._update_provider()
+
+    def stop(self):
+        """Drop every waiter and subscriber and stop the receiver"""
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+            self._subscribers.clear()
+            self._batch = []
+            self._update_provider()
+        for callback in waiters:
+            callback(None)
+
+    def _wanted_params(self):
+        if self._waiters or not all(self._subscribers.values()):
+            return FINE_PARAMS
+        if self._subscribers:
+            return LOW_POWER_PARAMS
+        return None
+
+    def _update_provider(self):
+        """Start, restart or stop the provider to match the callers; False if it failed"""
+        params = self._wanted_params()
+        if params == self._params:
+            return True
+        try:
+            if self._params is not None:
+                self.provider.stop()
+                print("GPS stopped")
+            self._params = None
+            if params is None:
+                self._cancel_timers()
+                return True
+            if not self._configured:
+                self.provider.configure(on_location=self._on_location, on_status=self._on_status)
+                self._configured = True
+            min_time, min_distance = params
+            print(f"Requesting GPS location (minTime={min_time}, minDistance={min_distance})...")
+            self.provider.start(minTime=min_time, minDistance=min_distance)
+            self._params = params
+            return True
+        except NotImplementedError:
+            print("GPS not available on this platform")
+        except Exception as e:
+            print(f"GPS Error: {e}")
+        return False
+
+    def _cancel_timers(self):
+        for timer in (self._idle_timer, self._batch_timer):
+            if timer is not None:
+                timer.cancel()
+        self._idle_timer = self._batch_timer = None
+        self._batch = []
+
+    def _on_location(self, **kwargs):
+        lat = kwargs.get('lat')
+        lon = kwargs.get('lon')
+        if lat is None or lon is None:
+            print("GPS Location data incomplete")
+            return
+        accuracy = kwargs.get('accuracy')
+        fix = (float(lat), float(lon), None if accuracy is None else float(accuracy),
+               time.time())
+        with self._lock:
+            self.last_fix = fix
+            if self._waiters and (self._best is None or _better(fix, self._best)):
+                self._best = fix
+            if self._subscribers:
+                self._batch.append(fix)
+                if self._batch_timer is None:
+                    self._batch_timer = threading.Timer(self.batch_interval, self._flush_batch)
+                    self._batch_timer.daemon = True
+                    self._batch_timer.start()
+            good = fix[2] is None or fix[2] <= self.accuracy
+        if good:
+            self._finish_waiters(fix)
+
+    def _on_status(self, status_type, status):
+        print(f"GPS Status: {status_type} - {status}")
+        if status_type == 'provider-disabled':
+            print("GPS is disabled. Please enable GPS in settings.")
+            self._finish_waiters(None)
+
+    def _on_idle_timeout(self):
+        with self._lock:
+            self._idle_timer = None
+            best = self._best
+        self._finish_waiters(best)
+
+    def _finish_waiters(self, fix):
+        """Answer all one-shot waiters and let the provider stop or drop to low power"""
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+            self._best = None
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._update_provider()
+        result = None if fix is None else fix[:3]
+        for callback in waiters:
+            callback(result)
+
+    def _flush_batch(self):
+        with self._lock:
+            self._batch_timer = None
+            batch, self._batch = self._batch, []
+            subscribers = list(self._subscribers)
+        if batch:
+            for callback in subscribers:
+                callback(batch)
+
+
+def _better(fix, other):
+    """True if fix is more accurate than other (unknown accuracy counts as worst)"""
+    if fix[2] is None:
+        return other[2] is None
+    return other[2] is None or fix[2] <= other[2]
@@ -0,0 +1,87 @@
+import threading
+
+USER_AGENT = 'FreeviaApp/1.0'
+# (connect, read) seconds used when a call does not pass its own timeout
+DEFAULT_TIMEOUT = (5, 10)
+# Kept-alive connections per host, and how many hosts keep a pool
+MAX_CONNECTIONS_PER_HOST = 4
+MAX_HOSTS = 16
+# Retries for connection errors and transient gateway/overload errors,
+# waiting backoff * 2 ** (attempt - 1) seconds between attempts
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class HttpClient:
+    """
+    App-wide HTTP client on one pooled requests.Session.
+    - Connections are kept alive and reused, so repeat calls to a host skip
+      DNS, TCP and TLS setup.
+    - Each host gets at most max_per_host connections; extra concurrent calls
+      wait for a free one instead of opening more sockets.
+    - Idempotent requests are retried with exponential backoff and every call
+      gets a timeout.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_per_host=MAX_CONNECTIONS_PER_HOST,
+                 max_hosts=MAX_HOSTS, retries=MAX_RETRIES, backoff=RETRY_BACKOFF):
+        # requests is imported here so importing this module stays cheap at startup
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.timeout = timeout
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset(['GET', 'HEAD']),
+                      respect_retry_after_header=False, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_per_host,
+                              pool_block=True, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        return self.session.request(method, url,
+                                    timeout=self.timeout if timeout is None else timeout,
+                                    **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_json(self, url, **kwargs):
+        """GET url and decode the JSON body; raises for HTTP errors"""
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Get the shared HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def close_client():
+    """Close the shared HTTP client if it was ever created"""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
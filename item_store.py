@@ -0,0 +1,235 @@
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from itertools import islice
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class ItemStore:
+    """
+    Append-only item repository with a grid spatial index.
+    - Items are stored one JSON object per line; removals append a tombstone,
+      so writes never rewrite the file.
+    - Every item is bucketed into a fixed lat/lon grid cell (cell_size degrees,
+      ~1.1 km at the default), so bounding-box and radius queries only visit
+      the cells they overlap instead of every item.
+    - Item ids are also kept per user in sharing order, so a user's items can
+      be read a page at a time.
+    """
+
+    def __init__(self, path, cell_size=0.01):
+        self.path = path
+        self.cell_size = cell_size
+        self._items = {}  # id -> item dict
+        self._cells = {}  # (row, col) -> set of ids
+        self._by_user = {}  # user -> {id: None}, oldest first
+        self._loaded = False
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def load(self):
+        """Read the item log once and build the index"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._items = {}
+            self._cells = {}
+            self._by_user = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            print(f"Skipping corrupt item record: {line[:80]}")
+                            continue
+                        if record.get('deleted'):
+                            self._unindex(record.get('id'))
+                        else:
+                            self._index(record)
+            self._loaded = True
+            print(f"Item store loaded: {len(self._items)} items from {self.path}")
+
+    def subscribe(self, callback):
+        """Call callback(event, item) after every 'add' or 'remove'"""
+        self._listeners.append(callback)
+
+    def _notify(self, event, item):
+        for callback in self._listeners:
+            try:
+                callback(event, item)
+            except Exception as e:
+                print(f"Item store listener error: {e}")
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def _index(self, item):
+        self._unindex(item['id'])
+        self._items[item['id']] = item
+        self._cells.setdefault(self._cell(item['lat'], item['lon']), set()).add(item['id'])
+        user = item.get('user')
+        if user is not None:
+            self._by_user.setdefault(user, {})[item['id']] = None
+
+    def _unindex(self, item_id):
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return None
+        cell = self._cell(item['lat'], item['lon'])
+        ids = self._cells.get(cell)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del self._cells[cell]
+        user = item.get('user')
+        ids = self._by_user.get(user)
+        if ids is not None:
+            ids.pop(item_id, None)
+            if not ids:
+                del self._by_user[user]
+        return item
+
+    def _append(self, records):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _prepare(item):
+        item = dict(item)
+        item.setdefault('id', uuid.uuid4().hex)
+        item.setdefault('created', time.time())
+        item['lat'] = float(item['lat'])
+        item['lon'] = float(item['lon'])
+        return item
+
+    def __len__(self):
+        self.load()
+        return len(self._items)
+
+    def __iter__(self):
+        self.load()
+        return iter(list(self._items.values()))
+
+    def get(self, item_id):
+        self.load()
+        return self._items.get(item_id)
+
+    def add(self, item):
+        """Persist a new item (dict with at least lat/lon) and return it with its id"""
+        return self.add_many([item])[0]
+
+    def add_many(self, items):
+        """Persist several items with a single append"""
+        items = [self._prepare(item) for item in items]
+        with self._lock:
+            self.load()
+            self._append(items)
+            for item in items:
+                self._index(item)
+        for item in items:
+            self._notify('add', item)
+        return items
+
+    def remove(self, item_id):
+        """Remove an item by appending a tombstone; returns the removed item or None"""
+        with self._lock:
+            self.load()
+            if item_id not in self._items:
+                return None
+            self._append([{'id': item_id, 'deleted': True, 'created': time.time()}])
+            item = self._unindex(item_id)
+        self._notify('remove', item)
+        return item
+
+    def count_user(self, user):
+        """Number of items shared by user"""
+        self.load()
+        return len(self._by_user.get(user, ()))
+
+    def query_user(self, user, offset=0, limit=None):
+        """Items shared by user, newest first, skipping the first offset"""
+        self.load()
+        with self._lock:
+            ids = self._by_user.get(user)
+            if not ids:
+                return []
+            stop = None if limit is None else offset + limit
+            return [self._items[item_id] for item_id in islice(reversed(ids), offset, stop)]
+
+    def query_bbox(self, min_lat, min_lon, max_lat, max_lon, limit=None):
+        """Items inside the bounding box (longitudes may wrap the antimeridian)"""
+        self.load()
+        if min_lon > max_lon:
+            west = self.query_bbox(min_lat, min_lon, max_lat, 180.0, limit)
+            if limit is not None and len(west) >= limit:
+                return west
+            rest = None if limit is None else limit - len(west)
+            return west + self.query_bbox(min_lat, -180.0, max_lat, max_lon, rest)
+
+        r0, c0 = self._cell(min_lat, min_lon)
+        r1, c1 = self._cell(max_lat, max_lon)
+        with self._lock:
+            if (r1 - r0 + 1) * (c1 - c0 + 1) <= len(self._cells):
+                cells = (self._cells.get((r, c)) for r in range(r0, r1 + 1)
+                         for c in range(c0, c1 + 1))
+            else:
+                # Huge box (low zoom): walking the occupied cells is cheaper
+                cells = (ids for (r, c), ids in self._cells.items()
+                         if r0 <= r <= r1 and c0 <= c <= c1)
+            found = []
+            for ids in cells:
+                if not ids:
+                    continue
+                for item_id in ids:
+                    item = self._items[item_id]
+                    if min_lat <= item['lat'] <= max_lat and min_lon <= item['lon'] <= max_lon:
+                        found.append(item)
+                        if limit is not None and len(found) >= limit:
+                            return found
+            return found
+
+    def query_near(self, lat, lon, radius_km, limit=None):
+        """Items within radius_km of (lat, lon), nearest first"""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        coslat = max(math.cos(math.radians(lat)), 1e-6)
+        dlon = min(180.0, dlat / coslat)
+        min_lon, max_lon = lon - dlon, lon + dlon
+        if min_lon < -180.0:
+            min_lon += 360.0
+        if max_lon > 180.0:
+            max_lon -= 360.0
+        if dlon >= 180.0:
+            min_lon, max_lon = -180.0, 180.0
+        candidates = self.query_bbox(max(-90.0, lat - dlat), min_lon,
+                                     min(90.0, lat + dlat), max_lon)
+        scored = []
+        for item in candidates:
+            distance = haversine_km(lat, lon, item['lat'], item['lon'])
+            if distance <= radius_km:
+                scored.append((distance, item))
+        scored.sort(key=lambda pair: pair[0])
+        if limit is not None:
+            scored = scored[:limit]
+        return [item for _, item in scored]
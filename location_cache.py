@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+
+# Sources of a location fix
+SOURCE_GPS = 'gps'
+SOURCE_IP = 'ip'
+
+# Default time-to-live (s) and typical accuracy (m) per source
+DEFAULT_TTL = {SOURCE_GPS: 120, SOURCE_IP: 6 * 3600}
+DEFAULT_ACCURACY = {SOURCE_GPS: 50.0, SOURCE_IP: 5000.0}
+
+
+class LocationCache:
+    """
+    Last known location per source, persisted as a small JSON file.
+    - Each entry keeps lat, lon, accuracy (m) and the time of the fix.
+    - An entry is fresh while it is younger than the TTL of its source, so
+      repeat lookups are answered without starting GPS or hitting the network.
+    - The file is rewritten atomically on every put; a missing or corrupt file
+      just means an empty cache.
+    """
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self._entries = {}  # source -> {'lat', 'lon', 'accuracy', 'time'}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def load(self):
+        """Read the cache file once"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._entries = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    self._entries = {source: entry for source, entry in data.items()
+                                     if isinstance(entry, dict) and
+                                     {'lat', 'lon', 'time'} <= entry.keys()}
+                except (OSError, ValueError, AttributeError) as e:
+                    print(f"Ignoring unreadable location cache: {e}")
+            self._loaded = True
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save location cache: {e}")
+
+    def put(self, source, lat, lon, accuracy=None, timestamp=None):
+        """Remember a fix from source and return its entry"""
+        entry = {
+            'lat': float(lat),
+            'lon': float(lon),
+            'accuracy': float(accuracy if accuracy is not None
+                              else DEFAULT_ACCURACY.get(source, 0.0)),
+            'time': time.time() if timestamp is None else timestamp,
+        }
+        with self._lock:
+            self.load()
+            self._entries[source] = entry
+            self._save()
+        return entry
+
+    def get(self, source, max_age=None):
+        """The entry for source if it is younger than max_age (default: its TTL)"""
+        self.load()
+        with self._lock:
+            entry = self._entries.get(source)
+        if entry is None:
+            return None
+        if max_age is None:
+            max_age = self.ttl.get(source, 0)
+        if time.time() - entry['time'] > max_age:
+            return None
+        return dict(entry, source=source)
+
+    def best(self, sources=None, max_age=None):
+        """The most accurate fresh entry among sources (all sources by default)"""
+        self.load()
+        with self._lock:
+            sources = list(self._entries) if sources is None else sources
+        fresh = [entry for entry in (self.get(source, max_age) for source in sources) if entry]
+        if not fresh:
+            return None
+        return min(fresh, key=lambda entry: (entry['accuracy'], -entry['time']))
+
+    def clear(self, source=None):
+        """Forget one source, or everything"""
+        with self._lock:
+            self.load()
+            if source is None:
+                self._entries = {}
+            else:
+                self._entries.pop(source, None)
+            self._save()
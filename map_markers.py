@@ -0,0 +1,161 @@
+from kivy.clock import Clock
+from kivy.graphics import Color, InstructionGroup, Mesh, PopMatrix, PushMatrix, Translate
+from kivy_garden.mapview import MapLayer
+
+from marker_icons import PIN_RED
+
+# Mesh indices are 16 bit, so one mesh holds at most 16383 quads
+MESH_QUADS = 16000
+MESH_FMT = [(b'vPosition', 2, 'float'), (b'vTexCoords0', 2, 'float')]
+# Cluster badges show counts below 10 exactly and larger ones by bucket, so a
+# map needs a handful of icons per density instead of one per count
+BADGE_BUCKETS = (10, 50, 100, 500, 1000)
+
+
+def set_marker_texture(marker, texture):
+    """Show a shared texture on a marker, one texture pixel per screen pixel"""
+    marker.texture = texture
+    # MapMarker sizes itself to dp(texture_size); the texture is already density-scaled
+    marker.size = texture.size
+
+
+def badge_label(count):
+    """Badge text of a cluster: the count below 10, else its bucket ('10+', '1k+')"""
+    if count < BADGE_BUCKETS[0]:
+        return str(count)
+    bucket = max(bucket for bucket in BADGE_BUCKETS if bucket <= count)
+    return f'{bucket // 1000}k+' if bucket >= 1000 else f'{bucket}+'
+
+
+def pin_icon(count=1, scale=1.0):
+    """Icon spec of the pin for count items: a plain red pin, or one with the count"""
+    if count == 1:
+        return {'color': PIN_RED, 'scale': scale}
+    return {'color': PIN_RED, 'scale': scale, 'badge': badge_label(count)}
+
+
+class ItemMarkerLayer(MapLayer):
+    """
+    Item and cluster pins drawn by one MapView layer instead of one MapMarker
+    widget each.
+    - set_markers() takes {key: (lat, lon, icon spec)}; every icon comes from
+      the same IconAtlas, so all pins are a few meshes per atlas page.
+    - Vertices are stored relative to an origin and rebuilt only when the
+      markers, the dimming, the zoom or the atlas change; panning just moves
+      a Translate.
+    - Pins whose keys were passed to set_dimmed() are drawn with dim_color,
+      below the others.
+    - on_marker(key) is called when a pin is tapped.
+    """
+
+    def __init__(self, atlas, on_marker=None, dim_color=(1, 1, 1, 0.35), **kwargs):
+        super().__init__(**kwargs)
+        self.atlas = atlas
+        self.on_marker = on_marker
+        self._markers = {}  # key -> (lat, lon, icon spec)
+        self._dimmed = None  # keys drawn with dim_color, None when nothing is dimmed
+        self._built = None  # (zoom, scale, atlas generation) of the current meshes
+        self._origin = (0, 0)  # (lat, lon) the vertices are relative to
+        self._hits = []  # (x, y, w, h, key) relative to the origin, topmost last
+        self._rebuild = Clock.create_trigger(lambda dt: self.reposition())
+        with self.canvas:
+            PushMatrix()
+            self._translate = Translate()
+            Color(*dim_color)
+            self._dimmed_meshes = InstructionGroup()
+            Color(1, 1, 1, 1)
+            self._meshes = InstructionGroup()
+            PopMatrix()
+
+    def __len__(self):
+        return len(self._markers)
+
+    def set_markers(self, markers):
+        """Replace the pins with {key: (lat, lon, icon spec)}; drawn on the next frame"""
+        self._markers = markers
+        self._built = None
+        self._rebuild()
+
+    def set_dimmed(self, keys):
+        """Dim the pins of keys, or none when keys is None; drawn on the next frame"""
+        self._dimmed = None if keys is None else set(keys)
+        self._built = None
+        self._rebuild()
+
+    def reposition(self):
+        mapview = self.parent  # window-mode layers are children of the MapView
+        if mapview is None:
+            return
+        zoom = mapview.zoom
+        if self._built != (zoom, mapview.scale, self.atlas.generation):
+            self._build(mapview, zoom)
+        self._translate.xy = mapview.get_window_xy_from(*self._origin, zoom)
+
+    def _build(self, mapview, zoom):
+        origin = (mapview.lat, mapview.lon)
+        ox, oy = mapview.get_window_xy_from(*origin, zoom)
+        generation = self.atlas.generation
+        normal, dimmed = [], []
+        try:
+            for key, (lat, lon, spec) in self._markers.items():
+                page, region = self.atlas.place(**spec)
+                x, y = mapview.get_window_xy_from(lat, lon, zoom)
+                w, h = region.size
+                quads = dimmed if self._dimmed is not None and key in self._dimmed else normal
+                # Anchored at the bottom center like MapMarker
+                quads.append((x - ox - w / 2, y - oy, w, h, region.tex_coords, key, page))
+        except ImportError:
+            print("PIL not found; item markers are not drawn")
+            normal, dimmed = [], []
+        if self.atlas.generation != generation:
+            # The atlas was cleared under us: these regions are stale, try next frame
+            self._rebuild()
+            return
+        self._fill(self._dimmed_meshes, dimmed)
+        self._fill(self._meshes, normal)
+        self._hits = [quad[:4] + quad[5:6] for quad in dimmed + normal]
+        self._origin = origin
+        self._built = (zoom, mapview.scale, generation)
+
+    def _fill(self, group, quads):
+        group.clear()
+        by_page = {}
+        for quad in quads:
+            by_page.setdefault(quad[6], []).append(quad)
+        for page, quads in by_page.items():
+            for start in range(0, len(quads), MESH_QUADS):
+                vertices, indices = [], []
+                for i, (x, y, w, h, (u0, v0, u1, v1, u2, v2, u3, v3), _, _) in enumerate(
+                        quads[start:start + MESH_QUADS]):
+                    vertices += (x, y, u0, v0, x + w, y, u1, v1,
+                                 x + w, y + h, u2, v2, x, y + h, u3, v3)
+                    n = i * 4
+                    indices += (n, n + 1, n + 2, n + 2, n + 3, n)
+                group.add(Mesh(vertices=vertices, indices=indices, fmt=MESH_FMT,
+                               mode='triangles', texture=page))
+
+    def marker_at(self, x, y):
+        """Key of the topmost pin at window position (x, y), or None"""
+        tx, ty = self._translate.xy
+        x, y = x - tx, y - ty
+        for left, bottom, w, h, key in reversed(self._hits):
+            if left <= x <= left + w and bottom <= y <= bottom + h:
+                return key
+        return None
+
+    def on_touch_down(self, touch):
+        key = self.marker_at(*touch.pos)
+        if key is None:
+            return super().on_touch_down(touch)
+        touch.grab(self)
+        touch.ud[self] = key
+        return True
+
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super().on_touch_up(touch)
+        touch.ungrab(self)
+        key = touch.ud.get(self)
+        if key is not None and key == self.marker_at(*touch.pos) and self.on_marker:
+            self.on_marker(key)
+        return True
@@ -0,0 +1,178 @@
+import io
+import os
+import tempfile
+import time
+from collections import deque
+from random import choice
+
+from kivy.core.image import Image as CoreImage
+from kivy_garden.mapview.downloader import Downloader
+
+from http_client import get_client
+from tile_prefetch import RegionPrefetch, PrefetchQueue
+
+
+class TileDownloader(Downloader):
+    """
+    MapView tile loader backed by a TileCache or a TileArchive.
+    - Replaces mapview's Downloader singleton, so every MapView tile request
+      goes through it.
+    - Without an archive, tiles are loose files in the cache directory: cached
+      tiles count as hits and move to the front of the LRU, downloaded tiles
+      are added to the cache, which evicts old ones over budget.
+    - With an archive, tiles are read from and written to the MBTiles file and
+      turned into textures from memory.
+    - Downloads use the shared pooled HTTP client instead of bare requests.get.
+    - The time each tile stays blank, from request to image, is recorded for
+      blank_stats().
+    """
+
+    def __init__(self, tile_cache, archive=None, **kwargs):
+        super().__init__(cache_dir=tile_cache.cache_dir, **kwargs)
+        self.tile_cache = tile_cache
+        self.archive = archive
+        self.blank_times = deque(maxlen=1000)  # recent seconds from request to image
+
+    @classmethod
+    def install(cls, tile_cache, archive=None, **kwargs):
+        """Make this the Downloader every MapView uses and return it"""
+        downloader = Downloader._instance
+        if (not isinstance(downloader, cls) or downloader.tile_cache is not tile_cache or
+                downloader.archive is not archive):
+            downloader = Downloader._instance = cls(tile_cache, archive, **kwargs)
+        return downloader
+
+    @property
+    def store(self):
+        """The active tile store, for stats() and close()"""
+        return self.tile_cache if self.archive is None else self.archive
+
+    def download_tile(self, tile):
+        tile.requested_at = time.perf_counter()
+        super().download_tile(tile)
+
+    def _tile_shown(self, tile):
+        requested_at = tile.__dict__.pop('requested_at', None)
+        if requested_at is not None:
+            self.blank_times.append(time.perf_counter() - requested_at)
+
+    def show_tile_file(self, tile, cache_fn):
+        self._tile_shown(tile)
+        tile.set_source(cache_fn)
+
+    def blank_stats(self):
+        """Mean, 95th percentile and max seconds tiles stayed blank recently"""
+        times = sorted(self.blank_times)
+        if not times:
+            return None
+        return {'tiles': len(times), 'mean': sum(times) / len(times),
+                'p95': times[max(0, int(len(times) * 0.95) - 1)], 'max': times[-1]}
+
+    def _load_tile(self, tile):
+        if tile.state == "done":
+            return
+        if self.archive is not None:
+            return self._load_archived_tile(tile)
+        cache_fn = tile.cache_fn
+        name = os.path.basename(cache_fn)
+        if self.tile_cache.touch(name):
+            if os.path.exists(cache_fn):
+                return self.show_tile_file, (tile, cache_fn)
+            self.tile_cache.discard(name)  # deleted behind our back
+        data = self.fetch_tile(tile.map_source, tile.zoom, tile.tile_x, tile.tile_y)
+        if data is None:
+            return
+        try:
+            self.store_tile(tile.map_source, tile.zoom, tile.tile_x, tile.tile_y, data)
+        except OSError as e:
+            print(f"Could not cache tile {name}: {e}")
+            return
+        return self.show_tile_file, (tile, cache_fn)
+
+    def _load_archived_tile(self, tile):
+        data = self.archive.get(tile.zoom, tile.tile_x, tile.tile_y)
+        if data is None:
+            data = self.fetch_tile(tile.map_source, tile.zoom, tile.tile_x, tile.tile_y)
+            if data is None:
+                return
+            try:
+                self.archive.put(tile.zoom, tile.tile_x, tile.tile_y, data)
+            except Exception as e:
+                print(f"Could not archive tile {tile.zoom}/{tile.tile_x}/{tile.tile_y}: {e}")
+        return self.show_tile_data, (tile, data)
+
+    def show_tile_data(self, tile, data):
+        """Show tile image bytes; textures must be created on the main thread"""
+        self._tile_shown(tile)
+        image = CoreImage(io.BytesIO(data), ext=tile.map_source.image_ext)
+        tile.texture = image.texture
+        tile.state = "need-animation"
+
+    @staticmethod
+    def tile_url(map_source, zoom, tile_x, tile_y):
+        """Download URL of a tile; tile_y is mapview's bottom-up row number"""
+        row = map_source.get_row_count(zoom) - tile_y - 1
+        return map_source.url.format(z=zoom, x=tile_x, y=row, s=choice(map_source.subdomains))
+
+    def fetch_tile(self, map_source, zoom, tile_x, tile_y):
+        """Tile image bytes, or None if the download failed"""
+        uri = self.tile_url(map_source, zoom, tile_x, tile_y)
+        try:
+            response = get_client().get(uri)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            print(f"Downloader error: {e!r}")
+            return None
+
+    @staticmethod
+    def tile_name(map_source, zoom, tile_x, tile_y):
+        """Cache file name of a tile, as mapview's Tile.cache_fn builds it"""
+        return map_source.cache_fmt.format(image_ext=map_source.image_ext,
+                                           cache_key=map_source.cache_key,
+                                           zoom=zoom, tile_x=tile_x, tile_y=tile_y)
+
+    def is_cached(self, map_source, zoom, tile_x, tile_y):
+        if self.archive is not None:
+            return (zoom, tile_x, tile_y) in self.archive
+        return self.tile_name(map_source, zoom, tile_x, tile_y) in self.tile_cache
+
+    def store_tile(self, map_source, zoom, tile_x, tile_y, data):
+        """Save downloaded tile bytes in the active store"""
+        if self.archive is not None:
+            self.archive.put(zoom, tile_x, tile_y, data)
+            return
+        name = self.tile_name(map_source, zoom, tile_x, tile_y)
+        path = self.tile_cache.path(name)
+        # A temp file of its own: MapView and prefetch workers may store the same tile
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.tile_cache.add(name, len(data))
+
+    def prefetch_region(self, map_source, bbox, min_zoom, max_zoom, progress=None):
+        """Start downloading every tile of bbox over the zoom range; returns the job"""
+        job = RegionPrefetch(
+            self.tile_cache.cache_dir, bbox, min_zoom, max_zoom,
+            is_cached=lambda z, x, y: self.is_cached(map_source, z, x, y),
+            fetch=lambda z, x, y: self.fetch_tile(map_source, z, x, y),
+            store=lambda z, x, y, data: self.store_tile(map_source, z, x, y, data),
+            progress=progress)
+        job.start()
+        return job
+
+    def prefetch_queue(self, map_source, **kwargs):
+        """A PrefetchQueue that stores predicted tiles like regular downloads"""
+        return PrefetchQueue(
+            is_cached=lambda z, x, y: self.is_cached(map_source, z, x, y),
+            fetch=lambda z, x, y: self.fetch_tile(map_source, z, x, y),
+            store=lambda z, x, y, data: self.store_tile(map_source, z, x, y, data),
+            **kwargs)
@@ -0,0 +1,205 @@
+import os
+
+# iOS blue, the user location pin
+PIN_BLUE = (0, 122, 255)
+# iOS red, cluster pins with an item count
+PIN_RED = (255, 59, 48)
+# Pins are drawn on a square this many pixels wide at scale 1
+PIN_SIZE = 64
+# Atlas textures are this many pixels square, with transparent padding
+# between the icons packed into them
+ATLAS_SIZE = 1024
+ATLAS_PADDING = 2
+
+
+def icon_key(color=PIN_BLUE, size=PIN_SIZE, scale=1.0, badge=None):
+    """Name of one rendered icon, also used as its cache file name"""
+    r, g, b = color[:3]
+    key = f'pin_{r:02x}{g:02x}{b:02x}_{max(8, round(size * scale))}'
+    if badge is not None:
+        # '+' is kept as 'p', so the "10+" bucket does not share the file of 10
+        key += '_' + ''.join(c for c in str(badge).replace('+', 'p') if c.isalnum())
+    return key
+
+
+def _badge_font(pixels):
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(size=max(6, round(pixels)))
+    except TypeError:  # Pillow < 10.1 only has the small bitmap font
+        return ImageFont.load_default()
+
+
+def render_pin(color=PIN_BLUE, size=PIN_SIZE, scale=1.0, badge=None):
+    """Draw a map pin as an RGBA PIL image; badge text replaces the inner dot"""
+    from PIL import Image, ImageDraw
+    px = max(8, round(size * scale))
+    f = px / 64.0  # the pin was designed on a 64 px square
+    img = Image.new('RGBA', (px, px), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    fill = tuple(color[:3]) + (255,)
+    white = (255, 255, 255, 255)
+
+    # Round head with a white border
+    cx, cy = px / 2, px / 2 - 8 * f
+    radius = 18 * f
+    border = 2 * f
+    draw.ellipse([cx - radius - border, cy - radius - border,
+                  cx + radius + border, cy + radius + border], fill=white)
+    draw.ellipse([cx - radius, cy - radius, cx + radius, cy + radius], fill=fill)
+
+    # Point
+    draw.polygon([(cx, cy + radius),
+                  (cx - 8 * f, cy + radius + 16 * f),
+                  (cx + 8 * f, cy + radius + 16 * f)], fill=fill)
+
+    if badge is None:
+        dot = 6 * f
+        draw.ellipse([cx - dot, cy - dot, cx + dot, cy + dot], fill=white)
+    else:
+        text = str(badge)
+        font = _badge_font(radius * (1.1 if len(text) <= 2 else 0.8 if len(text) == 3 else 0.65))
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        draw.text((cx - (left + right) / 2, cy - (top + bottom) / 2), text,
+                  fill=white, font=font)
+    return img
+
+
+def _texture_bytes(img):
+    """RGBA rows of a PIL image bottom-up, as Kivy textures store them"""
+    from PIL import Image
+    flip = getattr(Image, 'Transpose', Image).FLIP_TOP_BOTTOM
+    return img.transpose(flip).tobytes()
+
+
+def _to_texture(img):
+    """Upload an RGBA PIL image as a Kivy texture (main thread only)"""
+    from kivy.graphics.texture import Texture
+    texture = Texture.create(size=img.size, colorfmt='rgba')
+    texture.blit_buffer(_texture_bytes(img), colorfmt='rgba', bufferfmt='ubyte')
+    return texture
+
+
+class MarkerIcons:
+    """
+    Map pin icons rendered once per (color, size, scale, badge).
+    - Images are memoized and saved as PNGs in cache_dir, so a pin is drawn
+      once per install instead of once per marker or per start.
+    - texture() hands out one shared Kivy texture per icon instead of a file
+      path that every marker would load separately; IconAtlas packs icons
+      into a few shared atlas pages instead.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._images = {}  # key -> PIL image
+        self._textures = {}  # key -> Texture
+        self.rendered = 0  # icons drawn because no cached file existed
+
+    def _file(self, key):
+        return os.path.join(self.cache_dir, key + '.png') if self.cache_dir else None
+
+    def image(self, color=PIN_BLUE, size=PIN_SIZE, scale=1.0, badge=None):
+        """The icon as an RGBA PIL image, from memory, disk or freshly drawn"""
+        key = icon_key(color, size, scale, badge)
+        img = self._images.get(key)
+        if img is not None:
+            return img
+        path = self._file(key)
+        if path and os.path.exists(path):
+            from PIL import Image
+            try:
+                with Image.open(path) as cached:
+                    img = cached.convert('RGBA')
+            except OSError as e:
+                print(f"Redrawing unreadable marker icon {path}: {e}")
+        if img is None:
+            img = render_pin(color, size, scale, badge)
+            self.rendered += 1
+            if path:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    img.save(path)
+                except OSError as e:
+                    print(f"Could not cache marker icon {path}: {e}")
+        self._images[key] = img
+        return img
+
+    def path(self, color=PIN_BLUE, size=PIN_SIZE, scale=1.0, badge=None):
+        """File of the icon for APIs that need a source path; None without cache_dir"""
+        self.image(color, size, scale, badge)
+        path = self._file(icon_key(color, size, scale, badge))
+        return path if path and os.path.exists(path) else None
+
+    def texture(self, color=PIN_BLUE, size=PIN_SIZE, scale=1.0, badge=None):
+        """One shared Kivy texture per icon (main thread only)"""
+        key = icon_key(color, size, scale, badge)
+        texture = self._textures.get(key)
+        if texture is None:
+            texture = self._textures[key] = _to_texture(self.image(color, size, scale, badge))
+        return texture
+
+
+class IconAtlas:
+    """
+    Icons of a MarkerIcons packed on demand into shared atlas textures (pages).
+    - place() copies an icon into the next free spot of the current page the
+      first time it is asked for, filling rows bottom-up, and returns
+      (page, TextureRegion); region() returns just the region. A layer draws
+      every marker of a page with one texture.
+    - A full page is kept and a new one started, so regions stay valid.
+      clear() drops every page and raises `generation`; regions from an older
+      generation must be asked for again.
+    """
+
+    def __init__(self, icons, size=ATLAS_SIZE, padding=ATLAS_PADDING):
+        self.icons = icons
+        self.size = size
+        self.padding = padding
+        self.pages = []  # Textures, the last one is being filled
+        self.generation = 0
+        self._regions = {}  # key -> (page, TextureRegion)
+        self._x = self._y = self._row_height = 0
+
+    def _new_page(self):
+        from kivy.graphics.texture import Texture
+        page = Texture.create(size=(self.size, self.size), colorfmt='rgba')
+        page.blit_buffer(bytes(self.size * self.size * 4), colorfmt='rgba', bufferfmt='ubyte')
+        self.pages.append(page)
+        self._x = self._y = self._row_height = 0
+
+    def clear(self):
+        """Drop every page, e.g. when the icons are drawn at a new density"""
+        self.pages = []
+        self._regions = {}
+        self._x = self._y = self._row_height = 0
+        self.generation += 1
+
+    def place(self, color=PIN_BLUE, size=PIN_SIZE, scale=1.0, badge=None):
+        """(page texture, region) of the icon (main thread only)"""
+        key = icon_key(color, size, scale, badge)
+        placed = self._regions.get(key)
+        if placed is not None:
+            return placed
+        img = self.icons.image(color, size, scale, badge)
+        w, h = img.size
+        if w > self.size or h > self.size:
+            raise ValueError(f"Icon {key} does not fit a {self.size} px atlas")
+        if not self.pages:
+            self._new_page()
+        if self._x + w > self.size:
+            self._x, self._y, self._row_height = 0, self._y + self._row_height, 0
+        if self._y + h > self.size:
+            self._new_page()
+        page = self.pages[-1]
+        x, y = self._x, self._y
+        page.blit_buffer(_texture_bytes(img), size=(w, h), pos=(x, y),
+                         colorfmt='rgba', bufferfmt='ubyte')
+        placed = self._regions[key] = (page, page.get_region(x, y, w, h))
+        self._x += w + self.padding
+        self._row_height = max(self._row_height, h + self.padding)
+        return placed
+
+    def region(self, color=PIN_BLUE, size=PIN_SIZE, scale=1.0, badge=None):
+        """The icon's region of its atlas page (main thread only)"""
+        return self.place(color, size, scale, badge)[1]
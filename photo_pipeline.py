@@ -0,0 +1,177 @@
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Longest side (px) of stored photos and of their thumbnails
+PHOTO_MAX_SIZE = 1600
+THUMBNAIL_SIZE = 256
+# Encoder quality (1-100) of photos and thumbnails
+PHOTO_QUALITY = 80
+THUMBNAIL_QUALITY = 70
+# 'WEBP' falls back to 'JPEG' when Pillow was built without WebP
+PHOTO_FORMAT = 'WEBP'
+PHOTO_WORKERS = 2
+STAGES = ('decode', 'downscale', 'orient', 'encode', 'thumbnail', 'store')
+
+
+class PhotoPipeline:
+    """
+    Camera photos turned into compact stored images off the UI thread.
+    - submit() queues a source file on a small worker pool. Each photo is
+      decoded (JPEGs at a reduced DCT scale when that still covers max_size),
+      downscaled to max_size, turned upright from its EXIF orientation (on
+      the small image, where rotating is cheap), encoded as WebP or JPEG and
+      given a thumbnail for map callouts and lists.
+    - Encoded bytes are saved by store(data, ext) as a new file in out_dir,
+      or in blobs (a BlobStore) when given, so a photo processed twice is
+      kept once. The result holds the paths of the photo and its thumbnail.
+    - Seconds spent in every stage are returned per photo and summed for
+      stats().
+    """
+
+    def __init__(self, out_dir, max_size=PHOTO_MAX_SIZE, thumbnail_size=THUMBNAIL_SIZE,
+                 quality=PHOTO_QUALITY, thumbnail_quality=THUMBNAIL_QUALITY,
+                 fmt=PHOTO_FORMAT, workers=PHOTO_WORKERS, blobs=None):
+        self.out_dir = out_dir
+        self.blobs = blobs
+        self.max_size = max_size
+        self.thumbnail_size = thumbnail_size
+        self.quality = quality
+        self.thumbnail_quality = thumbnail_quality
+        self.fmt = fmt.upper()
+        self.workers = workers
+        self._encoding = None  # (Pillow format, file extension)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._totals = dict.fromkeys(STAGES, 0.0)
+        self.processed = 0
+        self.failed = 0
+
+    def encoding(self):
+        """(Pillow format, file extension) photos are saved with"""
+        if self._encoding is None:
+            from PIL import features
+            if self.fmt == 'WEBP' and features.check('webp'):
+                self._encoding = ('WEBP', '.webp')
+            else:
+                self._encoding = ('JPEG', '.jpg')
+        return self._encoding
+
+    def submit(self, src, callback=None):
+        """Process src on the worker pool; callback(result or None) runs on that worker"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='photo')
+            future = self._executor.submit(self._run, src)
+        if callback:
+            future.add_done_callback(lambda f: callback(f.result()))
+        return future
+
+    def _run(self, src):
+        try:
+            return self.process(src)
+        except Exception as e:
+            print(f"Could not process photo {src}: {e}")
+            with self._lock:
+                self.failed += 1
+            return None
+
+    def process(self, src):
+        """Run every stage on one photo in the calling thread; returns the result dict"""
+        from PIL import Image, ImageOps
+        lanczos = getattr(Image, 'Resampling', Image).LANCZOS
+        fmt, ext = self.encoding()
+        timings = {}
+        start = time.perf_counter()
+
+        def lap(stage):
+            nonlocal start
+            now = time.perf_counter()
+            timings[stage] = now - start
+            start = now
+
+        with Image.open(src) as img:
+            w, h = img.size
+            if max(w, h) > self.max_size:
+                # Scaling is uniform, so the longest side still covers max_size
+                # whichever way the EXIF orientation turns the image
+                scale = self.max_size / max(w, h)
+                img.draft('RGB', (int(w * scale) + 1, int(h * scale) + 1))
+            img.load()
+            lap('decode')
+            # A square bound, so it does not matter that the image is not upright yet
+            img.thumbnail((self.max_size, self.max_size), lanczos, reducing_gap=3.0)
+            lap('downscale')
+            upright = ImageOps.exif_transpose(img)
+        if upright.mode not in ('RGB', 'RGBA') or (fmt == 'JPEG' and upright.mode != 'RGB'):
+            upright = upright.convert('RGBA' if fmt != 'JPEG' and 'A' in upright.getbands()
+                                      else 'RGB')
+        lap('orient')
+
+        photo = self._encode(upright, fmt, self.quality)
+        lap('encode')
+
+        thumbnail = upright.copy()
+        thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size), lanczos,
+                            reducing_gap=2.0)
+        thumbnail_data = self._encode(thumbnail, fmt, self.thumbnail_quality)
+        lap('thumbnail')
+
+        result = {
+            'source': src,
+            'photo': self.store(photo, ext),
+            'thumbnail': self.store(thumbnail_data, ext),
+            'size': upright.size,
+            'bytes': len(photo),
+            'thumbnail_bytes': len(thumbnail_data),
+            'timings': timings,
+        }
+        lap('store')
+        with self._lock:
+            self.processed += 1
+            for stage, seconds in timings.items():
+                self._totals[stage] += seconds
+        return result
+
+    @staticmethod
+    def _encode(img, fmt, quality):
+        out = io.BytesIO()
+        if fmt == 'JPEG':
+            img.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+        else:
+            img.save(out, fmt, quality=quality)
+        return out.getvalue()
+
+    def store(self, data, ext):
+        """Save encoded bytes as a new file in out_dir or as a blob; returns its path"""
+        if self.blobs is not None:
+            return self.blobs.path(self.blobs.put(data, ext))
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, uuid.uuid4().hex + ext)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def stats(self):
+        """Photos processed and failed, and mean seconds per stage"""
+        with self._lock:
+            count = self.processed
+            return {
+                'photos': count,
+                'failed': self.failed,
+                'stages': {stage: total / count if count else 0.0
+                           for stage, total in self._totals.items()},
+            }
+
+    def close(self):
+        """Stop the workers; queued photos that have not started are dropped"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
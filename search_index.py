@@ -0,0 +1,200 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+
+# Turkish dotted/dotless i must be mapped before lower(): 'I'.lower() is 'i'
+# and 'İ'.lower() is 'i' + combining dot in Python
+_TURKISH_UPPER = str.maketrans({'I': 'ı', 'İ': 'i'})
+# Fold Turkish letters to ASCII so queries typed without a Turkish keyboard
+# ("kitaplari", "cocuk") still match
+_ASCII_FOLD = str.maketrans('çğıöşüâîû', 'cgiosuaiu')
+_TOKEN_RE = re.compile(r'\w+')
+
+# Field weights for ranking
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def fold_text(text):
+    """Turkish-aware case folding used for both indexing and queries"""
+    return text.translate(_TURKISH_UPPER).lower().translate(_ASCII_FOLD)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold_text(text or ''))
+
+
+class SearchIndex:
+    """
+    Inverted index over item names and descriptions.
+    - token -> {item id: weight}, with name tokens weighted above description tokens.
+    - A sorted vocabulary list gives prefix lookups by bisection, so every query
+      term matches as a word prefix ("kit" finds "Kitaplar").
+    - Multi-term queries return items matching all terms, ranked by a tf-idf
+      style score.
+    """
+
+    def __init__(self):
+        self._postings = {}  # token -> {item id: weight}
+        self._vocabulary = []  # sorted tokens
+        self._items = {}  # item id -> (item, {token: weight})
+        self._lock = threading.RLock()
+        self.version = 0  # bumped on every change
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        with self._lock:
+            if item['id'] in self._items:
+                self.remove(item['id'])
+            weights = {}
+            for token in tokenize(item.get('name')):
+                weights[token] = weights.get(token, 0) + NAME_WEIGHT
+            for token in tokenize(item.get('description')):
+                weights[token] = weights.get(token, 0) + DESCRIPTION_WEIGHT
+            for token, weight in weights.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    bisect.insort(self._vocabulary, token)
+                postings[item['id']] = weight
+            self._items[item['id']] = (item, weights)
+            self.version += 1
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def remove(self, item_id):
+        with self._lock:
+            entry = self._items.pop(item_id, None)
+            if entry is None:
+                return None
+            item, tokens = entry
+            for token in tokens:
+                postings = self._postings[token]
+                postings.pop(item_id, None)
+                if not postings:
+                    del self._postings[token]
+                    del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+            self.version += 1
+            return item
+
+    def on_store_event(self, event, item):
+        """ItemStore listener keeping the index in sync"""
+        if event == 'add':
+            self.add(item)
+        elif event == 'remove':
+            self.remove(item['id'])
+
+    def expand_prefix(self, prefix):
+        """Vocabulary tokens starting with prefix"""
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff', start)
+        return self._vocabulary[start:end]
+
+    def _idf(self, token):
+        return math.log(1 + max(len(self._items), 1) / len(self._postings[token]))
+
+    def _term_scores(self, term, candidates=None):
+        """item id -> score for one query term (exact word beats prefix match)"""
+        tokens = self.expand_prefix(term)
+        scores = {}
+        if candidates is not None and len(candidates) < sum(len(self._postings[t]) for t in tokens):
+            # Narrowing a small earlier result: check each candidate's own tokens
+            for item_id in candidates:
+                entry = self._items.get(item_id)
+                if entry is None:
+                    continue
+                for token, weight in entry[1].items():
+                    if token.startswith(term):
+                        score = weight * self._idf(token) * (2.0 if token == term else 1.0)
+                        if score > scores.get(item_id, 0):
+                            scores[item_id] = score
+            return scores
+        for token in tokens:
+            postings = self._postings[token]
+            factor = self._idf(token) * (2.0 if token == term else 1.0)
+            if not scores:
+                scores = {item_id: weight * factor for item_id, weight in postings.items()}
+                continue
+            for item_id, weight in postings.items():
+                score = weight * factor
+                if score > scores.get(item_id, 0):
+                    scores[item_id] = score
+        if candidates is not None:
+            scores = {i: s for i, s in scores.items() if i in candidates}
+        return scores
+
+    def search_ids(self, query, candidates=None):
+        """item id -> score for items matching every term of query, optionally within candidates"""
+        terms = tokenize(query)
+        if not terms:
+            return {}
+        with self._lock:
+            totals = None
+            # Rarest-looking (longest) terms first shrink the candidate set fastest
+            for term in sorted(set(terms), key=len, reverse=True):
+                scores = self._term_scores(term, candidates if totals is None else totals)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {i: totals[i] + s for i, s in scores.items()}
+                if not totals:
+                    return {}
+            return totals
+
+    def rank(self, scores, limit=None):
+        """Items for an id -> score mapping, best first"""
+        with self._lock:
+            items = self._items
+            scores = {i: s for i, s in scores.items() if i in items}
+            rank = lambda item_id: (-scores[item_id], -items[item_id][0].get('created', 0))
+            # A bounded heap keeps top-N queries cheap when a term matches many items
+            if limit is not None:
+                ranked = heapq.nsmallest(limit, scores, key=rank)
+            else:
+                ranked = sorted(scores, key=rank)
+            return [items[item_id][0] for item_id in ranked]
+
+    def search(self, query, limit=None):
+        """Items matching every term of query, best first"""
+        return self.rank(self.search_ids(query), limit)
+
+
+class IncrementalSearch:
+    """
+    Search-as-you-type on top of a SearchIndex.
+    When the new query only extends the previous one (more letters or more
+    words), every match must already be among the previous matches, so only
+    those are re-scored instead of the whole index.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self._query = None  # folded text of the last query
+        self._scores = None  # its full id -> score result
+        self._version = None  # index version the result was computed against
+        self._lock = threading.Lock()
+
+    def search(self, query, limit=None):
+        """Ranked items for query, narrowing the previous result when possible"""
+        folded = ' '.join(tokenize(query))
+        with self._lock:
+            previous = (self._query, self._scores, self._version)
+        version = self.index.version
+        candidates = None
+        if previous[0] and previous[2] == version and folded.startswith(previous[0]):
+            candidates = previous[1]
+        scores = self.index.search_ids(folded, candidates)
+        with self._lock:
+            self._query, self._scores, self._version = folded, scores, version
+        return self.index.rank(scores, limit)
+
+    def reset(self):
+        """Forget the previous result"""
+        with self._lock:
+            self._query = self._scores = self._version = None
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests of the IP geolocation race against local stub providers.
+Run: python -m unittest test_geolocation
+"""
+
+import threading
+import time
+import unittest
+
+from geolocation import IPLocator, MODE_RACE, MODE_SEQUENTIAL
+from test_support import stub_location_servers
+
+
+def _parse(data):
+    return data.get('lat'), data.get('lon')
+
+
+class FakeFetch:
+    """fetch() for IPLocator: answers per URL after a delay, None raises; counts calls"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = {url: 0 for url in delays}
+        self._lock = threading.Lock()
+
+    def providers(self):
+        return [(url, url, _parse) for url in self.delays]
+
+    def __call__(self, url, timeout):
+        with self._lock:
+            self.calls[url] += 1
+        delay = self.delays[url]
+        if delay is None:
+            raise OSError('stub provider failed')
+        time.sleep(delay)
+        return {'lat': 41.0, 'lon': 29.0, 'url': url}
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class RaceTest(unittest.TestCase):
+
+    def setUp(self):
+        # A slow provider, a failing one and a fast one, over real HTTP
+        self.delays = [0.5, None, 0.02]
+        self.servers = stub_location_servers(self.delays)
+        self.providers = [(f'stub{i}', f'http://127.0.0.1:{server.server_port}/json', _parse)
+                          for i, server in enumerate(self.servers)]
+
+    def tearDown(self):
+        # Let abandoned requests finish before the servers go away
+        time.sleep(max(d for d in self.delays if d is not None))
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def test_first_valid_answer_wins(self):
+        locator = IPLocator(self.providers, mode=MODE_RACE, timeout=2, race_width=None)
+        start = time.perf_counter()
+        result = locator.locate()
+        elapsed = time.perf_counter() - start
+        # The stubs answer lat 41 + their index
+        self.assertEqual(result, (43.0, 29.0, 'stub2'))
+        self.assertLess(elapsed, 0.4)
+
+    def test_slow_and_failing_providers_are_recorded(self):
+        locator = IPLocator(self.providers, mode=MODE_RACE, timeout=2, race_width=None)
+        locator.locate()
+        stats = locator.stats
+        self.assertTrue(_wait_for(lambda: stats['stub0'].successes == 1))
+        self.assertEqual(stats['stub1'].failures, 1)
+        self.assertEqual(stats['stub1'].successes, 0)
+        self.assertEqual(stats['stub2'].successes, 1)
+        self.assertGreater(stats['stub0'].latency, stats['stub2'].latency)
+
+    def test_sequential_skips_failures(self):
+        providers = [self.providers[1], self.providers[2], self.providers[0]]
+        locator = IPLocator(providers, mode=MODE_SEQUENTIAL, timeout=2)
+        self.assertEqual(locator.locate(), (43.0, 29.0, 'stub2'))
+        self.assertEqual(locator.stats['stub1'].failures, 1)
+        self.assertEqual(locator.stats['stub0'].successes + locator.stats['stub0'].failures, 0)
+
+
+class CancelTest(unittest.TestCase):
+
+    def test_losers_are_not_waited_for(self):
+        fetch = FakeFetch({'fast': 0.01, 'slow': 0.5})
+        locator = IPLocator(fetch.providers(), timeout=2, race_width=None, fetch=fetch)
+        start = time.perf_counter()
+        self.assertEqual(locator.locate()[2], 'fast')
+        self.assertLess(time.perf_counter() - start, 0.3)
+        # The abandoned request still finishes and is measured
+        self.assertTrue(_wait_for(lambda: locator.stats['slow'].successes == 1))
+
+    def test_later_rounds_are_cancelled(self):
+        fetch = FakeFetch({'a': 0.01, 'b': 0.05, 'c': 0.01, 'd': 0.01})
+        locator = IPLocator(fetch.providers(), timeout=2, race_width=2, fetch=fetch)
+        self.assertEqual(locator.locate()[2], 'a')
+        time.sleep(0.1)
+        self.assertEqual(fetch.calls, {'a': 1, 'b': 1, 'c': 0, 'd': 0})
+
+    def test_next_round_after_failures(self):
+        fetch = FakeFetch({'a': None, 'b': None, 'c': 0.01})
+        locator = IPLocator(fetch.providers(), timeout=2, race_width=2, fetch=fetch)
+        self.assertEqual(locator.locate()[2], 'c')
+        self.assertIsNone(IPLocator(fetch.providers()[:2], timeout=2, fetch=fetch).locate())
+
+
+class OrderTest(unittest.TestCase):
+
+    def test_default_race_learns_order(self):
+        fetch = FakeFetch({'slow': 0.2, 'failing': None, 'fast': 0.01, 'medium': 0.05})
+        locator = IPLocator(fetch.providers(), timeout=2, fetch=fetch)
+        self.assertEqual(locator.locate()[2], 'slow')
+        for _ in range(3):
+            locator.locate()
+            time.sleep(0.25)  # let the losers be measured
+        order = [name for name, _, _ in locator.ordered_providers()]
+        self.assertEqual(order[0], 'fast')
+        self.assertEqual(order[-1], 'failing')
+        self.assertEqual(locator.locate()[2], 'fast')
+
+    def test_sequential_moves_failing_provider_down(self):
+        fetch = FakeFetch({'failing': None, 'ok': 0.01})
+        locator = IPLocator(fetch.providers(), mode=MODE_SEQUENTIAL, timeout=2, fetch=fetch)
+        self.assertEqual(locator.locate()[2], 'ok')
+        self.assertEqual(locator.locate()[2], 'ok')
+        self.assertEqual(fetch.calls['failing'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the tests and benchmark.py; test_* files stay out of the APK.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_location_servers(delays):
+    """Local HTTP servers answering like an IP geolocation API after a delay (None: HTTP 500)"""
+    servers = []
+    for index, delay in enumerate(delays):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real providers
+            disable_nagle_algorithm = True
+
+            def do_GET(self, delay=delay, index=index):
+                if delay is None:
+                    self.send_error(500)
+                    return
+                time.sleep(delay)
+                body = json.dumps({'lat': 41.0 + index, 'lon': 29.0}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
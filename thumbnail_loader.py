@@ -0,0 +1,235 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from kivy.clock import Clock
+
+from tile_cache import TileCache
+
+# Longest side (px) of decoded thumbnails
+THUMBNAIL_SIZE = 256
+# Decoded textures kept in memory (4 bytes per pixel) and thumbnails kept on disk
+TEXTURE_CACHE_BYTES = 32 * 1024 * 1024
+DISK_CACHE_BYTES = 20 * 1024 * 1024
+LOADER_WORKERS = 2
+# iOS system gray 5, shown until a thumbnail arrives
+PLACEHOLDER_COLOR = (229, 229, 234, 255)
+
+
+class ThumbnailRequest:
+    """A widget waiting for a thumbnail; cancel() once it shows something else"""
+    __slots__ = ('path', 'callback', 'cancelled')
+
+    def __init__(self, path, callback):
+        self.path = path
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ThumbnailLoader:
+    """
+    Thumbnails decoded off the UI thread into an LRU of Kivy textures.
+    - load(path, callback) calls back at once from the texture LRU, which is
+      bounded by texture bytes. Otherwise a worker decodes and downscales the
+      file and callback(texture) runs on the main thread; None means the file
+      could not be read.
+    - Requests are served newest first, as a scrolling list wants the rows it
+      just showed. A path whose requests were all cancelled is not decoded.
+    - Thumbnails of images larger than `size` are saved in cache_dir, a
+      size-bounded TileCache, so the next start decodes the small file.
+    - `placeholder` is a plain texture to show while waiting.
+    """
+
+    def __init__(self, cache_dir=None, size=THUMBNAIL_SIZE, max_bytes=TEXTURE_CACHE_BYTES,
+                 disk_max_bytes=DISK_CACHE_BYTES, workers=LOADER_WORKERS,
+                 placeholder_color=PLACEHOLDER_COLOR):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.placeholder_color = placeholder_color
+        self.disk_cache = (TileCache(cache_dir, max_bytes=disk_max_bytes, name='Thumbnail cache')
+                           if cache_dir else None)
+        self._textures = OrderedDict()  # path -> Texture, least recently used first
+        self._bytes = 0
+        self._failed = set()  # paths that could not be decoded
+        self._waiting = {}  # path -> [ThumbnailRequest] being decoded or queued
+        self._stack = []  # paths to decode, newest last
+        self._cond = threading.Condition()
+        self._started = False
+        self._closed = False
+        self._placeholder = None
+        self.hits = 0
+        self.misses = 0
+        self.decoded = 0
+        self.skipped = 0  # queued paths nobody waited for any more
+
+    @property
+    def placeholder(self):
+        """Texture to show until a thumbnail arrives and for unreadable files"""
+        if self._placeholder is None:
+            from kivy.graphics.texture import Texture
+            self._placeholder = Texture.create(size=(1, 1), colorfmt='rgba')
+            self._placeholder.blit_buffer(bytes(self.placeholder_color), colorfmt='rgba',
+                                          bufferfmt='ubyte')
+        return self._placeholder
+
+    def load(self, path, callback):
+        """Get path's thumbnail texture into callback (main thread only); returns the
+        request to cancel, or None when callback already ran"""
+        if not path or path in self._failed:
+            callback(None)
+            return None
+        texture = self._textures.get(path)
+        if texture is not None:
+            self.hits += 1
+            self._textures.move_to_end(path)
+            callback(texture)
+            return None
+        self.misses += 1
+        request = ThumbnailRequest(path, callback)
+        with self._cond:
+            if self._closed:
+                return request
+            waiting = self._waiting.get(path)
+            if waiting is None:
+                self._waiting[path] = [request]
+                self._stack.append(path)
+            else:
+                waiting.append(request)
+                # Still queued: the row was shown again, so it is the newest request
+                if path in self._stack:
+                    self._stack.remove(path)
+                    self._stack.append(path)
+            if not self._started:
+                self._started = True
+                for i in range(self.workers):
+                    threading.Thread(target=self._work, daemon=True,
+                                     name=f'thumbnail-{i}').start()
+            self._cond.notify()
+        return request
+
+    def close(self):
+        """Stop the workers and save the disk cache index"""
+        with self._cond:
+            self._closed = True
+            self._stack = []
+            self._waiting.clear()
+            self._cond.notify_all()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._stack and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path = self._stack.pop()
+                requests = self._waiting.get(path, ())
+                if all(request.cancelled for request in requests):
+                    self._waiting.pop(path, None)
+                    self.skipped += 1
+                    continue
+            try:
+                result = self.decode(path)
+            except Exception as e:
+                print(f"Could not load thumbnail {path}: {e}")
+                result = None
+            Clock.schedule_once(lambda dt, path=path, result=result: self._deliver(path, result))
+
+    def _cache_name(self, path, stat):
+        key = f'{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.size}'
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + '.png'
+
+    def decode(self, path):
+        """(size, RGBA bytes bottom-up) of path's thumbnail; blocking, any thread"""
+        from PIL import Image, ImageOps
+        stat = os.stat(path)
+        name = None
+        if self.disk_cache is not None:
+            name = self._cache_name(path, stat)
+            if self.disk_cache.touch(name):
+                try:
+                    with Image.open(self.disk_cache.path(name)) as cached:
+                        return self._rgba(cached)
+                except OSError:
+                    self.disk_cache.discard(name)
+        with Image.open(path) as img:
+            larger = max(img.size) > self.size
+            if larger:
+                scale = self.size / max(img.size)
+                img.draft('RGB', (int(img.width * scale) + 1, int(img.height * scale) + 1))
+                img.thumbnail((self.size, self.size), getattr(Image, 'Resampling', Image).LANCZOS,
+                              reducing_gap=2.0)
+            img = ImageOps.exif_transpose(img)
+        if larger and name is not None:
+            data = io.BytesIO()
+            img.save(data, 'PNG', compress_level=1)
+            tmp_path = None
+            try:
+                os.makedirs(self.disk_cache.cache_dir, exist_ok=True)
+                # Written aside and renamed, so a reader never opens a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=self.disk_cache.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data.getvalue())
+                os.replace(tmp_path, self.disk_cache.path(name))
+                self.disk_cache.add(name, data.tell())
+            except OSError as e:
+                print(f"Could not cache thumbnail {name}: {e}")
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return self._rgba(img)
+
+    @staticmethod
+    def _rgba(img):
+        from PIL import Image
+        img = img.convert('RGBA')
+        flip = getattr(Image, 'Transpose', Image).FLIP_TOP_BOTTOM  # Kivy rows go bottom-up
+        return img.size, img.transpose(flip).tobytes()
+
+    def _deliver(self, path, result):
+        with self._cond:
+            requests = self._waiting.pop(path, [])
+        texture = None
+        if result is None:
+            self._failed.add(path)
+        else:
+            from kivy.graphics.texture import Texture
+            size, data = result
+            texture = Texture.create(size=size, colorfmt='rgba')
+            texture.blit_buffer(data, colorfmt='rgba', bufferfmt='ubyte')
+            self.decoded += 1
+            self._remember(path, texture)
+        for request in requests:
+            if not request.cancelled:
+                request.callback(texture)
+
+    def _remember(self, path, texture):
+        old = self._textures.pop(path, None)
+        if old is not None:
+            self._bytes -= old.width * old.height * 4
+        self._textures[path] = texture
+        self._bytes += texture.width * texture.height * 4
+        while self._bytes > self.max_bytes and len(self._textures) > 1:
+            _, evicted = self._textures.popitem(last=False)
+            self._bytes -= evicted.width * evicted.height * 4
+
+    def stats(self):
+        """Counters and the memory cache hit ratio since startup"""
+        lookups = self.hits + self.misses
+        return {
+            'textures': len(self._textures),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'decoded': self.decoded,
+            'skipped': self.skipped,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
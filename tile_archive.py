@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Packed map tile storage in a single MBTiles (SQLite) file.
+Run: python tile_archive.py <cache dir> <archive.mbtiles>   to import loose tiles
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+# Loose cache files: {cache_key}_{zoom}_{x}_{y}.{ext}, y counted bottom-up
+TILE_FILE_RE = re.compile(r'^(?P<key>[^_]+)_(?P<z>\d+)_(?P<x>\d+)_(?P<y>\d+)\.(?P<ext>png|jpe?g|webp)$')
+# Flush batched access times after this many reads
+ACCESS_FLUSH_EVERY = 200
+
+
+class TileArchive:
+    """
+    Map tiles packed into one MBTiles file instead of one PNG per tile.
+    - Tiles live in the standard `tiles` table (zoom_level, tile_column,
+      tile_row, tile_data) with rows counted bottom-up, which is also how
+      MapView numbers them, so the file opens in any MBTiles reader.
+    - An extra `accessed` column keeps the last read time; reads are batched
+      into it, and past max_bytes the least recently used tiles are deleted.
+    - One connection is shared by all threads under a lock, in WAL mode so
+      readers are not blocked by writes.
+    """
+
+    def __init__(self, path, max_bytes=None, name='Freevia tiles'):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.name = name
+        self._conn = None
+        self._bytes = 0  # sum of tile_data lengths
+        self._accessed = {}  # (z, x, y) -> last read time not yet written
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+        with self._lock:
+            if self._conn is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+                conn.executescript('''
+                    CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+                    CREATE TABLE IF NOT EXISTS tiles (
+                        zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                        tile_data BLOB, accessed REAL,
+                        PRIMARY KEY (zoom_level, tile_column, tile_row));
+                    CREATE INDEX IF NOT EXISTS tiles_accessed ON tiles (accessed);
+                ''')
+                conn.executemany('INSERT OR IGNORE INTO metadata VALUES (?, ?)',
+                                 [('name', self.name), ('format', 'png'),
+                                  ('type', 'baselayer'), ('version', '1')])
+                conn.commit()
+                self._bytes = conn.execute('SELECT COALESCE(SUM(LENGTH(tile_data)), 0) '
+                                           'FROM tiles').fetchone()[0]
+                self._conn = conn
+        return self._conn
+
+    def get(self, zoom, x, y):
+        """Tile bytes or None"""
+        conn = self._connect()
+        with self._lock:
+            row = conn.execute('SELECT tile_data FROM tiles WHERE zoom_level=? AND '
+                               'tile_column=? AND tile_row=?', (zoom, x, y)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._accessed[(zoom, x, y)] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_EVERY:
+                self._flush_access()
+            return row[0]
+
+    def __contains__(self, tile):
+        conn = self._connect()
+        with self._lock:
+            return conn.execute('SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? '
+                                'AND tile_row=?', tile).fetchone() is not None
+
+    def __len__(self):
+        conn = self._connect()
+        with self._lock:
+            return conn.execute('SELECT COUNT(*) FROM tiles').fetchone()[0]
+
+    @property
+    def size_bytes(self):
+        """Bytes of tile data (the file itself also holds indexes and free pages)"""
+        self._connect()
+        return self._bytes
+
+    def put(self, zoom, x, y, data):
+        self.put_many([(zoom, x, y, data)])
+
+    def put_many(self, tiles):
+        """Store (zoom, x, y, data) tuples in one transaction"""
+        conn = self._connect()
+        now = time.time()
+        with self._lock:
+            with conn:
+                for z, x, y, data in tiles:
+                    old = conn.execute('SELECT LENGTH(tile_data) FROM tiles WHERE zoom_level=? '
+                                       'AND tile_column=? AND tile_row=?', (z, x, y)).fetchone()
+                    conn.execute('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?)',
+                                 (z, x, y, sqlite3.Binary(data), now))
+                    self._bytes += len(data) - (old[0] if old else 0)
+            self._evict()
+
+    def _flush_access(self):
+        if not self._accessed:
+            return
+        accessed, self._accessed = self._accessed, {}
+        with self._conn:
+            self._conn.executemany('UPDATE tiles SET accessed=? WHERE zoom_level=? AND '
+                                   'tile_column=? AND tile_row=?',
+                                   [(t, z, x, y) for (z, x, y), t in accessed.items()])
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return 0
+        excess = self._bytes - self.max_bytes
+        if excess <= 0:
+            return 0
+        self._flush_access()
+        victims = []
+        for z, x, y, size in self._conn.execute(
+                'SELECT zoom_level, tile_column, tile_row, LENGTH(tile_data) FROM tiles '
+                'ORDER BY accessed'):
+            victims.append((z, x, y))
+            self._bytes -= size
+            self.evictions += 1
+            excess -= size
+            if excess <= 0:
+                break
+        with self._conn:
+            self._conn.executemany('DELETE FROM tiles WHERE zoom_level=? AND tile_column=? '
+                                   'AND tile_row=?', victims)
+        return len(victims)
+
+    def import_directory(self, cache_dir, remove=False, batch=500):
+        """Pack loose cache tiles into the archive; returns the number imported"""
+        names = [name for name in os.listdir(cache_dir) if TILE_FILE_RE.match(name)]
+        imported = 0
+        for start in range(0, len(names), batch):
+            tiles = []
+            for name in names[start:start + batch]:
+                match = TILE_FILE_RE.match(name)
+                with open(os.path.join(cache_dir, name), 'rb') as f:
+                    tiles.append((int(match['z']), int(match['x']), int(match['y']), f.read()))
+            self.put_many(tiles)
+            imported += len(tiles)
+        if remove:
+            for name in names:
+                os.remove(os.path.join(cache_dir, name))
+        return imported
+
+    def stats(self):
+        """Counters and the hit ratio since startup, like TileCache.stats()"""
+        lookups = self.hits + self.misses
+        return {
+            'tiles': len(self),
+            'bytes': self.size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_access()
+            self._conn.close()
+            self._conn = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('cache_dir', help='folder with {key}_{zoom}_{x}_{y}.png tiles')
+    parser.add_argument('archive', help='MBTiles file to create or extend')
+    parser.add_argument('--remove', action='store_true',
+                        help='delete the loose files after importing them')
+    args = parser.parse_args(argv)
+    archive = TileArchive(args.archive)
+    try:
+        count = archive.import_directory(args.cache_dir, remove=args.remove)
+    finally:
+        archive.close()
+    print(f"Imported {count} tiles into {args.archive}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
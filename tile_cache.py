@@ -0,0 +1,211 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+INDEX_FILE = 'tile_index.json'
+# Save the index after this many changes (it is also saved on close)
+SAVE_EVERY = 200
+# Only these files in the cache directory are tiles
+TILE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+class TileCache:
+    """
+    Size-bounded LRU bookkeeping for the map tile cache directory.
+    - An index (file name -> size, last access) is kept in memory in LRU order
+      and saved as tile_index.json next to the tiles, so startup never lists the
+      directory. Without an index the directory is scanned once.
+    - touch() records a hit, add() a newly stored tile; when the cache grows
+      past max_bytes or max_tiles the least recently used tiles are deleted.
+    - Hits, misses and evictions are counted for stats().
+    """
+
+    def __init__(self, cache_dir, max_bytes=50 * 1024 * 1024, max_tiles=5000, name='Tile cache'):
+        self.cache_dir = cache_dir
+        self.name = name  # for log messages
+        self.max_bytes = max_bytes
+        self.max_tiles = max_tiles
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+        self._tiles = OrderedDict()  # file name -> [size, last access], oldest first
+        self._bytes = 0
+        self._dirty = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+
+    def load(self):
+        """Read the index, or build it from the directory the first time"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._tiles = OrderedDict()
+            entries = None
+            if os.path.exists(self.index_path):
+                try:
+                    with open(self.index_path, 'r', encoding='utf-8') as f:
+                        entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Rebuilding unreadable tile index: {e}")
+            if entries is None:
+                entries = self._scan()
+                self._dirty = 1
+            for name, size, last_access in sorted(entries, key=lambda entry: entry[2]):
+                self._tiles[name] = [size, last_access]
+            self._bytes = sum(size for size, _ in self._tiles.values())
+            self._loaded = True
+            print(f"{self.name} loaded: {len(self._tiles)} files, "
+                  f"{self._bytes / 1024 / 1024:.1f} MB in {self.cache_dir}")
+            self._evict()
+
+    def _scan(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(TILE_EXTENSIONS):
+                    stat = entry.stat()
+                    entries.append((entry.name, stat.st_size, stat.st_mtime))
+        return entries
+
+    def save(self, wait=True):
+        """Write the index if it changed; with wait=False skip it while another save runs"""
+        # Saves run one at a time, each snapshotting after the previous one wrote,
+        # so an older index never replaces a newer one
+        if not self._save_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                if not self._dirty:
+                    return
+                entries = [(name, size, last_access)
+                           for name, (size, last_access) in self._tiles.items()]
+                self._dirty = 0
+            tmp_path = None
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, separators=(',', ':'))
+                os.replace(tmp_path, self.index_path)
+            except OSError as e:
+                print(f"Could not save tile index: {e}")
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self._lock:
+                    self._dirty += 1  # try again on the next save
+        finally:
+            self._save_lock.release()
+
+    def close(self):
+        self.save()
+
+    def _changed(self):
+        self._dirty += 1
+        if self._dirty >= SAVE_EVERY:
+            # Called under _lock: waiting for a running save could deadlock with it
+            self.save(wait=False)
+
+    def path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def __contains__(self, name):
+        self.load()
+        return name in self._tiles
+
+    def __len__(self):
+        self.load()
+        return len(self._tiles)
+
+    @property
+    def size_bytes(self):
+        self.load()
+        return self._bytes
+
+    def touch(self, name):
+        """Record a lookup of name; True (a hit) if the tile is cached"""
+        self.load()
+        with self._lock:
+            entry = self._tiles.get(name)
+            if entry is None:
+                self.misses += 1
+                return False
+            self.hits += 1
+            entry[1] = time.time()
+            self._tiles.move_to_end(name)
+            self._changed()
+            return True
+
+    def add(self, name, size=None):
+        """Record a tile file that was just written, evicting old tiles if needed"""
+        self.load()
+        if size is None:
+            try:
+                size = os.path.getsize(self.path(name))
+            except OSError:
+                return
+        with self._lock:
+            old = self._tiles.pop(name, None)
+            if old is not None:
+                self._bytes -= old[0]
+            self._tiles[name] = [size, time.time()]
+            self._bytes += size
+            self._changed()
+            self._evict(keep=name)
+
+    def discard(self, name):
+        """Forget a tile and delete its file"""
+        self.load()
+        with self._lock:
+            entry = self._tiles.pop(name, None)
+            if entry is None:
+                return
+            self._bytes -= entry[0]
+            self._changed()
+        self._remove_file(name)
+
+    def _evict(self, keep=None):
+        victims = []
+        with self._lock:
+            while self._tiles and (self._bytes > self.max_bytes or
+                                   len(self._tiles) > self.max_tiles):
+                name, (size, _) = next(iter(self._tiles.items()))
+                if name == keep:
+                    break
+                del self._tiles[name]
+                self._bytes -= size
+                self.evictions += 1
+                victims.append(name)
+            if victims:
+                self._changed()
+        for name in victims:
+            self._remove_file(name)
+        return len(victims)
+
+    def _remove_file(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not delete cached tile {name}: {e}")
+
+    def stats(self):
+        """Counters and the hit ratio since startup"""
+        lookups = self.hits + self.misses
+        return {
+            'tiles': len(self),
+            'bytes': self.size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
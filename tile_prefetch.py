@@ -0,0 +1,370 @@
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from clustering import world_pixel, TILE_SIZE
+from item_store import EARTH_RADIUS_KM
+
+JOB_FILE = 'prefetch_job.json'
+# Parallel downloads and overall request rate (requests per second)
+PREFETCH_WORKERS = 4
+PREFETCH_RATE = 8.0
+
+
+def tile_range(bbox, zoom):
+    """Inclusive (x0, y0, x1, y1) of the XYZ (top-down) tiles covering bbox at zoom"""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    last = (1 << zoom) - 1
+    x0, y0 = world_pixel(max_lat, min_lon, zoom)
+    x1, y1 = world_pixel(min_lat, max_lon, zoom)
+    return (max(0, int(x0 // TILE_SIZE)), max(0, int(y0 // TILE_SIZE)),
+            min(last, int(x1 // TILE_SIZE)), min(last, int(y1 // TILE_SIZE)))
+
+
+def region_tiles(bbox, min_zoom, max_zoom):
+    """(zoom, x, y) of every tile covering bbox, y counted bottom-up as in MapView"""
+    for zoom in range(min_zoom, max_zoom + 1):
+        x0, y0, x1, y1 = tile_range(bbox, zoom)
+        rows = 1 << zoom
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield zoom, x, rows - 1 - y
+
+
+def bbox_around(lat, lon, radius_km):
+    """(min_lat, min_lon, max_lat, max_lon) of a square about radius_km around a point"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlon = min(180.0, dlat / max(math.cos(math.radians(lat)), 1e-6))
+    return (max(-90.0, lat - dlat), max(-180.0, lon - dlon),
+            min(90.0, lat + dlat), min(180.0, lon + dlon))
+
+
+def count_region_tiles(bbox, min_zoom, max_zoom):
+    total = 0
+    for zoom in range(min_zoom, max_zoom + 1):
+        x0, y0, x1, y1 = tile_range(bbox, zoom)
+        total += (x1 - x0 + 1) * (y1 - y0 + 1)
+    return total
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class RegionPrefetch:
+    """
+    Downloads every tile of a bounding box over a zoom range into the tile store.
+    - Tiles already in the cache are skipped, so a job interrupted by a crash
+      or app exit resumes where it stopped; the job itself is kept in
+      prefetch_job.json until all its tiles are cached or it is cancelled.
+    - A bounded worker pool downloads in parallel, spaced by a shared rate
+      limiter to respect the tile server's usage policy.
+    - progress(done, total, failed) is called from worker threads.
+    is_cached(zoom, x, y) tells which tiles are already stored; missing ones
+    are fetched with fetch(zoom, x, y) -> bytes or None and written with
+    store(zoom, x, y, data).
+    """
+
+    def __init__(self, cache_dir, bbox, min_zoom, max_zoom, is_cached, fetch, store,
+                 progress=None, workers=PREFETCH_WORKERS, rate=PREFETCH_RATE):
+        self.cache_dir = cache_dir
+        self.bbox = tuple(bbox)
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.is_cached = is_cached
+        self.fetch = fetch
+        self.store = store
+        self.progress = progress
+        self.workers = workers
+        self.total = count_region_tiles(self.bbox, min_zoom, max_zoom)
+        self.done = 0
+        self.failed = 0
+        self._limiter = RateLimiter(rate)
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self.job_path = os.path.join(cache_dir, JOB_FILE)
+
+    @staticmethod
+    def load_job(cache_dir):
+        """(bbox, min_zoom, max_zoom) of an unfinished job, or None"""
+        path = os.path.join(cache_dir, JOB_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                job = json.load(f)
+            return tuple(job['bbox']), int(job['min_zoom']), int(job['max_zoom'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable prefetch job: {e}")
+            return None
+
+    def _save_job(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.job_path, 'w', encoding='utf-8') as f:
+                json.dump({'bbox': self.bbox, 'min_zoom': self.min_zoom,
+                           'max_zoom': self.max_zoom}, f)
+        except OSError as e:
+            print(f"Could not save prefetch job: {e}")
+
+    def _clear_job(self):
+        try:
+            os.remove(self.job_path)
+        except FileNotFoundError:
+            pass
+
+    def start(self):
+        """Run the job on a background thread"""
+        self._save_job()
+        threading.Thread(target=self.run, daemon=True, name='tile-prefetch').start()
+
+    def cancel(self):
+        """Stop after the downloads in flight and forget the job"""
+        self._cancelled.set()
+        self._clear_job()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def run(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers,
+                                    thread_name_prefix='tile-prefetch') as executor:
+                # Submitting lazily keeps at most a few tiles queued per worker
+                pending = set()
+                for tile in region_tiles(self.bbox, self.min_zoom, self.max_zoom):
+                    if self.cancelled:
+                        break
+                    if len(pending) >= self.workers * 4:
+                        _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.add(executor.submit(self._fetch_tile, *tile))
+            # A job with failed tiles stays saved so the next resume retries them
+            if not self.cancelled and not self.failed:
+                self._clear_job()
+        finally:
+            self._finished.set()
+        print(f"Tile prefetch {'cancelled' if self.cancelled else 'finished'}: "
+              f"{self.done}/{self.total} tiles, {self.failed} failed")
+
+    def _fetch_tile(self, zoom, x, y):
+        ok = True
+        if not self.is_cached(zoom, x, y) and not self.cancelled:
+            self._limiter.wait()
+            data = self.fetch(zoom, x, y)
+            ok = data is not None
+            if ok:
+                try:
+                    self.store(zoom, x, y, data)
+                except Exception as e:
+                    print(f"Could not cache tile {zoom}/{x}/{y}: {e}")
+                    ok = False
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            done, failed = self.done, self.failed
+        if self.progress:
+            self.progress(done, self.total, failed)
+
+
+# Predictive prefetching while the map moves
+PREDICT_LOOKAHEAD = 1.0  # seconds of motion to prefetch ahead
+PREDICT_MAX_AHEAD = 2  # at most this many tile rows/columns ahead
+PREDICT_MIN_SPEED = 64.0  # px/s below which the map counts as still
+PREDICT_TURN_COS = 0.5  # turning more than 60 degrees cancels queued tiles
+PREDICT_ALPHA = 0.5  # smoothing of the velocity estimate
+
+
+class PanPredictor:
+    """
+    Estimates map motion from successive centers and zooms and predicts the
+    tiles needed next.
+    - Velocity is a moving average in world pixels per second at the current
+      zoom; a zoom change rescales the last position so motion carries over.
+    - A sharp change of direction bumps `generation`, telling a PrefetchQueue
+      that tiles queued for the old direction are stale.
+    """
+
+    def __init__(self, lookahead=PREDICT_LOOKAHEAD, max_ahead=PREDICT_MAX_AHEAD):
+        self.lookahead = lookahead
+        self.max_ahead = max_ahead
+        self.generation = 0
+        self.velocity = (0.0, 0.0)
+        self.zoom_trend = 0  # +1 zooming in, -1 zooming out
+        self._last = None  # (time, x, y, zoom)
+        self._direction = None  # unit vector of the last real motion
+
+    def observe(self, lat, lon, zoom, now=None):
+        """Record the map center; returns True if the direction changed sharply"""
+        now = time.monotonic() if now is None else now
+        zoom = int(zoom)
+        x, y = world_pixel(lat, lon, zoom)
+        turned = False
+        if self._last is not None:
+            last_time, last_x, last_y, last_zoom = self._last
+            if zoom != last_zoom:
+                self.zoom_trend = 1 if zoom > last_zoom else -1
+                scale = 2.0 ** (zoom - last_zoom)
+                last_x, last_y = last_x * scale, last_y * scale
+                self.velocity = (self.velocity[0] * scale, self.velocity[1] * scale)
+            dt = now - last_time
+            if dt > 0:
+                vx = (x - last_x) / dt
+                vy = (y - last_y) / dt
+                self.velocity = (self.velocity[0] + PREDICT_ALPHA * (vx - self.velocity[0]),
+                                 self.velocity[1] + PREDICT_ALPHA * (vy - self.velocity[1]))
+            speed = math.hypot(*self.velocity)
+            if speed >= PREDICT_MIN_SPEED:
+                direction = (self.velocity[0] / speed, self.velocity[1] / speed)
+                if self._direction is not None and (
+                        direction[0] * self._direction[0] +
+                        direction[1] * self._direction[1]) < PREDICT_TURN_COS:
+                    self.generation += 1
+                    turned = True
+                self._direction = direction
+        self._last = (now, x, y, zoom)
+        return turned
+
+    def predict(self, bbox, zoom, max_zoom=19):
+        """[(priority, (zoom, x, y))] to prefetch, MapView (bottom-up) tile rows"""
+        zoom = int(zoom)
+        x0, y0, x1, y1 = tile_range(bbox, zoom)
+        last = (1 << zoom) - 1
+        tiles = []
+        # Next tiles in the direction of motion, nearest rows/columns first
+        vx, vy = self.velocity
+        if math.hypot(vx, vy) >= PREDICT_MIN_SPEED:
+            dx = max(-self.max_ahead, min(self.max_ahead,
+                                          int(math.ceil(abs(vx) * self.lookahead / TILE_SIZE))))
+            dy = max(-self.max_ahead, min(self.max_ahead,
+                                          int(math.ceil(abs(vy) * self.lookahead / TILE_SIZE))))
+            dx = dx if vx > 0 else -dx
+            dy = dy if vy > 0 else -dy
+            ex0, ex1 = min(x0, x0 + dx), max(x1, x1 + dx)
+            ey0, ey1 = min(y0, y0 + dy), max(y1, y1 + dy)
+            for x in range(max(0, ex0), min(last, ex1) + 1):
+                for y in range(max(0, ey0), min(last, ey1) + 1):
+                    if x0 <= x <= x1 and y0 <= y <= y1:
+                        continue
+                    ring = max(0 if x0 <= x <= x1 else min(abs(x - x0), abs(x - x1)),
+                               0 if y0 <= y <= y1 else min(abs(y - y0), abs(y - y1)))
+                    tiles.append((ring, (zoom, x, last - y)))
+        # The adjacent zoom level around the center, after the tiles ahead
+        next_zoom = zoom - 1 if self.zoom_trend < 0 else zoom + 1
+        if 0 <= next_zoom <= max_zoom:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            if next_zoom > zoom:
+                # Zooming in shows the middle half of the current view
+                dlat, dlon = (max_lat - min_lat) / 4, (max_lon - min_lon) / 4
+                bbox = (min_lat + dlat, min_lon + dlon, max_lat - dlat, max_lon - dlon)
+            nx0, ny0, nx1, ny1 = tile_range(bbox, next_zoom)
+            next_last = (1 << next_zoom) - 1
+            for x in range(nx0, nx1 + 1):
+                for y in range(ny0, ny1 + 1):
+                    tiles.append((self.max_ahead + 1, (next_zoom, x, next_last - y)))
+        tiles.sort(key=lambda entry: entry[0])
+        return tiles
+
+
+class PrefetchQueue:
+    """
+    Low-priority background tile fetching for predicted tiles.
+    - Tiles are fetched best priority first by a few workers under a rate
+      limit; already cached, queued or in-flight tiles are skipped.
+    - Submitting with a newer generation drops everything still queued, so
+      tiles predicted for an abandoned direction are never fetched.
+    - At most max_pending tiles wait; the lowest-priority ones are dropped.
+    """
+
+    def __init__(self, is_cached, fetch, store, workers=2, rate=PREFETCH_RATE, max_pending=64):
+        self.is_cached = is_cached
+        self.fetch = fetch
+        self.store = store
+        self.max_pending = max_pending
+        self.generation = 0
+        self.fetched = 0
+        self.dropped = 0
+        self._queue = []  # heap of (priority, seq, tile)
+        self._queued = set()
+        self._in_flight = set()
+        self._seq = 0
+        self._limiter = RateLimiter(rate)
+        self._cond = threading.Condition()
+        self._closed = False
+        for i in range(workers):
+            threading.Thread(target=self._work, daemon=True, name=f'tile-predict-{i}').start()
+
+    def submit(self, tiles, generation=None):
+        """Queue [(priority, (zoom, x, y))]"""
+        with self._cond:
+            if generation is not None and generation > self.generation:
+                self.dropped += len(self._queue)
+                self._queue = []
+                self._queued.clear()
+                self.generation = generation
+            for priority, tile in tiles:
+                if tile in self._queued or tile in self._in_flight:
+                    continue
+                self._seq += 1
+                heapq.heappush(self._queue, (priority, self._seq, tile))
+                self._queued.add(tile)
+            if len(self._queue) > self.max_pending:
+                keep = heapq.nsmallest(self.max_pending, self._queue)
+                self.dropped += len(self._queue) - len(keep)
+                self._queue = keep
+                heapq.heapify(self._queue)
+                self._queued = {tile for _, _, tile in keep}
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._queue = []
+            self._queued.clear()
+            self._cond.notify_all()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, _, tile = heapq.heappop(self._queue)
+                self._queued.discard(tile)
+                self._in_flight.add(tile)
+            try:
+                if not self.is_cached(*tile):
+                    self._limiter.wait()
+                    data = self.fetch(*tile)
+                    if data is not None:
+                        self.store(*tile, data)
+                        with self._cond:
+                            self.fetched += 1
+            except Exception as e:
+                print(f"Tile prefetch error for {tile}: {e}")
+            finally:
+                with self._cond:
+                    self._in_flight.discard(tile)
@@ -0,0 +1,195 @@
+import csv
+import io
+import os
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: no advisory locks, O_APPEND still keeps rows whole
+
+# Flush policies for new registrations
+FLUSH_IMMEDIATE = 'immediate'  # write + fsync on every add (safest)
+FLUSH_BATCHED = 'batched'      # group commit by batch size or delay
+
+
+class UserStore:
+    """
+    Hash-indexed user store backed by the users CSV file.
+    - The CSV is read once on first use and kept in a username -> password dict.
+    - New users go into the index immediately and are written to the CSV either
+      right away or in group commits, depending on the flush policy.
+    - Each flush is a single O_APPEND write under an exclusive file lock, so rows
+      from concurrent threads or processes never interleave.
+    """
+
+    def __init__(self, path, flush_policy=FLUSH_IMMEDIATE, max_batch=32, max_delay=0.5,
+                 fsync=True):
+        self.path = path
+        self.flush_policy = flush_policy
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self._users = {}
+        self._loaded = False
+        self._offset = 0  # bytes of the CSV already merged into the index
+        self._pending = []
+        self._flush_timer = None
+        self._lock = threading.RLock()
+
+    def load(self):
+        """Build the in-memory index from the CSV file (one-time migration)"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._users = {}
+            self._offset = 0
+            self._merge_new_rows()
+            self._loaded = True
+            print(f"User store loaded: {len(self._users)} users from {self.path}")
+
+    def reload(self):
+        """Drop the index and read the CSV again (e.g. after an external edit)"""
+        with self._lock:
+            self.flush()
+            self._loaded = False
+            self.load()
+
+    def _merge_new_rows(self):
+        """Index rows appended to the CSV since the last read (by us or other processes);
+        returns them as {username: password}, first row per name"""
+        rows = {}
+        if not os.path.exists(self.path):
+            return rows
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Only consume complete lines; a partial tail is picked up next time
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return rows
+        self._offset += end
+        text = data[:end].decode('utf-8')
+        for row in csv.reader(io.StringIO(text)):
+            if row:
+                # First row wins, matching the old linear scan
+                rows.setdefault(row[0], row[1] if len(row) >= 2 else None)
+        for username, password in rows.items():
+            self._users.setdefault(username, password)
+        return rows
+
+    def __len__(self):
+        self.load()
+        return len(self._users)
+
+    def exists(self, username):
+        self.load()
+        return username in self._users
+
+    def check(self, username, password):
+        self.load()
+        stored = self._users.get(username)
+        return stored is not None and stored == password
+
+    def _sync(self):
+        """Index rows other processes appended, waiting for a write in progress"""
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return  # nothing new since the last read
+        except OSError:
+            return
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+            self._merge_new_rows()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def add(self, username, password, wait=False):
+        """
+        Register a user. Returns False if the username is already taken.
+        The user is visible to exists()/check() immediately; the CSV write follows
+        the flush policy. With wait=True (or FLUSH_IMMEDIATE) the row is written
+        before returning, and False also means another process registered the
+        name in the meantime.
+        """
+        with self._lock:
+            self.load()
+            self._sync()
+            if username in self._users:
+                return False
+            self._users[username] = password
+            self._pending.append((username, password))
+            if (wait or self.flush_policy == FLUSH_IMMEDIATE
+                    or len(self._pending) >= self.max_batch):
+                return username not in self._flush()
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.max_delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+            return True
+
+    def flush(self):
+        """Write all pending registrations to the CSV as one atomic append; returns
+        the number of rows written"""
+        with self._lock:
+            pending = len(self._pending)
+            return pending - len(self._flush())
+
+    def _flush(self):
+        """flush(); returns the pending names dropped as registered by another process"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending:
+                return set()
+            pending, self._pending = self._pending, []
+
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                # Pick up rows other processes appended before ours; a name they
+                # registered first wins and our duplicate row is dropped. Pending
+                # users stay in the index throughout, as exists()/check() do not lock
+                theirs = self._merge_new_rows()
+                rows = []
+                rejected = set()
+                for username, password in pending:
+                    if username in theirs:
+                        self._users[username] = theirs[username]
+                        rejected.add(username)
+                        print(f"User {username} was registered by another process")
+                    else:
+                        rows.append((username, password))
+
+                buf = io.StringIO()
+                if os.fstat(fd).st_size > self._offset:
+                    buf.write('\n')  # terminate a last line written without a newline
+                csv.writer(buf, lineterminator='\n').writerows(rows)
+                payload = buf.getvalue().encode('utf-8')
+                written = 0
+                while written < len(payload):
+                    written += os.write(fd, payload[written:])
+                if self.fsync:
+                    os.fsync(fd)
+                self._merge_new_rows()
+            except Exception:
+                # Keep the rows queued (they are still in the index) so a later
+                # flush can retry them
+                self._pending[:0] = pending
+                raise
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+            return rejected
+
+    def close(self):
+        """Flush pending writes; call on app shutdown"""
+        self.flush()